@@ -0,0 +1,227 @@
+import argparse
+import importlib
+import os
+import random
+import sys
+import time
+from typing import Callable, Iterator, List, Tuple
+
+import numpy as np
+
+from BoardFile import MAPS_DIRECTORY, read_board_file
+from Bots.Bitboard import Bitboard, get_all_moves as bitboard_get_all_moves
+from Bots.ChessBotList import CHESS_BOT_LIST, StatefulChessBot, create_bot
+from Bots.MoveTables import can_move_k_cases, pawn_eat_moves, pieces_moves
+from Bots.PiecesMoves import get_all_moves, get_piece_value
+
+#   Search positions of Bot_Tester (avoid_loosing_queen, want_to_win_too_much,
+#   respect_time_budget, know_queen_upgrade), rows written as in .brd files
+TESTER_POSITIONS = [
+    ("0w01b2", ["qw", "--", "pb", "rb"]),
+    ("0w01b2", ["--,qb,kb", "pb,pb,pb", "--,--,--", "--,nw,--", "--,--,--", "--,kw,--"]),
+    ("0w01b2", ["rw,nw,bw,qw", "pw,pw,pw,pw", "--,--,--,--", "pb,pb,pb,pb", "rb,nb,bb,qb"]),
+    ("1b20w0", ["--,rb,--,--,--", "--,--,--,--,--", "pw,pw,--,--,pb", "kw,--,--,--,--"]),
+]
+
+#   Search options compared by --windows
+WINDOW_OPTIONS = [
+    ("full window", dict(pvs=False, aspiration=False)),
+    ("PVS", dict(aspiration=False)),
+    ("+ aspiration", {}),
+]
+
+
+def tester_positions() -> List[Tuple[str, np.ndarray]]:
+    """Get the (player sequence, board) pairs of TESTER_POSITIONS"""
+    return [
+        (seq, np.array([row.replace("--", "").split(",") for row in rows], dtype=object))
+        for seq, rows in TESTER_POSITIONS
+    ]
+
+
+def sample_positions(path: str, count: int, seed: int = 0) -> Iterator[Tuple[str, np.ndarray]]:
+    """
+    Play random moves from a board file and yield every position reached
+
+    Positions are yielded from the point of view of the player to move,
+    as they would be handed to a bot
+    :param path: The .brd or .fen file to start from
+    :param count: Number of positions to yield
+    :param seed: Seed of the random move choice
+    :return: Pairs of (color to move, board)
+    """
+    rng = random.Random(seed)
+    player_order, board = read_board_file(path)
+    players = [player_order[i : i + 3] for i in range(0, len(player_order), 3)]
+    for ply in range(count):
+        seq = players[ply % len(players)]
+        view = np.rot90(board, int(seq[2]))
+        yield seq[1], view
+
+        moves = get_all_moves(view, seq[1])
+        if not moves:
+            player_order, board = read_board_file(path)
+            continue
+        (fx, fy), (tx, ty) = rng.choice(moves)
+        view = view.copy()
+        view[tx, ty] = view[fx, fy]
+        view[fx, fy] = ""
+        board = np.rot90(view, -int(seq[2]))
+
+
+def legacy_get_all_moves(board, side_color):
+    """Direction-walking generator used before move tables, kept as the baseline"""
+    eat_moves = []
+    upgrade_moves = []
+    normal_moves = []
+
+    for x in range(board.shape[0]):
+        for y in range(board.shape[1]):
+            piece = board[x][y]
+            if len(piece) <= 0 or piece[1] != side_color:
+                continue
+
+            piece_type = piece[0]
+            max_dist = 1 if piece_type not in can_move_k_cases else board.shape[0] - 1
+            for direction in pieces_moves[piece_type]:
+                for i in range(1, max_dist + 1):
+                    nx = i * direction[0] + x
+                    ny = i * direction[1] + y
+                    if nx < 0 or nx >= board.shape[0] or ny < 0 or ny >= board.shape[1]:
+                        break
+
+                    case_content = board[nx][ny]
+                    if len(case_content) == 0:
+                        if piece_type == "p" and nx == board.shape[0] - 1:
+                            upgrade_moves.append(((x, y), (nx, ny)))
+                        else:
+                            normal_moves.append(((x, y), (nx, ny)))
+                        continue
+
+                    if case_content[1] == side_color:
+                        break
+
+                    if piece_type != "p":
+                        eat_moves.append((((x, y), (nx, ny)), get_piece_value(case_content[0])))
+                        break
+
+            if piece_type == "p":
+                for direction in pawn_eat_moves:
+                    nx = direction[0] + x
+                    ny = direction[1] + y
+                    if nx < 0 or nx >= board.shape[0] or ny < 0 or ny >= board.shape[1]:
+                        continue
+
+                    case_content = board[nx][ny]
+                    if len(case_content) == 0 or case_content[1] == side_color:
+                        continue
+
+                    if nx < board.shape[0] - 1:
+                        eat_moves.append((((x, y), (nx, ny)), get_piece_value(case_content[0])))
+                    else:
+                        upgrade_moves.append(((x, y), (nx, ny)))
+
+    eat_moves.sort(key=lambda m: m[1], reverse=True)
+    return [m[0] for m in eat_moves] + upgrade_moves + normal_moves
+
+
+def time_calls(func: Callable, args: List[tuple], repeat: int) -> float:
+    """Get the average duration in seconds of one call of ``func`` over all arguments"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for a in args:
+            func(*a)
+    return (time.perf_counter() - start) / (repeat * len(args))
+
+
+def bench_move_generation(path: str, positions: int, repeat: int):
+    samples = list(sample_positions(path, positions))
+    boards = [(board, color) for color, board in samples]
+    bitboards = [(Bitboard.from_board(board), color) for color, board in samples]
+
+    legacy = time_calls(legacy_get_all_moves, boards, repeat)
+    tables = time_calls(get_all_moves, boards, repeat)
+    bitboard = time_calls(bitboard_get_all_moves, bitboards, repeat)
+
+    print(f"--- {os.path.basename(path)} ({positions} positions x {repeat}) ---")
+    print(f"{'direction walk':<16} {legacy * 1e6:>9.1f} us/call")
+    print(f"{'move tables':<16} {tables * 1e6:>9.1f} us/call  x{legacy / tables:.2f}")
+    print(f"{'bitboard':<16} {bitboard * 1e6:>9.1f} us/call  x{legacy / bitboard:.2f}")
+
+
+def bench_search(path: str, bot_name: str, positions: int, depth: int):
+    """Search sampled positions to a fixed depth and print node counts and move ordering quality"""
+    importlib.import_module(f"Bots.{bot_name}")
+    nodes = 0
+    rates = []
+    start = time.perf_counter()
+    for color, board in sample_positions(path, positions):
+        stats = {}
+        bot = create_bot(CHESS_BOT_LIST[bot_name])
+        bot(f"0{color}0", board, 3600, max_depth=depth, stats=stats, book=False)
+        if isinstance(bot, StatefulChessBot):
+            bot.end_game()
+        nodes += sum(stats["nodes"])
+        if "first_move_cutoff_rate" in stats:
+            rates.append(stats["first_move_cutoff_rate"])
+    duration = time.perf_counter() - start
+
+    print(f"--- {bot_name} on {os.path.basename(path)} ({positions} positions, depth {depth}) ---")
+    print(f"{nodes} nodes {duration:.2f}s {nodes / max(duration, 1e-9):.0f} nodes/s")
+    if rates:
+        print(f"first move cutoffs {sum(rates) / len(rates):.1%}")
+
+
+def bench_windows(label: str, positions: List[Tuple[str, np.ndarray]], bot_name: str, depth: int):
+    """Print the nodes searched by every depth of the positions with and without PVS and aspiration windows"""
+    importlib.import_module(f"Bots.{bot_name}")
+    totals = []
+    for _, options in WINDOW_OPTIONS:
+        nodes = [0] * depth
+        for player_sequence, board in positions:
+            stats = {}
+            bot = create_bot(CHESS_BOT_LIST[bot_name])
+            bot(player_sequence, board.copy(), 3600, max_depth=depth, stats=stats, book=False, **options)
+            if isinstance(bot, StatefulChessBot):
+                bot.end_game()
+            for i, n in enumerate(stats["nodes"]):
+                nodes[i] += n
+        totals.append(nodes)
+
+    print(f"--- {bot_name} on {label} ({len(positions)} positions, depth {depth}) ---")
+    print(f"{'depth':>5}" + "".join(f" {name:>13}" for name, _ in WINDOW_OPTIONS))
+    for d in range(depth):
+        print(f"{d + 1:>5}" + "".join(f" {nodes[d]:>13}" for nodes in totals))
+    full = sum(totals[0])
+    print(f"{'total':>5}" + "".join(f" {sum(nodes):>13}" for nodes in totals))
+    print(f"{'':>5}" + "".join(f" {sum(nodes) / max(full, 1) - 1:>+13.1%}" for nodes in totals))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move generation benchmark")
+    parser.add_argument("maps", nargs="*", default=["default.brd", "cross.brd"])
+    parser.add_argument("--positions", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--search", metavar="BOT", help="Benchmark the search of a bot instead of move generation")
+    parser.add_argument("--depth", type=int, default=4, help="Search depth of --search")
+    parser.add_argument(
+        "--windows", action="store_true", help="With --search, compare node counts with and without PVS and aspiration"
+    )
+    parser.add_argument("--tester", action="store_true", help="With --windows, search Bot_Tester's positions")
+    args = parser.parse_args()
+
+    if args.windows and args.tester:
+        bench_windows("Bot_Tester", tester_positions(), args.search, args.depth)
+        sys.exit(0)
+
+    for name in args.maps:
+        path = name if os.path.exists(name) else os.path.join(MAPS_DIRECTORY, name)
+        if args.search and args.windows:
+            positions = [(f"0{color}0", board) for color, board in sample_positions(path, args.positions)]
+            bench_windows(os.path.basename(path), positions, args.search, args.depth)
+        elif args.search:
+            bench_search(path, args.search, args.positions, args.depth)
+        else:
+            bench_move_generation(path, args.positions, args.repeat)
+
+    sys.exit(0)
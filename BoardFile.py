@@ -0,0 +1,154 @@
+import os
+import re
+from typing import Optional, Tuple
+
+import numpy as np
+
+MAPS_DIRECTORY = os.path.join(os.path.abspath(os.path.dirname(__file__)), "Data", "maps")
+
+
+def read_board_file(path: str) -> Optional[Tuple[str, np.ndarray]]:
+    """
+    Read a board from a file
+
+    =================
+    Supported formats
+    =================
+
+    ------------------------
+    Board description (.brd)
+    ------------------------
+
+    Starts with the player sequence on a line, then the board layout,
+    one row per line with comma-separated tile descriptions.
+
+    Each tile is described with two characters:
+
+    - The piece type: king (k), queen (q), knight (n), bishop (b), rook (r), pawn (p)
+    - The piece color: white (w), blue (b), red (r), yellow (y)
+
+    If the tile is empty, use ``--``
+
+    *Example*::
+
+        0w01b2
+        rw,nw,bw,kw,qw,bw,nw,rw
+        pw,pw,pw,pw,pw,pw,pw,pw
+        --,--,--,--,--,--,--,--
+        --,--,--,--,--,--,--,--
+        --,--,--,--,--,--,--,--
+        --,--,--,--,--,--,--,--
+        pb,pb,pb,pb,pb,pb,pb,pb
+        rb,nb,bb,kb,qb,bb,nb,rb
+
+    ----------
+    FEN (.fen)
+    ----------
+
+    Only contains a single line describing the board layout in `FEN`_
+
+    *Example*::
+
+        rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1
+
+    .. _FEN: https://en.wikipedia.org/wiki/Forsyth%E2%80%93Edwards_Notation
+
+    This function does not depend on the GUI, the board is returned as a string board.
+
+    :param path: The path to the board file. Can either be a .brd or .fen file
+    :return: The player order and the string board if successful, ``None`` otherwise
+    """
+    if path.strip() == "":
+        return None
+
+    if not os.path.exists(path):
+        print(f"File '{path}' not found")
+        return None
+
+    if not os.path.isfile(path):
+        print(f"'{path}' is not a file")
+        return None
+
+    ext = os.path.splitext(path)[1]
+
+    if ext not in (".brd", ".fen"):
+        print(f"Unsupported extension '{ext}'")
+        return None
+
+    with open(path, "r") as f:
+        data = f.read()
+
+    if ext == ".brd":
+        lines = data.split("\n")
+        rows = [
+            line.replace('--', '').strip().split(",")
+            for line in lines[1:]
+        ]
+        rows = list(filter(lambda r: len(r) != 0, rows))
+        if len(rows) == 0:
+            print("Board must have at least one row")
+            return None
+
+        width = len(rows[0])
+
+        #   check lines length equals
+        for row in rows:
+            if len(row) != width:
+                print("All rows must have the same width")
+                return None
+
+        return lines[0], np.array(rows, dtype='O')
+
+    elif ext == ".fen":
+        parts = data.strip().split(" ")
+        if len(parts) == 0:
+            print("FEN must at least contain the board state")
+            return None
+
+        board_desc = parts[0]
+        rows_desc = board_desc.split("/")
+        if len(rows_desc) == 0:
+            print("Board must have at least one row")
+            return None
+
+        rows = []
+
+        # Match before a letter or between a letter and a digit, or at the start/end of the string
+        # (allows for bigger board with spaces >= 10)
+        regexp = r"^|(?=\D)|(?<=\D)(?=\d)|$"
+        for row_desc in rows_desc:
+            matches = list(re.finditer(regexp, row_desc))
+            row = []
+            for i in range(len(matches) - 1):
+                m1 = matches[i]
+                m2 = matches[i + 1]
+                part = row_desc[m1.start():m2.start()]
+                if part.isnumeric():
+                    row += [""] * int(part)
+                else:
+                    color = "w" if part.isupper() else "b"
+                    piece = part.lower()
+                    if piece not in ("p", "r", "n", "b", "k", "q"):
+                        print(f"Invalid piece '{part}'")
+                        return None
+                    row.append(piece + color)
+            rows.append(row)
+
+        width = len(rows[0])
+        # Check lines length equals
+        for row in rows:
+            if len(row) != width:
+                print("All rows must have the same width")
+                return None
+
+        next_player = parts[1] if len(parts) > 1 else "w"
+        if next_player not in ("w", "b"):
+            print(f"Invalid player '{next_player}'")
+            return None
+
+        player_order = "0w01b2" if next_player == "w" else "0b01w2"
+        board = np.array(rows, dtype='O')
+        if next_player == "w":
+            board = np.rot90(board, 2)
+        return player_order, board
+    return None
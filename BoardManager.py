@@ -1,9 +1,9 @@
 import os
-import re
 from typing import List, Optional
 
 import numpy as np
 
+from BoardFile import read_board_file
 from PieceManager import PieceManager
 
 
@@ -64,152 +64,19 @@ class BoardManager:
         """
         Load a board from a file
 
-        =================
-        Supported formats
-        =================
-
-        ------------------------
-        Board description (.brd)
-        ------------------------
-
-        Starts with the player sequence on a line, then the board layout,
-        one row per line with comma-separated tile descriptions.
-
-        Each tile is described with two characters:
-
-        - The piece type: king (k), queen (q), knight (n), bishop (b), rook (r), pawn (p)
-        - The piece color: white (w), blue (b), red (r), yellow (y)
-
-        If the tile is empty, use ``--``
-
-        *Example*::
-
-            0w01b2
-            rw,nw,bw,kw,qw,bw,nw,rw
-            pw,pw,pw,pw,pw,pw,pw,pw
-            --,--,--,--,--,--,--,--
-            --,--,--,--,--,--,--,--
-            --,--,--,--,--,--,--,--
-            --,--,--,--,--,--,--,--
-            pb,pb,pb,pb,pb,pb,pb,pb
-            rb,nb,bb,kb,qb,bb,nb,rb
-
-        ----------
-        FEN (.fen)
-        ----------
-
-        Only contains a single line describing the board layout in `FEN`_
-
-        *Example*::
-
-            rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1
-
-        .. _FEN: https://en.wikipedia.org/wiki/Forsyth%E2%80%93Edwards_Notation
+        See ``BoardFile.read_board_file`` for the supported formats (.brd and .fen)
 
         :param path: The path to the board file. Can either be a .brd or .fen file
         :return: ``True`` if successful, `False` otherwise
         """
-        if path.strip() == "":
-            return False
-
-        if not os.path.exists(path):
-            print(f"File '{path}' not found")
-            return False
-
-        if not os.path.isfile(path):
-            print(f"'{path}' is not a file")
-            return False
-
-        ext = os.path.splitext(path)[1]
-
-        if ext not in (".brd", ".fen"):
-            print(f"Unsupported extension '{ext}'")
+        loaded = read_board_file(path)
+        if loaded is None:
             return False
 
-        with open(path, "r") as f:
-            data = f.read()
-
-        if ext == ".brd":
-            lines = data.split("\n")
-            rows = [
-                line.replace('--', '').strip().split(",")
-                for line in lines[1:]
-            ]
-            rows = list(filter(lambda r: len(r) != 0, rows))
-            if len(rows) == 0:
-                print("Board must have at least one row")
-                return False
-
-            width = len(rows[0])
-
-            #   check lines length equals
-            for row in rows:
-                if len(row) != width:
-                    print("All rows must have the same width")
-                    return False
-
-            self.player_order = lines[0]
-            self.board = np.array(rows, dtype='O')
-            self.path = path
-            self.post_load()
-            return True
-
-        elif ext == ".fen":
-            parts = data.strip().split(" ")
-            if len(parts) == 0:
-                print("FEN must at least contain the board state")
-                return False
-
-            board_desc = parts[0]
-            rows_desc = board_desc.split("/")
-            if len(rows_desc) == 0:
-                print("Board must have at least one row")
-                return False
-
-            rows = []
-
-            # Match before a letter or between a letter and a digit, or at the start/end of the string
-            # (allows for bigger board with spaces >= 10)
-            regexp = r"^|(?=\D)|(?<=\D)(?=\d)|$"
-            for row_desc in rows_desc:
-                matches = list(re.finditer(regexp, row_desc))
-                row = []
-                for i in range(len(matches) - 1):
-                    m1 = matches[i]
-                    m2 = matches[i + 1]
-                    part = row_desc[m1.start():m2.start()]
-                    if part.isnumeric():
-                        row += [""] * int(part)
-                    else:
-                        color = "w" if part.isupper() else "b"
-                        piece = part.lower()
-                        if piece not in ("p", "r", "n", "b", "k", "q"):
-                            print(f"Invalid piece '{part}'")
-                            return False
-                        row.append(piece + color)
-                rows.append(row)
-
-            width = len(rows[0])
-            # Check lines length equals
-            for row in rows:
-                if len(row) != width:
-                    print("All rows must have the same width")
-                    return False
-
-            next_player = parts[1] if len(parts) > 1 else "w"
-            if next_player not in ("w", "b"):
-                print(f"Invalid player '{next_player}'")
-                return False
-
-            self.player_order = "0w01b2" if next_player == "w" else "0b01w2"
-            board = np.array(rows, dtype='O')
-            if next_player == "w":
-                board = np.rot90(board, 2)
-            self.board = board
-            self.path = path
-            self.post_load()
-            return True
-        return False
+        self.player_order, self.board = loaded
+        self.path = path
+        self.post_load()
+        return True
 
     def reload(self):
         """Reload the board from the last imported file, if any"""
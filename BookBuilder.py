@@ -0,0 +1,103 @@
+import argparse
+import importlib
+import os
+import sys
+import time
+from typing import List, Tuple
+
+import numpy as np
+
+from BoardFile import MAPS_DIRECTORY, read_board_file
+from Bots.BoardEncoding import COLOR_CODES
+from Bots.ChessBotList import CHESS_BOT_LIST, StatefulChessBot, create_bot
+from Bots.OpeningBook import BOOK_PATH, OpeningBook, write_book
+from Bots.PiecesMoves import filter_legal_moves, get_all_moves, make_move
+from Bots.Zobrist import get_zobrist_keys
+
+#   Opening lines
+#       From the start position, the best ``width`` moves of every position are
+#       found by searching it, excluding the moves already found, to a fixed depth.
+#       Every one of them is recorded, the best with the highest weight, and the
+#       positions they lead to are searched in turn, up to ``plies`` moves deep.
+
+STOCK_MAPS = ["default.brd", "cross.brd", "pawn_race.brd"]
+
+
+def best_moves(bot_name: str, player_sequence: str, board, width: int, depth: int) -> List[tuple]:
+    """Get the best ``width`` moves of a position, best first"""
+    found = []
+    for _ in range(width):
+        stats = {}
+        bot = create_bot(CHESS_BOT_LIST[bot_name])
+        root_moves = None
+        if found:
+            color = player_sequence[1]
+            root_moves = [m for m in filter_legal_moves(board, color, get_all_moves(board, color)) if m not in found]
+            if not root_moves:
+                break
+        move = bot(player_sequence, board.copy(), 3600, max_depth=depth, stats=stats, root_moves=root_moves, book=False)
+        if isinstance(bot, StatefulChessBot):
+            bot.end_game()
+        if stats.get("depth", 0) == 0 or move in found:
+            break
+        found.append(move)
+    return found
+
+
+def collect_lines(path: str, bot_name: str, plies: int, width: int, depth: int) -> List[Tuple[int, tuple, int]]:
+    """
+    Search the opening lines of a board file
+    :param path: The .brd or .fen file to start from
+    :param bot_name: The search bot choosing the moves, it must accept ``max_depth`` and ``root_moves``
+    :return: The book entries (key, move, weight)
+    """
+    player_order, board = read_board_file(path)
+    players = [player_order[i : i + 3] for i in range(0, len(player_order), 3)]
+
+    entries = []
+    seen = set()
+    frontier = [board]
+    for ply in range(plies):
+        seq = players[ply % len(players)]
+        rotation = int(seq[2])
+        next_frontier = []
+        for board in frontier:
+            view = np.rot90(board, rotation).copy()
+            key = get_zobrist_keys(view.shape).compute(view, COLOR_CODES[seq[1]])
+            if key in seen:
+                continue
+            seen.add(key)
+
+            moves = best_moves(bot_name, seq, view, width, depth)
+            for rank, move in enumerate(moves):
+                entries.append((key, move, width - rank))
+                child = view.copy()
+                make_move(child, move)
+                next_frontier.append(np.rot90(child, -rotation))
+        frontier = next_frontier
+        print(f"ply {ply + 1}: {len(seen)} positions, {len(entries)} entries")
+    return entries
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the opening book of board files")
+    parser.add_argument("boards", nargs="*", help=".brd or .fen files, defaults to the stock maps")
+    parser.add_argument("-o", "--output", default=BOOK_PATH)
+    parser.add_argument("--bot", default="NegaMax_ThinkR", help="Search bot choosing the moves")
+    parser.add_argument("--plies", type=int, default=8, help="Length of the lines")
+    parser.add_argument("--width", type=int, default=2, help="Moves recorded per position")
+    parser.add_argument("--depth", type=int, default=4, help="Search depth of every position")
+    args = parser.parse_args()
+
+    importlib.import_module(f"Bots.{args.bot}")
+    boards = args.boards or [os.path.join(MAPS_DIRECTORY, name) for name in STOCK_MAPS]
+
+    start = time.perf_counter()
+    entries: List[Tuple[int, tuple, int]] = []
+    for board_path in boards:
+        print(f"--- {os.path.basename(board_path)} ---")
+        entries += collect_lines(board_path, args.bot, args.plies, args.width, args.depth)
+
+    write_book(args.output, entries)
+    print(f"{OpeningBook(args.output)!r} written to {args.output} in {time.perf_counter() - start:.1f}s")
+    sys.exit(0)
@@ -5,7 +5,7 @@ import pytest
 from dataclasses import dataclass
 
 from Bots import __all__ as BOT_MODULES
-from Bots.ChessBotList import CHESS_BOT_LIST
+from Bots.ChessBotList import CHESS_BOT_LIST, create_bot
 from ChessRules import move_is_valid, check_player_defeated
 
 bot_to_test = "ThinkR"
@@ -59,7 +59,7 @@ def load_all_bots() -> None:
 
 
 def run_bot(bot_name, player_sequence, board, time_budget):
-    bot_func = CHESS_BOT_LIST[bot_name]
+    bot_func = create_bot(CHESS_BOT_LIST[bot_name])
     move = bot_func(player_sequence, board, time_budget)
     assert isinstance(move, tuple) and len(move) == 2, f"Bot returned {move}"
     assert isinstance(move[0], tuple) and isinstance(
@@ -196,3 +196,19 @@ def test_bot_know_queen_upgrade(bot_name):
 
     move = run_bot(bot_name, "1b20w0", board, 1)
     assert move == ((2, 4), (3, 4)), f"Wrong move: {move}"
+
+
+@pytest.mark.parametrize("bot_name", ["ThinkR", "NegaMax_ThinkR"])
+def test_pvs_and_aspiration_match_full_window(bot_name):
+    #   The white king cannot escape both rooks: the score drops far below the first window
+    board = np.full((4, 4), "", dtype=object)
+    board[0, 0], board[1, 3], board[2, 2], board[3, 0] = "kw", "rb", "rb", "kb"
+
+    results = []
+    for options in [dict(pvs=False, aspiration=False), dict(aspiration=False), {}]:
+        stats = {}
+        bot = create_bot(CHESS_BOT_LIST[bot_name])
+        move = bot("0w01b2", board.copy(), 60, max_depth=5, stats=stats, book=False, **options)
+        results.append((move, stats["score"]))
+    assert results[1] == results[0], f"PVS changed the search result: {results}"
+    assert results[2] == results[0], f"Aspiration windows changed the search result: {results}"
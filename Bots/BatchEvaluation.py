@@ -0,0 +1,123 @@
+from typing import Callable, Sequence, Tuple
+
+import numpy as np
+
+from Bots.BoardEncoding import (
+    CODE_COUNT,
+    COLOR_CODES,
+    EMPTY,
+    TYPE_CODES,
+    TYPE_MASK,
+    code_piece,
+    encode_board,
+    piece_code,
+)
+from Bots.Evaluation import (
+    DOUBLED_PAWN_PENALTY,
+    ISOLATED_PAWN_PENALTY,
+    PASSED_PAWN_ADVANCE_WEIGHT,
+    PASSED_PAWN_BONUS,
+    get_piece_values,
+)
+from Bots.PiecesMoves import get_piece_value
+
+
+class BatchEvaluator:
+    """
+    Evaluation of a stack of encoded positions (N, H, W) in a few array operations
+
+    The score is exactly the one of ``Evaluation.evaluate``: material, piece-square
+    and pawn structure, so batched and one by one evaluations can share a search tree.
+    """
+
+    def __init__(
+        self,
+        shape: Tuple[int, int],
+        color: str,
+        piece_value: Callable[[str], int] = get_piece_value,
+    ):
+        """
+        :param shape: The board shape
+        :param color: The side whose pawns move towards the last row
+        :param piece_value: The material value of a piece type
+        """
+        self.height, self.width = shape
+        self.color = color
+
+        #   Value of every piece code on every square
+        values = get_piece_values(shape, color, piece_value)
+        self.weights = np.zeros((CODE_COUNT, self.height * self.width), dtype=np.int64)
+        for code in range(CODE_COUNT):
+            piece = code_piece(code)
+            if piece in values:
+                self.weights[code] = values[piece]
+        self.squares = np.arange(self.height * self.width)
+
+        #   Passed pawn bonus of every row, for pawns moving towards the last row
+        advance = [x / max(1, self.height - 1) for x in range(self.height)]
+        self.passed_bonus = np.array([PASSED_PAWN_BONUS + round(PASSED_PAWN_ADVANCE_WEIGHT * a) for a in advance])
+
+    def evaluate(self, stack: np.ndarray) -> np.ndarray:
+        """
+        Evaluate encoded positions
+        :param stack: An int8 array of shape (N, H, W), see ``encode_boards``
+        :return: The N scores, white positive
+        """
+        count = len(stack)
+        codes = stack.reshape(count, -1).astype(np.intp)
+        return self.weights[codes, self.squares].sum(axis=1) + self.pawn_structure(stack)
+
+    def pawn_structure(self, stack: np.ndarray) -> np.ndarray:
+        """Score the passed, doubled and isolated pawns like ``pawn_structure_score``, white positive"""
+        pawns = {color: stack == piece_code("p" + color) for color in COLOR_CODES}
+        all_pawns = np.logical_or.reduce(list(pawns.values()))
+        scores = np.zeros(len(stack), dtype=np.int64)
+        for color, own in pawns.items():
+            if not own.any():
+                continue
+            others = all_pawns & ~own
+            #   Rows flipped so that every pawn moves towards the last row
+            if color != self.color:
+                own, others = own[:, ::-1], others[:, ::-1]
+
+            behind = np.zeros_like(own)
+            behind[:, 1:] = np.logical_or.accumulate(own, axis=1)[:, :-1]
+            ahead = np.zeros_like(others)
+            ahead[:, :-1] = np.logical_or.accumulate(others[:, ::-1], axis=1)[:, ::-1][:, 1:]
+            blocked = ahead.copy()
+            blocked[:, :, 1:] |= ahead[:, :, :-1]
+            blocked[:, :, :-1] |= ahead[:, :, 1:]
+            columns = own.any(axis=1)
+            neighbours = np.zeros_like(columns)
+            neighbours[:, 1:] |= columns[:, :-1]
+            neighbours[:, :-1] |= columns[:, 1:]
+
+            passed = (own & ~blocked).sum(axis=2) @ self.passed_bonus
+            doubled = (own & behind).sum(axis=(1, 2))
+            isolated = (own & ~neighbours[:, np.newaxis, :]).sum(axis=(1, 2))
+            score = passed - DOUBLED_PAWN_PENALTY * doubled - ISOLATED_PAWN_PENALTY * isolated
+            scores += score if color == "w" else -score
+        return scores
+
+    def evaluate_moves(self, board, moves: Sequence, forward: int = 1) -> np.ndarray:
+        """
+        Evaluate the positions after every move of a position, in one call
+        :param board: The position
+        :param moves: Moves of one side ((xs, ys), (xd, yd))
+        :param forward: Moving direction of the side's pawns, for promotions
+        :return: The scores after each move, white positive
+        """
+        codes = encode_board(board)
+        count = len(moves)
+        coords = np.array(moves, dtype=np.intp).reshape(count, 4)
+        xs, ys, xd, yd = coords.T
+
+        moved = codes[xs, ys]
+        promoted = ((moved & TYPE_MASK) == TYPE_CODES["p"]) & (xd == (self.height - 1 if forward == 1 else 0))
+        moved = np.where(promoted, (moved & ~TYPE_MASK) | TYPE_CODES["q"], moved).astype(codes.dtype)
+
+        stack = np.repeat(codes[np.newaxis], count, axis=0)
+        index = np.arange(count)
+        stack[index, xs, ys] = EMPTY
+        stack[index, xd, yd] = moved
+        return self.evaluate(stack)
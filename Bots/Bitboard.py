@@ -0,0 +1,285 @@
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from Bots.MoveTables import get_move_tables
+from Bots.PiecesMoves import UndoRecord, get_piece_value
+
+
+def iter_squares(bits: int) -> Iterator[int]:
+    """Yield the index of every set bit, lowest square first"""
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+def rotate_coords(shape: Tuple[int, int], pos: Tuple[int, int], rot: int) -> Tuple[int, int]:
+    """
+    Get where a square ends up in ``np.rot90(board, rot)``
+    :param shape: Shape of the board before rotation
+    :param pos: The square (x, y) before rotation
+    :param rot: Number of 90° counter-clockwise rotations
+    :return: The square in the rotated board
+    """
+    rot %= 4
+    h, w = shape
+    x, y = pos
+    if rot == 1:
+        return w - 1 - y, x
+    if rot == 2:
+        return h - 1 - x, w - 1 - y
+    if rot == 3:
+        return y, h - 1 - x
+    return x, y
+
+
+class Bitboard:
+    """
+    Position stored as one Python int per piece string
+
+    Square ``(x, y)`` is bit ``x * width + y``, so scanning the bits in increasing
+    order visits the squares in the same order as a row-major scan of the board.
+    Any rectangular shape is supported. Walls (``XX``) are kept like any other piece.
+    """
+
+    __slots__ = ("height", "width", "pieces")
+
+    def __init__(self, height: int, width: int, pieces: Optional[Dict[str, int]] = None):
+        self.height: int = height
+        self.width: int = width
+        self.pieces: Dict[str, int] = {} if pieces is None else pieces
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.height, self.width
+
+    @property
+    def occupied(self) -> int:
+        bits = 0
+        for b in self.pieces.values():
+            bits |= b
+        return bits
+
+    def color_mask(self, color: str) -> int:
+        bits = 0
+        for piece, b in self.pieces.items():
+            if piece[1] == color:
+                bits |= b
+        return bits
+
+    def square(self, x: int, y: int) -> int:
+        return x * self.width + y
+
+    def coords(self, sq: int) -> Tuple[int, int]:
+        return divmod(sq, self.width)
+
+    def piece_at(self, sq: int) -> str:
+        bit = 1 << sq
+        for piece, b in self.pieces.items():
+            if b & bit:
+                return piece
+        return ""
+
+    def set_piece(self, sq: int, piece: str):
+        bit = 1 << sq
+        for p in self.pieces:
+            self.pieces[p] &= ~bit
+        if piece:
+            self.pieces[piece] = self.pieces.get(piece, 0) | bit
+
+    def copy(self) -> "Bitboard":
+        return Bitboard(self.height, self.width, dict(self.pieces))
+
+    def rotated(self, rot: int) -> "Bitboard":
+        """
+        Get the position rotated like ``np.rot90(board, rot)``
+        :param rot: Number of 90° counter-clockwise rotations
+        :return: A new rotated position
+        """
+        rot %= 4
+        h, w = self.height, self.width
+        if rot == 0:
+            return self.copy()
+
+        res = Bitboard(w, h) if rot % 2 else Bitboard(h, w)
+        for piece, bits in self.pieces.items():
+            new_bits = 0
+            for sq in iter_squares(bits):
+                nx, ny = rotate_coords((h, w), divmod(sq, w), rot)
+                new_bits |= 1 << (nx * res.width + ny)
+            res.pieces[piece] = new_bits
+        return res
+
+    @staticmethod
+    def from_board(board) -> "Bitboard":
+        """
+        Build a position from a 2d board
+
+        Accepts string boards as well as boards of ``Piece`` / ``BoardPiece`` objects
+        :param board: The board to convert
+        :return: The equivalent position
+        """
+        height, width = len(board), len(board[0])
+        res = Bitboard(height, width)
+        pieces = res.pieces
+        for x in range(height):
+            for y in range(width):
+                content = board[x][y]
+                if content is None or len(content) == 0:
+                    continue
+                piece = content[0] + content[1]
+                pieces[piece] = pieces.get(piece, 0) | (1 << (x * width + y))
+        return res
+
+    def to_board(self) -> np.ndarray:
+        """Get the position as a string board, as produced by ``BoardManager.get_string_board``"""
+        board = np.full((self.height, self.width), "", dtype=object)
+        for piece, bits in self.pieces.items():
+            for sq in iter_squares(bits):
+                board[divmod(sq, self.width)] = piece
+        return board
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Bitboard):
+            return NotImplemented
+        return self.shape == other.shape and {p: b for p, b in self.pieces.items() if b} == {
+            p: b for p, b in other.pieces.items() if b
+        }
+
+    def __repr__(self) -> str:
+        return f"Bitboard({self.height}x{self.width}, {len(self.pieces)} piece kinds)"
+
+
+def get_all_moves(
+    position: Bitboard, side_color: str, forward: int = 1
+) -> List[Tuple[Tuple[int, int], Tuple[int, int]]]:
+    """
+    Bitboard counterpart of ``PiecesMoves.get_all_moves``
+
+    Returns exactly the same moves in exactly the same order: captures sorted by
+    victim value, then promotions, then quiet moves, each group in board-scan order.
+    """
+    tables = get_move_tables(position.shape)
+    coords = tables.coords
+    square_rays = tables.square_rays
+    pawn_pushes, pawn_captures, last_row = tables.square_pawn_tables(forward)
+
+    occupied = 0
+    own = 0
+    own_pieces = []
+    for piece, bits in position.pieces.items():
+        occupied |= bits
+        if piece[1] == side_color:
+            own |= bits
+            own_pieces.append((piece[0], bits))
+
+    eat_moves = []
+    upgrade_moves = []
+    normal_moves = []
+
+    def victim_value(bit: int) -> int:
+        for piece, bits in position.pieces.items():
+            if bits & bit:
+                return get_piece_value(piece[0])
+        return 0
+
+    for sq in iter_squares(own):
+        bit = 1 << sq
+        for piece_type, bits in own_pieces:
+            if bits & bit:
+                break
+
+        start = coords[sq]
+
+        if piece_type == "p":
+            for target in pawn_pushes[sq]:
+                if occupied >> target & 1:
+                    continue
+                end = coords[target]
+                if end[0] == last_row:
+                    upgrade_moves.append((start, end))
+                else:
+                    normal_moves.append((start, end))
+
+            for target in pawn_captures[sq]:
+                if not occupied >> target & 1 or own >> target & 1:
+                    continue
+                end = coords[target]
+                if end[0] != last_row:
+                    eat_moves.append(((start, end), victim_value(1 << target)))
+                else:
+                    upgrade_moves.append((start, end))
+            continue
+
+        for ray in square_rays[piece_type][sq]:
+            for target in ray:
+                if not occupied >> target & 1:
+                    normal_moves.append((start, coords[target]))
+                    continue
+                if not own >> target & 1:
+                    eat_moves.append(((start, coords[target]), victim_value(1 << target)))
+                break
+
+    eat_moves.sort(key=lambda m: m[1], reverse=True)
+    return [m[0] for m in eat_moves] + upgrade_moves + normal_moves
+
+
+def make_move(position: Bitboard, move, forward: int = 1) -> UndoRecord:
+    """
+    Bitboard counterpart of ``PiecesMoves.make_move``
+    :param position: The position to modify
+    :param move: The move ((xs, ys), (xd, yd))
+    :param forward: Moving direction of the side's pawns, see ``get_all_moves``
+    :return: The record to give to ``unmake_move``
+    """
+    (fx, fy), (tx, ty) = move
+    width = position.width
+    start_bit = 1 << (fx * width + fy)
+    end_bit = 1 << (tx * width + ty)
+
+    pieces = position.pieces
+    piece = captured = ""
+    for p, bits in pieces.items():
+        if bits & start_bit:
+            piece = p
+        elif bits & end_bit:
+            captured = p
+
+    promoted = piece[0] == "p" and tx == (position.height - 1 if forward == 1 else 0)
+
+    undo = UndoRecord(move, piece, captured, promoted)
+    replay_move(position, undo)
+    return undo
+
+
+def replay_move(position: Bitboard, undo: UndoRecord):
+    """
+    Apply a move whose pieces are already known, without looking them up
+
+    Useful to play the same move on the position seen from another orientation,
+    with ``undo._replace(move=rotated_move)``. Take it back with ``unmake_move``.
+    """
+    (fx, fy), (tx, ty) = undo.move
+    width = position.width
+    end_bit = 1 << (tx * width + ty)
+
+    pieces = position.pieces
+    pieces[undo.piece] ^= 1 << (fx * width + fy)
+    if undo.captured:
+        pieces[undo.captured] ^= end_bit
+    new_piece = "q" + undo.piece[1] if undo.promoted else undo.piece
+    pieces[new_piece] = pieces.get(new_piece, 0) | end_bit
+
+
+def unmake_move(position: Bitboard, undo: UndoRecord):
+    """Take back a move applied by ``make_move``"""
+    (fx, fy), (tx, ty) = undo.move
+    width = position.width
+    end_bit = 1 << (tx * width + ty)
+
+    pieces = position.pieces
+    pieces["q" + undo.piece[1] if undo.promoted else undo.piece] ^= end_bit
+    if undo.captured:
+        pieces[undo.captured] |= end_bit
+    pieces[undo.piece] |= 1 << (fx * width + fy)
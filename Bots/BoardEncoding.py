@@ -0,0 +1,147 @@
+from typing import Callable, Dict, Optional, Sequence
+
+import numpy as np
+
+#   Compact board encoding
+#       Each cell is a single int8: (color << 3) | type
+#       type 0 is an empty cell and type 7 a wall ("XX"), so walls and empty cells have no color
+
+EMPTY = 0
+WALL = 7
+
+TYPE_CODES: Dict[str, int] = {
+    "p": 1,
+    "n": 2,
+    "b": 3,
+    "r": 4,
+    "q": 5,
+    "k": 6,
+}
+
+#   Same order as PieceManager.COLORS
+COLOR_CODES: Dict[str, int] = {
+    "w": 0,
+    "b": 1,
+    "r": 2,
+    "y": 3,
+}
+
+TYPE_MASK = 0b111
+COLOR_SHIFT = 3
+CODE_COUNT = len(COLOR_CODES) << COLOR_SHIFT
+
+BOARD_DTYPE = np.int8
+
+
+def piece_code(piece: str) -> int:
+    """
+    Get the code of a 2-character piece description
+    :param piece: The piece, e.g. ``"pw"``, ``"XX"`` or ``""``
+    :return: Its int8 code
+    """
+    if len(piece) == 0:
+        return EMPTY
+    if piece == "XX":
+        return WALL
+    return (COLOR_CODES[piece[1]] << COLOR_SHIFT) | TYPE_CODES[piece[0]]
+
+
+def code_piece(code: int) -> str:
+    """Get the 2-character piece description of a code"""
+    return DECODE_TABLE[code]
+
+
+def _build_decode_table() -> np.ndarray:
+    table = np.full(CODE_COUNT, "", dtype=object)
+    table[WALL] = "XX"
+    for color, c in COLOR_CODES.items():
+        for piece_type, t in TYPE_CODES.items():
+            table[(c << COLOR_SHIFT) | t] = piece_type + color
+    return table
+
+
+DECODE_TABLE = _build_decode_table()
+
+
+def _cell_string(cell) -> str:
+    if cell is None:
+        return ""
+    if isinstance(cell, str):
+        return cell
+    return cell.string()
+
+
+_cells_to_strings = np.frompyfunc(_cell_string, 1, 1)
+
+
+def _as_object_array(board) -> np.ndarray:
+    if isinstance(board, np.ndarray):
+        return board
+    #   Pieces define __len__ and __getitem__, numpy would otherwise unpack them
+    res = np.empty((len(board), len(board[0])), dtype=object)
+    for x, row in enumerate(board):
+        for y, cell in enumerate(row):
+            res[x, y] = cell
+    return res
+
+
+def encode_board(board) -> np.ndarray:
+    """
+    Encode a board into its compact int8 form
+
+    Works on string boards (``BoardManager.get_string_board``) as well as on
+    boards of ``Piece`` or ``BoardPiece`` objects
+    :param board: The board to encode
+    :return: An int8 array with the same shape
+    """
+    strings = np.asarray(_cells_to_strings(_as_object_array(board)), dtype="U2")
+    uniques, inverse = np.unique(strings, return_inverse=True)
+    codes = np.array([piece_code(u) for u in uniques], dtype=BOARD_DTYPE)
+    return codes[inverse].reshape(strings.shape)
+
+
+def encode_boards(boards: Sequence) -> np.ndarray:
+    """
+    Encode several boards of the same shape into one stacked array
+    :param boards: The boards to encode
+    :return: An int8 array of shape (N, H, W)
+    """
+    return np.stack([encode_board(b) for b in boards])
+
+
+def decode_board(codes: np.ndarray, piece_factory: Optional[Callable[[str, str], object]] = None) -> np.ndarray:
+    """
+    Decode a compact board
+
+    Without factory, the result is a string board. Otherwise every piece is built
+    with ``piece_factory(piece_type, color)``, e.g. ``BoardPiece`` or
+    ``lambda t, c: PieceManager.get_piece(c, t)``. Empty cells and walls stay strings.
+    :param codes: The encoded board (any shape)
+    :param piece_factory: Optional constructor for piece objects
+    :return: An object array with the same shape
+    """
+    board = DECODE_TABLE[codes]
+    if piece_factory is None:
+        return board
+
+    types = codes & TYPE_MASK
+    for idx in zip(*np.nonzero((types != EMPTY) & (types != WALL))):
+        piece = board[idx]
+        board[idx] = piece_factory(piece[0], piece[1])
+    return board
+
+
+def piece_types(codes: np.ndarray) -> np.ndarray:
+    """Get the piece type code of every cell (0 for empty, 7 for walls)"""
+    return codes & TYPE_MASK
+
+
+def piece_colors(codes: np.ndarray) -> np.ndarray:
+    """Get the color code of every cell (meaningless on empty cells and walls)"""
+    return codes >> COLOR_SHIFT
+
+
+def color_mask(codes: np.ndarray, color: str) -> np.ndarray:
+    """Get a boolean mask of the cells holding a piece of the given color"""
+    types = codes & TYPE_MASK
+    return (types != EMPTY) & (types != WALL) & ((codes >> COLOR_SHIFT) == COLOR_CODES[color])
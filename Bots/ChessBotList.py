@@ -2,8 +2,94 @@
 CHESS_BOT_LIST = {}
 
 def register_chess_bot(name, function):
+    """
+    Register a bot under a name
+    :param function: Either a function (player_sequence, board, time_budget, **kwargs) -> move,
+                     or a ``StatefulChessBot`` subclass
+    """
     global CHESS_BOT_LIST
     if name in CHESS_BOT_LIST:
         register_chess_bot(name+"_", function)
     else:
-        CHESS_BOT_LIST[name] = function
\ No newline at end of file
+        CHESS_BOT_LIST[name] = function
+
+
+class StatefulChessBot:
+    """
+    Base class of bots keeping data, e.g. search tables, between their turns of a game
+
+    The class itself is registered. A game creates one instance per player with
+    ``create_bot``, and calls it like a bot function every turn.
+    """
+
+    def __init__(self):
+        self.started = False
+
+    def new_game(self, player_sequence, board):
+        """Called before the first turn of the game, with the arguments of that turn"""
+
+    def think(self, player_sequence, board, time_budget, **kwargs):
+        """Choose a move, same arguments and result as a bot function"""
+        raise NotImplementedError
+
+    def opponent_moved(self, move, board):
+        """
+        Called after every move of another player
+        :param move: The move ((xs, ys), (xd, yd)), in this bot's orientation
+        :param board: The board after the move, in this bot's orientation
+        """
+
+    def end_game(self):
+        """Called once the game is over, e.g. to stop processes started by the bot"""
+
+    #   Whether the bot implements predict_move and ponder, used by games with pondering enabled
+    ponders = False
+
+    def predict_move(self, player_sequence, board):
+        """
+        Guess the next move of the other players
+        :param board: The board after this bot's last move, in its orientation
+        :return: The expected move, or ``None`` to skip pondering this turn
+        """
+        return None
+
+    def ponder(self, player_sequence, board, move, should_stop):
+        """
+        Search during the other players' turn, run on a copy of the bot in another process
+
+        The copy replaces the bot if the predicted move is played, and is dropped otherwise.
+        :param board: The board after this bot's last move, in its orientation
+        :param move: The move returned by ``predict_move``
+        :param should_stop: Returns ``True`` once the pondering must end
+        """
+
+    def book_move(self, player_sequence, board):
+        """
+        Get a move to play without thinking, e.g. from an opening book
+        :return: The move, or ``None`` to think
+        """
+        return None
+
+    def __call__(self, player_sequence, board, time_budget, **kwargs):
+        if not self.started:
+            self.started = True
+            self.new_game(player_sequence, board)
+        #   book=False always thinks, e.g. to benchmark the search
+        if kwargs.pop("book", True):
+            move = self.book_move(player_sequence, board)
+            if move is not None:
+                return move
+        return self.think(player_sequence, board, time_budget, **kwargs)
+
+
+def is_stateful_bot(bot) -> bool:
+    return isinstance(bot, type) and issubclass(bot, StatefulChessBot)
+
+
+def create_bot(bot):
+    """
+    Get what a game calls for a registered bot
+    :param bot: A value of CHESS_BOT_LIST
+    :return: A new instance for a stateful bot class, the bot function itself otherwise
+    """
+    return bot() if is_stateful_bot(bot) else bot
@@ -0,0 +1,109 @@
+import math
+from typing import Tuple
+
+import numpy as np
+
+from Bots.BoardEncoding import COLOR_CODES
+from Bots.ChessBotList import StatefulChessBot
+from Bots.EvaluationCache import EVAL_CACHE_SIZE_MB, PAWN_CACHE_SIZE_MB, EvaluationCache
+from Bots.MoveOrdering import OrderingTables
+from Bots.OpeningBook import BOOK_PATH, get_opening_book
+from Bots.PiecesMoves import get_all_moves, get_opponent_color, make_move
+from Bots.SearchClock import FIRST_POLL_NODES
+from Bots.Tablebase import TABLEBASE_DIRECTORY, get_tablebases
+from Bots.TranspositionTable import UPPER, TranspositionTable
+from Bots.Zobrist import get_zobrist_keys
+
+
+class EngineState:
+    """Search data of a bot kept from one turn to the next"""
+
+    def __init__(self, shape: Tuple[int, int], tt_size_mb: float, transposition_table=None):
+        """
+        :param transposition_table: A table to use, e.g. a ``SharedTranspositionTable``, instead of a new one
+        """
+        self.shape = shape
+        self.keys = get_zobrist_keys(shape)
+        if transposition_table is None:
+            transposition_table = TranspositionTable(tt_size_mb)
+        self.transposition_table = transposition_table
+        self.ordering = OrderingTables(shape)
+        self.eval_cache = EvaluationCache(EVAL_CACHE_SIZE_MB)
+        self.pawn_cache = EvaluationCache(PAWN_CACHE_SIZE_MB)
+
+        #   Calibrated deadline polling interval of the last turn
+        self.poll_interval = FIRST_POLL_NODES
+        self.turns = 0
+
+    def start_turn(self):
+        #   Killers are indexed by distance to the root, which moved since the last turn
+        if self.turns > 0:
+            self.ordering.age()
+        self.turns += 1
+
+
+class SearchBot(StatefulChessBot):
+    """
+    Stateful wrapper of a search bot function accepting a ``state`` keyword argument
+
+    Subclasses set ``search`` to the bot function and ``tt_size_mb`` to its table size.
+    Positions of the opening book at ``book_path``, and endgames of the tablebases
+    in ``tablebase_directory``, are played without searching (``None`` for none).
+    """
+
+    search = None
+    tt_size_mb = 4
+    ponders = True
+    book_path = BOOK_PATH
+    tablebase_directory = TABLEBASE_DIRECTORY
+
+    def __init__(self):
+        super().__init__()
+        self.state = None
+
+    def new_game(self, player_sequence, board):
+        self.state = EngineState(board.shape, self.tt_size_mb)
+
+    def think(self, player_sequence, board, time_budget, **kwargs):
+        if self.state is None or self.state.shape != board.shape:
+            self.new_game(player_sequence, board)
+        return type(self).search(player_sequence, board, time_budget, state=self.state, **kwargs)
+
+    def book_move(self, player_sequence, board):
+        color = player_sequence[1]
+        #   Tablebase moves are exact, they come before the book's
+        if self.tablebase_directory:
+            move = get_tablebases(self.tablebase_directory).best_move(player_sequence, board)
+            if move is not None:
+                return move
+
+        book = get_opening_book(self.book_path) if self.book_path else None
+        if book is None:
+            return None
+        move = book.choose(get_zobrist_keys(board.shape).compute(board, COLOR_CODES[color]))
+        #   Keys of other board shapes, or colliding keys, could give moves of other positions
+        if move is None or move not in get_all_moves(board, color):
+            return None
+        return move
+
+    def predict_move(self, player_sequence, board):
+        """Get the best reply stored by the last search for the position after this bot's move"""
+        if self.state is None or self.state.shape != board.shape:
+            return None
+
+        opponent = get_opponent_color(player_sequence[1])
+        entry = self.state.transposition_table.probe(self.state.keys.compute(board, COLOR_CODES[opponent]))
+        #   The move of a fail-low entry is only the first one searched
+        if entry is None or entry[1] == UPPER or entry[3] is None:
+            return None
+        move = entry[3]
+        piece = board[move[0]]
+        if len(piece) == 0 or piece[1] != opponent:
+            return None
+        return move
+
+    def ponder(self, player_sequence, board, move, should_stop):
+        board = np.copy(board)
+        make_move(board, move, forward=-1)
+        #   The turn starts when the search after a ponder hit runs, it ages the tables once
+        type(self).search(player_sequence, board, math.inf, state=self.state, stop=should_stop, age=False)
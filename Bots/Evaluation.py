@@ -0,0 +1,253 @@
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from Bots.BoardEncoding import COLOR_CODES, TYPE_CODES
+from Bots.EvaluationCache import EVAL_CACHE_SIZE_MB, PAWN_CACHE_SIZE_MB, EvaluationCache
+from Bots.MoveTables import get_move_tables
+from Bots.PiecesMoves import UndoRecord, get_piece_value
+from Bots.Zobrist import get_zobrist_keys
+
+#   Scores are in hundredths of the piece values of get_piece_value
+EVAL_SCALE = 100
+
+#   Piece-square bonuses, in hundredths of a pawn
+#       Knights, bishops and queens get up to this bonus on the squares where they
+#       have the most moves on an empty board, and as much penalty where they have
+#       the fewest. Pawns get a bonus growing with their advance, kings a penalty.
+MOBILITY_WEIGHTS = {"n": 30, "b": 20, "r": 0, "q": 10}
+PAWN_ADVANCE_WEIGHT = 60
+KING_ADVANCE_WEIGHT = 40
+
+#   Pawn structure, in hundredths of a pawn
+#       A passed pawn (no enemy pawn ahead on its column or the neighbouring ones)
+#       gets a bonus growing with its advance. Every pawn sharing its column with a
+#       pawn of its side behind it, and every pawn without pawns of its side on the
+#       neighbouring columns, gets a penalty.
+PASSED_PAWN_BONUS = 10
+PASSED_PAWN_ADVANCE_WEIGHT = 60
+DOUBLED_PAWN_PENALTY = 15
+ISOLATED_PAWN_PENALTY = 10
+
+
+class PieceSquareTables:
+    """
+    Piece-square bonuses of a board shape, built from the shape's move tables
+
+    Tables are indexed by square number ``x * width + y``, for pieces of the side
+    whose pawns move towards the last row.
+    """
+
+    def __init__(self, shape: Tuple[int, int]):
+        self.height, self.width = shape
+        move_tables = get_move_tables(shape)
+        size = self.height * self.width
+
+        self.tables: Dict[str, List[int]] = {}
+        for piece_type, weight in MOBILITY_WEIGHTS.items():
+            mobility = np.array([sum(len(ray) for ray in rays) for rays in move_tables.rays[piece_type]], dtype=float)
+            spread = mobility.max() - mobility.min()
+            table = np.zeros(size) if spread == 0 else weight * (2 * mobility - mobility.max() - mobility.min()) / spread
+            self.tables[piece_type] = np.rint(table).astype(int).tolist()
+
+        advance = np.repeat(np.arange(self.height), self.width) / max(1, self.height - 1)
+        self.tables["p"] = np.rint(PAWN_ADVANCE_WEIGHT * advance**2).astype(int).tolist()
+        self.tables["k"] = np.rint(-KING_ADVANCE_WEIGHT * advance).astype(int).tolist()
+
+    def mirrored(self, piece_type: str) -> List[int]:
+        """Get the table of a piece type for the side whose pawns move towards the first row"""
+        table = np.array(self.tables[piece_type]).reshape(self.height, self.width)
+        return table[::-1].flatten().tolist()
+
+
+_TABLES: Dict[Tuple[int, int], PieceSquareTables] = {}
+
+
+def get_piece_square_tables(shape: Tuple[int, int]) -> PieceSquareTables:
+    """Get the (cached) piece-square tables of a board shape"""
+    shape = (int(shape[0]), int(shape[1]))
+    tables = _TABLES.get(shape)
+    if tables is None:
+        tables = _TABLES[shape] = PieceSquareTables(shape)
+    return tables
+
+
+def get_piece_values(shape: Tuple[int, int], color: str, piece_value: Callable[[str], int] = get_piece_value) -> Dict[str, List[int]]:
+    """
+    Get the signed material plus piece-square value of every piece on every square
+    :param shape: The board shape
+    :param color: The side whose pawns move towards the last row
+    :param piece_value: The material value of a piece type
+    :return: The values of every square, by piece (``""`` and ``"XX"`` are worth 0)
+    """
+    size = shape[0] * shape[1]
+    piece_square_tables = get_piece_square_tables(shape)
+
+    values: Dict[str, List[int]] = {"": [0] * size, "XX": [0] * size}
+    for piece_color in COLOR_CODES:
+        sign = 1 if piece_color == "w" else -1
+        for piece_type in TYPE_CODES:
+            if piece_color == color:
+                table = piece_square_tables.tables[piece_type]
+            else:
+                table = piece_square_tables.mirrored(piece_type)
+            material = piece_value(piece_type) * EVAL_SCALE
+            values[piece_type + piece_color] = [sign * (material + bonus) for bonus in table]
+    return values
+
+
+def pawn_structure_score(board, color: str) -> int:
+    """
+    Score the pawn structure of a position
+    :param board: The position, as seen by ``color``
+    :param color: The side whose pawns move towards the last row
+    :return: The score of passed, doubled and isolated pawns, white positive
+    """
+    height, width = board.shape
+    #   Lowest and highest row of the pawns of every (column, color)
+    pawns = []
+    lowest: Dict[Tuple[int, str], int] = {}
+    highest: Dict[Tuple[int, str], int] = {}
+    for x, row in enumerate(board.tolist()):
+        for y, piece in enumerate(row):
+            if len(piece) != 0 and piece[0] == "p":
+                pawns.append((x, y, piece[1]))
+                lowest.setdefault((y, piece[1]), x)
+                highest[y, piece[1]] = x
+    colors = {pawn_color for _, _, pawn_color in pawns}
+
+    score = 0
+    for x, y, pawn_color in pawns:
+        forward = 1 if pawn_color == color else -1
+        bonus = 0
+        passed = True
+        for other in colors:
+            if other != pawn_color:
+                for column in (y - 1, y, y + 1):
+                    if forward == 1 and highest.get((column, other), -1) > x:
+                        passed = False
+                    elif forward == -1 and lowest.get((column, other), height) < x:
+                        passed = False
+        if passed:
+            advance = (x if forward == 1 else height - 1 - x) / max(1, height - 1)
+            bonus += PASSED_PAWN_BONUS + round(PASSED_PAWN_ADVANCE_WEIGHT * advance)
+        if (lowest[y, pawn_color] < x) if forward == 1 else (highest[y, pawn_color] > x):
+            bonus -= DOUBLED_PAWN_PENALTY
+        if (y - 1, pawn_color) not in lowest and (y + 1, pawn_color) not in lowest:
+            bonus -= ISOLATED_PAWN_PENALTY
+        score += bonus if pawn_color == "w" else -bonus
+    return score
+
+
+class Evaluation:
+    """
+    Material and piece-square score of a position, updated move by move
+
+    The score counts the pieces of white positively and the others negatively.
+    ``apply`` and ``unapply`` update it in constant time, so a leaf is evaluated
+    without looking at the board.
+
+    ``evaluate`` adds the pawn structure score. It is looked up by the key of the
+    pawns' placement, kept up to date along with the score, in a pawn cache, and
+    the full score by the position key in an evaluation cache.
+    """
+
+    def __init__(
+        self,
+        board,
+        color: str,
+        piece_value: Callable[[str], int] = get_piece_value,
+        eval_cache: Optional[EvaluationCache] = None,
+        pawn_cache: Optional[EvaluationCache] = None,
+    ):
+        """
+        :param board: The position, as seen by ``color``. ``evaluate`` reads it, moves
+                      must be made on this board
+        :param color: The side whose pawns move towards the last row
+        :param piece_value: The material value of a piece type
+        :param eval_cache: Cache of full scores, e.g. kept from turn to turn, a new one if ``None``
+        :param pawn_cache: Cache of pawn structure scores, a new one if ``None``
+        """
+        self.board = board
+        self.color = color
+        self.width = board.shape[1]
+        self.values = get_piece_values(board.shape, color, piece_value)
+        self.score = self.compute(board)
+
+        self.keys = get_zobrist_keys(board.shape)
+        self.pawn_key = self.compute_pawn_key(board)
+        self.eval_cache = EvaluationCache(EVAL_CACHE_SIZE_MB) if eval_cache is None else eval_cache
+        self.pawn_cache = EvaluationCache(PAWN_CACHE_SIZE_MB) if pawn_cache is None else pawn_cache
+
+    def piece_values(self, piece) -> List[int]:
+        """Get the values of a piece (or ``""``) on every square"""
+        return self.values[piece if isinstance(piece, str) else piece[0] + piece[1]]
+
+    def compute(self, board) -> int:
+        """Compute the score of a position from scratch"""
+        score = 0
+        for x in range(board.shape[0]):
+            for y in range(board.shape[1]):
+                piece = board[x, y]
+                if len(piece) != 0:
+                    score += self.piece_values(piece)[x * self.width + y]
+        return score
+
+    def move_delta(self, undo: UndoRecord) -> int:
+        """Get the score difference made by a move, from the record returned by ``make_move``"""
+        (xs, ys), (xd, yd) = undo.move
+        start = xs * self.width + ys
+        end = xd * self.width + yd
+        piece = undo.piece
+        moved = self.piece_values("q" + piece[1]) if undo.promoted else self.piece_values(piece)
+        return moved[end] - self.piece_values(piece)[start] - self.piece_values(undo.captured)[end]
+
+    def compute_pawn_key(self, board) -> int:
+        """Compute the key of the pawns' placement from scratch"""
+        key = 0
+        for x in range(board.shape[0]):
+            for y in range(board.shape[1]):
+                piece = board[x, y]
+                if len(piece) != 0 and piece[0] == "p":
+                    key ^= self.keys.piece_key((x, y), piece)
+        return key
+
+    def pawn_key_delta(self, undo: UndoRecord) -> int:
+        """Get the value to XOR into the pawn key to apply, or take back, a move"""
+        start, end = undo.move
+        piece, captured = undo.piece, undo.captured
+        delta = 0
+        if piece[0] == "p":
+            delta = self.keys.piece_key(start, piece)
+            if not undo.promoted:
+                delta ^= self.keys.piece_key(end, piece)
+        if len(captured) != 0 and captured[0] == "p":
+            delta ^= self.keys.piece_key(end, captured)
+        return delta
+
+    def apply(self, undo: UndoRecord):
+        self.score += self.move_delta(undo)
+        self.pawn_key ^= self.pawn_key_delta(undo)
+
+    def unapply(self, undo: UndoRecord):
+        self.score -= self.move_delta(undo)
+        self.pawn_key ^= self.pawn_key_delta(undo)
+
+    def evaluate(self, key: int) -> int:
+        """
+        Get the full score of the current position: material, piece-square and pawn structure
+        :param key: The Zobrist key of the position
+        :return: The score, white positive
+        """
+        score = self.eval_cache.probe(key)
+        if score is not None:
+            return score
+
+        pawn_score = self.pawn_cache.probe(self.pawn_key)
+        if pawn_score is None:
+            pawn_score = pawn_structure_score(self.board, self.color)
+            self.pawn_cache.store(self.pawn_key, pawn_score)
+
+        score = self.score + pawn_score
+        self.eval_cache.store(key, score)
+        return score
@@ -0,0 +1,68 @@
+from typing import Optional
+
+import numpy as np
+
+#   Bytes used by one entry: key, score and filled flag
+CACHE_ENTRY_SIZE = 8 + 4 + 1
+
+#   Default budgets of the position and the pawn structure caches of a search
+EVAL_CACHE_SIZE_MB = 2
+PAWN_CACHE_SIZE_MB = 0.25
+
+
+class EvaluationCache:
+    """
+    Fixed-size table of scores indexed by a 64-bit key
+
+    Direct mapped: every key has one slot, a store always replaces what was there.
+    The full key is kept to tell positions sharing a slot apart.
+    """
+
+    def __init__(self, size_mb: float = EVAL_CACHE_SIZE_MB):
+        """
+        :param size_mb: Memory budget in megabytes, rounded down to a power of two slots
+        """
+        slots = max(1, int(size_mb * 2**20) // CACHE_ENTRY_SIZE)
+        self.slot_count = 1 << (slots.bit_length() - 1)
+        self.mask = self.slot_count - 1
+
+        #   Zero-filled, so untouched pages are never actually allocated
+        self.keys = np.zeros(self.slot_count, dtype=np.uint64)
+        self.scores = np.zeros(self.slot_count, dtype=np.int32)
+        self.filled = np.zeros(self.slot_count, dtype=np.bool_)
+
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+
+    def probe(self, key: int) -> Optional[int]:
+        """
+        Look a score up
+        :param key: The key of the position
+        :return: The score stored for it, ``None`` if missing
+        """
+        self.probes += 1
+        index = key & self.mask
+        if self.filled[index] and self.keys[index] == key:
+            self.hits += 1
+            return int(self.scores[index])
+        return None
+
+    def store(self, key: int, score: int):
+        self.stores += 1
+        index = key & self.mask
+        self.keys[index] = key
+        self.scores[index] = score
+        self.filled[index] = True
+
+    def clear(self):
+        self.filled.fill(False)
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+
+    def hit_rate(self) -> float:
+        return self.hits / self.probes if self.probes else 0.0
+
+    def __repr__(self):
+        return f"EvaluationCache({self.slot_count} slots, {self.probes} probes, {self.hits} hits, {self.stores} stores)"
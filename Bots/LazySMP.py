@@ -0,0 +1,123 @@
+import multiprocessing
+import os
+import queue
+
+from Bots.EngineState import EngineState, SearchBot
+from Bots.SharedTranspositionTable import SharedTranspositionTable
+
+#   Lazy SMP
+#       Helper processes run the same iterative deepening as the main search on the
+#       same position, sharing one transposition table. Helpers start at staggered
+#       depths so they fill the table ahead of the main search instead of repeating
+#       it. At the deadline, the move of the deepest completed iteration is played.
+
+SMP_CONTEXT = multiprocessing.get_context("spawn")
+
+#   Helper processes besides the main search, one per remaining core by default
+SMP_HELPERS = max(1, (os.cpu_count() or 2) - 1)
+
+#   Seconds waited for the helpers' results once the main search is over
+RESULT_TIMEOUT = 0.05
+
+
+def run_helper(search, shape, table_name, tasks, results, stop):
+    """Entry point of a helper process: search every task until ``None`` is received"""
+    table = SharedTranspositionTable.attach(table_name)
+    state = EngineState(shape, 0, transposition_table=table)
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            turn, player_sequence, board, time_budget, options = task
+            stats = {}
+            move = search(player_sequence, board, time_budget, state=state, stop=stop.is_set, stats=stats, **options)
+            results.put((turn, stats.get("depth", 0), sum(stats.get("nodes", [])), move))
+    finally:
+        table.close()
+
+
+class LazySMPBot(SearchBot):
+    """
+    Search bot running ``helpers`` more processes on every turn, see ``run_helper``
+
+    The processes are started once per game, so their start-up does not count in
+    the turns' time budget.
+    """
+
+    helpers = SMP_HELPERS
+    ponders = False
+
+    def __init__(self):
+        super().__init__()
+        self.processes = []
+        self.tasks = []
+        self.results = None
+        self.stop = None
+        self.turn = 0
+
+    def new_game(self, player_sequence, board):
+        self.end_game()
+        table = SharedTranspositionTable(self.tt_size_mb)
+        self.state = EngineState(board.shape, self.tt_size_mb, transposition_table=table)
+        self.results = SMP_CONTEXT.Queue()
+        self.stop = SMP_CONTEXT.Event()
+        for _ in range(self.helpers):
+            tasks = SMP_CONTEXT.Queue()
+            process = SMP_CONTEXT.Process(
+                target=run_helper,
+                args=(type(self).search, board.shape, table.name, tasks, self.results, self.stop),
+                daemon=True,
+            )
+            process.start()
+            self.tasks.append(tasks)
+            self.processes.append(process)
+
+    def think(self, player_sequence, board, time_budget, **kwargs):
+        if self.state is None or self.state.shape != board.shape:
+            self.new_game(player_sequence, board)
+
+        stats = kwargs.pop("stats", None)
+        if stats is None:
+            stats = {}
+        self.turn += 1
+        self.stop.clear()
+        for index, tasks in enumerate(self.tasks, 1):
+            #   Odd helpers search one ply deeper than the main search
+            tasks.put((self.turn, player_sequence, board, time_budget, dict(kwargs, start_depth=1 + index % 2)))
+
+        #   The main search leaves time to collect the helpers' results
+        search_budget = max(0.0, time_budget - RESULT_TIMEOUT)
+        move = type(self).search(player_sequence, board, search_budget, state=self.state, stats=stats, **kwargs)
+        self.stop.set()
+
+        depth = stats.get("depth", 0)
+        stats["helpers"] = []
+        while len(stats["helpers"]) < len(self.tasks):
+            try:
+                turn, helper_depth, helper_nodes, helper_move = self.results.get(timeout=RESULT_TIMEOUT)
+            except queue.Empty:
+                break
+            #   Results of a helper that missed the timeout of an earlier turn
+            if turn != self.turn:
+                continue
+            stats["helpers"].append((helper_depth, helper_nodes))
+            if helper_depth > depth:
+                depth, move = helper_depth, helper_move
+        stats["smp_depth"] = depth
+        return move
+
+    def end_game(self):
+        if self.stop is not None:
+            self.stop.set()
+        for tasks in self.tasks:
+            tasks.put(None)
+        for process in self.processes:
+            process.join(1)
+            if process.is_alive():
+                process.terminate()
+        self.processes = []
+        self.tasks = []
+        if self.state is not None:
+            self.state.transposition_table.close()
+            self.state = None
@@ -0,0 +1,90 @@
+from typing import List, Tuple
+
+import numpy as np
+
+from Bots.BoardEncoding import COLOR_CODES
+
+NO_MOVE = -1
+
+#   Killer moves kept per ply
+KILLER_SLOTS = 2
+
+
+class OrderingTables:
+    """
+    Quiet move ordering learned from beta cutoffs, kept for a whole search
+
+    Killer moves are the last quiet moves that caused a cutoff at a given ply,
+    the butterfly history scores every (color, from square, to square) by the
+    cutoffs it caused, weighted by the remaining depth.
+    """
+
+    def __init__(self, shape: Tuple[int, int], max_ply: int = 64):
+        self.width = shape[1]
+        self.square_count = shape[0] * shape[1]
+        self.max_ply = max_ply
+
+        self.killers = np.full((max_ply, KILLER_SLOTS), NO_MOVE, dtype=np.int32)
+        self.history = np.zeros((len(COLOR_CODES), self.square_count * self.square_count), dtype=np.int64)
+
+        #   Ordering quality: share of the beta cutoffs produced by the first move searched
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+
+    def move_index(self, move) -> int:
+        """Get the index of a move in a row of the history table"""
+        (xs, ys), (xd, yd) = move
+        return (xs * self.width + ys) * self.square_count + xd * self.width + yd
+
+    def order_quiet(self, moves: List, ply: int, color: str) -> List:
+        """
+        Sort quiet moves: killers of the ply first, then by decreasing history score
+        :param moves: The quiet moves, in generation order
+        :param ply: Distance to the root of the search
+        :param color: The side to move
+        :return: The sorted moves
+        """
+        if len(moves) < 2:
+            return moves
+
+        indices = np.fromiter((self.move_index(m) for m in moves), dtype=np.int64, count=len(moves))
+        scores = self.history[COLOR_CODES[color], indices]
+        if ply < self.max_ply:
+            killers = self.killers[ply]
+            #   Above any history score, the most recent killer first
+            top = scores.max() + 1
+            scores = np.where(indices == killers[0], top + 1, np.where(indices == killers[1], top, scores))
+
+        #   Stable, so equal scores keep the generation order
+        return [moves[i] for i in np.argsort(-scores, kind="stable")]
+
+    def add_cutoff(self, move, ply: int, color: str, depth: int, quiet: bool, move_number: int):
+        """
+        Record a beta cutoff
+        :param move: The move that caused it
+        :param ply: Distance to the root of the search
+        :param color: The side that played it
+        :param depth: Remaining depth of the node
+        :param quiet: Whether the move neither captures nor promotes, only quiet moves are learned
+        :param move_number: Index of the move in the node's move order
+        """
+        self.cutoffs += 1
+        if move_number == 0:
+            self.first_move_cutoffs += 1
+
+        if not quiet:
+            return
+
+        index = self.move_index(move)
+        self.history[COLOR_CODES[color], index] += depth * depth
+        if ply < self.max_ply and self.killers[ply, 0] != index:
+            self.killers[ply, 1] = self.killers[ply, 0]
+            self.killers[ply, 0] = index
+
+    def age(self):
+        """Forget the killers and halve the history scores, e.g. before searching a new turn"""
+        self.killers.fill(NO_MOVE)
+        self.history >>= 1
+
+    def first_move_cutoff_rate(self) -> float:
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
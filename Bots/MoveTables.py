@@ -0,0 +1,216 @@
+from typing import Dict, FrozenSet, Tuple
+
+pawn_moves = [
+    (1, 0),
+]
+
+pawn_eat_moves = [
+    (1, -1),
+    (1, 1),
+]
+
+rook_moves = [
+    (0, -1),
+    (0, 1),
+    (-1, 0),
+    (1, 0),
+]
+
+knight_moves = [
+    (2, -1),
+    (2, 1),
+    (-2, -1),
+    (-2, 1),
+    (-1, -2),
+    (-1, 2),
+    (1, -2),
+    (1, 2),
+]
+
+bishop_moves = [
+    (1, 1),
+    (1, -1),
+    (-1, 1),
+    (-1, -1),
+]
+
+queen_moves = [
+    (1, 1),
+    (1, -1),
+    (-1, 1),
+    (-1, -1),
+    (0, -1),
+    (0, 1),
+    (-1, 0),
+    (1, 0),
+]
+
+king_moves = [
+    (0, -1),
+    (0, 1),
+    (-1, 0),
+    (1, 0),
+    (1, 1),
+    (1, -1),
+    (-1, 1),
+    (-1, -1),
+]
+
+pieces_moves = {
+    "p": pawn_moves,
+    "q": queen_moves,
+    "k": king_moves,
+    "b": bishop_moves,
+    "n": knight_moves,
+    "r": rook_moves,
+}
+
+can_move_k_cases = ["q", "b", "r"]
+
+Square = Tuple[int, int]
+Ray = Tuple[Square, ...]
+
+diagonal_moves = [d for d in pieces_moves["q"] if d[0] != 0 and d[1] != 0]
+axis_moves = [d for d in pieces_moves["q"] if d[0] == 0 or d[1] == 0]
+
+
+class MoveTables:
+    """
+    Precomputed targets for every square of a board shape
+
+    Every table is indexed by square number ``x * width + y``. Jumping pieces
+    (knight, king) get one single-square ray per direction so that all pieces
+    can be walked the same way. Rays follow the direction order of
+    ``PiecesMoves.pieces_moves`` and sliders are limited to ``height - 1``
+    steps, exactly like ``get_all_moves``.
+    """
+
+    def __init__(self, shape: Tuple[int, int]):
+        self.height: int = shape[0]
+        self.width: int = shape[1]
+        self.size: int = self.height * self.width
+
+        self.coords: Tuple[Square, ...] = tuple(
+            (x, y) for x in range(self.height) for y in range(self.width)
+        )
+
+        #   Rays as coordinates, for array boards
+        self.rays: Dict[str, Tuple[Tuple[Ray, ...], ...]] = {}
+        #   Same rays as square numbers, for bitboards
+        self.square_rays: Dict[str, Tuple[Tuple[Tuple[int, ...], ...], ...]] = {}
+        for piece_type, dirs in pieces_moves.items():
+            if piece_type == "p":
+                continue
+            max_dist = self.height - 1 if piece_type in can_move_k_cases else 1
+            rays = tuple(
+                tuple(r for r in (self._ray(start, d, max_dist) for d in dirs) if r)
+                for start in self.coords
+            )
+            self.rays[piece_type] = rays
+            self.square_rays[piece_type] = self._to_squares(rays)
+
+        #   Jump targets as coordinates, to look for attacking knights and kings
+        self.jumps: Dict[str, Tuple[Ray, ...]] = {
+            piece_type: tuple(tuple(ray[0] for ray in sq_rays) for sq_rays in self.rays[piece_type])
+            for piece_type in ("n", "k")
+        }
+
+        #   Non-empty queen rays of every square with their square numbers and whether
+        #   they are diagonal, to cast rays outward from a king
+        slider_lines = []
+        for start in self.coords:
+            lines = []
+            for d in pieces_moves["q"]:
+                ray = self._ray(start, d, self.height - 1)
+                if ray:
+                    lines.append((ray, tuple(self.square(*t) for t in ray), d in diagonal_moves))
+            slider_lines.append(tuple(lines))
+        self.slider_lines: Tuple[Tuple[Tuple[Ray, Tuple[int, ...], bool], ...], ...] = tuple(slider_lines)
+
+        #   Every square reachable in one jump, to check a given move
+        self.jump_targets: Dict[str, Tuple[FrozenSet[int], ...]] = {
+            piece_type: tuple(frozenset(t for ray in sq_rays for t in ray) for sq_rays in self.square_rays[piece_type])
+            for piece_type in ("n", "k")
+        }
+
+        #   Pawns moving towards the last row (forward = 1), as seen by the player to move
+        self.pawn_pushes: Tuple[Ray, ...] = self._pawn_targets(pawn_moves, 1)
+        self.pawn_captures: Tuple[Ray, ...] = self._pawn_targets(pawn_eat_moves, 1)
+        self.square_pawn_pushes = self._targets_to_squares(self.pawn_pushes)
+        self.square_pawn_captures = self._targets_to_squares(self.pawn_captures)
+
+        #   Pawns of the opponent, moving towards the first row (forward = -1)
+        self.back_pawn_pushes: Tuple[Ray, ...] = self._pawn_targets(pawn_moves, -1)
+        self.back_pawn_captures: Tuple[Ray, ...] = self._pawn_targets(pawn_eat_moves, -1)
+        self.square_back_pawn_pushes = self._targets_to_squares(self.back_pawn_pushes)
+        self.square_back_pawn_captures = self._targets_to_squares(self.back_pawn_captures)
+
+        #   Squares strictly between two aligned squares, without distance limit
+        self.diagonal_lines: Dict[Tuple[int, int], Ray] = {}
+        self.axis_lines: Dict[Tuple[int, int], Ray] = {}
+        longest = max(self.height, self.width)
+        for start in self.coords:
+            sq = self.square(*start)
+            for lines, dirs in ((self.diagonal_lines, diagonal_moves), (self.axis_lines, axis_moves)):
+                for d in dirs:
+                    ray = self._ray(start, d, longest)
+                    for i, end in enumerate(ray):
+                        lines[sq, self.square(*end)] = ray[:i]
+
+    def square(self, x: int, y: int) -> int:
+        return x * self.width + y
+
+    def _ray(self, start: Square, direction: Tuple[int, int], max_dist: int) -> Ray:
+        ray = []
+        x, y = start
+        for _ in range(max_dist):
+            x += direction[0]
+            y += direction[1]
+            if x < 0 or x >= self.height or y < 0 or y >= self.width:
+                break
+            ray.append((x, y))
+        return tuple(ray)
+
+    def _pawn_targets(self, dirs, forward: int) -> Tuple[Ray, ...]:
+        return tuple(
+            sum((self._ray(start, (d[0] * forward, d[1]), 1) for d in dirs), ()) for start in self.coords
+        )
+
+    def _targets_to_squares(self, targets):
+        return tuple(tuple(self.square(*t) for t in r) for r in targets)
+
+    def _to_squares(self, rays):
+        return tuple(tuple(tuple(self.square(*t) for t in ray) for ray in sq_rays) for sq_rays in rays)
+
+    def pawn_tables(self, forward: int) -> Tuple[Tuple[Ray, ...], Tuple[Ray, ...], int]:
+        """
+        Get the pawn targets for a moving direction
+        :param forward: 1 for pawns moving towards the last row, -1 for the opposite
+        :return: The push targets, capture targets and promotion row
+        """
+        if forward == 1:
+            return self.pawn_pushes, self.pawn_captures, self.height - 1
+        return self.back_pawn_pushes, self.back_pawn_captures, 0
+
+    def square_pawn_tables(self, forward: int) -> Tuple[Tuple[Tuple[int, ...], ...], Tuple[Tuple[int, ...], ...], int]:
+        """Same as ``pawn_tables`` with square numbers"""
+        if forward == 1:
+            return self.square_pawn_pushes, self.square_pawn_captures, self.height - 1
+        return self.square_back_pawn_pushes, self.square_back_pawn_captures, 0
+
+
+_TABLES: Dict[Tuple[int, int], MoveTables] = {}
+
+
+def get_move_tables(shape: Tuple[int, int]) -> MoveTables:
+    """
+    Get the move tables of a board shape, building them on first use
+    :param shape: The board shape (height, width)
+    :return: The shared tables for this shape
+    """
+    shape = (int(shape[0]), int(shape[1]))
+    tables = _TABLES.get(shape)
+    if tables is None:
+        tables = MoveTables(shape)
+        _TABLES[shape] = tables
+    return tables
@@ -1,119 +1,279 @@
 # player_sequence = 0w01b2
 from typing import Sequence
 import numpy as np
-import time
 from numpy.lib import _array_utils_impl
 from Bots.ChessBotList import register_chess_bot
-from Bots.PiecesMoves import get_all_moves, get_piece_value
-
-INF = 10**3
+from Bots.EngineState import SearchBot
+from Bots.Evaluation import EVAL_SCALE, Evaluation
+from Bots.LazySMP import LazySMPBot
+from Bots.RootSplit import RootSplitBot
+from Bots.BoardEncoding import COLOR_CODES
+from Bots.PiecesMoves import (
+    generate_moves_staged,
+    get_all_moves,
+    get_capture_moves,
+    get_piece_value,
+    get_promotion_moves,
+    has_non_pawn_material,
+    unmake_move,
+)
+from Bots.MoveOrdering import OrderingTables
+from Bots.SearchClock import FIRST_POLL_NODES, SearchClock, SearchTimeout
+from Bots.TranspositionTable import EXACT, LOWER, UPPER, TranspositionTable
+from Bots.Zobrist import get_zobrist_keys
+
+# Far above every score, a king alone is worth 10**6
+INF = 10**9
+TT_SIZE_MB = 4
+
+# Quiescence search over promotions and captures: captures worth less than this margin (in hundredths
+# of a pawn) above alpha are skipped, and a leaf explores at most this many nodes
+DELTA_MARGIN = 200
+QUIESCENCE_NODE_BUDGET = 2000
+
+# Principal variation search, and half width of the root window around the previous iteration's score
+USE_PVS = True
+ASPIRATION_WINDOW = 50
+
+# Null-move pruning: from this remaining depth, searching the pass NULL_MOVE_REDUCTION plies shallower
+USE_NULL_MOVE = True
+NULL_MOVE_MIN_DEPTH = 3
+NULL_MOVE_REDUCTION = 2
+
+# Late move reductions: quiet moves after the first LMR_FULL_DEPTH_MOVES are searched one ply shallower
+USE_LMR = True
+LMR_MIN_DEPTH = 3
+LMR_FULL_DEPTH_MOVES = 3
 
 
 def chess_bot(player_sequence, board, time_budget, **kwargs):
+    """
+    Optional keyword arguments:
+        - pvs / aspiration: Override USE_PVS, or disable aspiration windows
+        - null_move / lmr: Override USE_NULL_MOVE and USE_LMR
+        - max_depth: Stop deepening after this depth
+        - start_depth: First depth searched, 1 by default
+        - root_moves: Search only these root moves, in this order
+        - root_alpha: A callable returning a lower bound of the root score, e.g. the
+          best score found by other processes searching other root moves
+        - stats: A dict receiving the last completed depth ("depth"), the nodes
+          searched by every completed depth ("nodes") and the share of beta cutoffs
+          caused by the first move searched ("first_move_cutoff_rate"), and the
+          number of deadline checks ("polls"), the score of the last completed
+          depth ("score") and its bound ("bound", ``UPPER`` when no root move beat
+          alpha, ``LOWER`` on a beta cutoff, ``EXACT`` otherwise), and the hit rates
+          of the evaluation and pawn structure caches ("eval_cache_hit_rate",
+          "pawn_cache_hit_rate")
+        - state: An ``EngineState`` whose tables are reused, and updated, instead of
+          fresh ones, so the search of a turn benefits from the previous ones
+        - age: Whether ``state`` starts a new turn, True by default. Pondering searches
+          the turn ahead of time, the search after a ponder hit must not age it again
+        - stop: A callable polled with the deadline, the search ends once it returns True
+    """
     color = player_sequence[1]
-
-    safety_time = 0.01
-    deadline = time.perf_counter() + max(0, time_budget - safety_time)
+    use_pvs = kwargs.get("pvs", USE_PVS)
+    use_aspiration = kwargs.get("aspiration", ASPIRATION_WINDOW > 0)
+    use_null_move = kwargs.get("null_move", USE_NULL_MOVE)
+    use_lmr = kwargs.get("lmr", USE_LMR)
+    max_depth = kwargs.get("max_depth")
+    root_alpha = kwargs.get("root_alpha")
+    restricted = root_alpha is not None or bool(kwargs.get("root_moves"))
+    stats = kwargs.get("stats")
+    if stats is not None:
+        stats["depth"] = 0
+        stats["nodes"] = []
+
+    state = kwargs.get("state")
+    if state is not None and kwargs.get("age", True):
+        state.start_turn()
+    poll_interval = FIRST_POLL_NODES if state is None else state.poll_interval
+    clock = SearchClock(time_budget, poll_interval=poll_interval, stop=kwargs.get("stop"))
     total_node = 0
+    partial_move = None
+    root_bound = EXACT
+    quiescence_left = 0
+
+    # Positions are keyed with the color to move as turn index
+    if state is None:
+        keys = get_zobrist_keys(board.shape)
+        transposition_table = TranspositionTable(TT_SIZE_MB)
+        ordering = OrderingTables(board.shape)
+        eval_cache = pawn_cache = None
+    else:
+        keys = state.keys
+        transposition_table = state.transposition_table
+        ordering = state.ordering
+        eval_cache, pawn_cache = state.eval_cache, state.pawn_cache
+
+    def quiescence(curr_board, key, alpha, beta, side_to_move, forward):
+        nonlocal total_node, quiescence_left
+        total_node += 1
+        clock.tick()
+
+        stand_pat = (1 if side_to_move == "w" else -1) * evaluation.evaluate(key)
+        if stand_pat >= beta or quiescence_left <= 0:
+            return stand_pat
+        quiescence_left -= 1
+
+        if stand_pat > alpha:
+            alpha = stand_pat
+
+        best_score = stand_pat
+        next_side = "b" if side_to_move == "w" else "w"
+        turn, next_turn = COLOR_CODES[side_to_move], COLOR_CODES[next_side]
+
+        # Promotions, capturing or not, are always searched. Captures come most valuable
+        # victim first, once one cannot raise alpha no later one can
+        promotions = get_promotion_moves(curr_board, side_to_move, forward)
+        for i, m in enumerate(promotions + get_capture_moves(curr_board, side_to_move, forward)):
+            if (
+                i >= len(promotions)
+                and stand_pat + get_piece_value(curr_board[m[1]][0]) * EVAL_SCALE + DELTA_MARGIN <= alpha
+            ):
+                break
 
-    def evaluate(curr_board):
-        score = 0
-        for x in range(curr_board.shape[0]):
-            for y in range(curr_board.shape[1]):
-                piece = curr_board[x][y]
-
-                if len(piece) == 0:
-                    continue
-
-                value = get_piece_value(piece[0])
-
-                score += value if piece[1] == "w" else -value
-
-        return score
-
-    def apply_move(curr_board, move):
-        (fx, fy), (tx, ty) = move
+            child_key, undo = keys.make_move(curr_board, key, m, forward, turn, next_turn)
+            evaluation.apply(undo)
+            score = -quiescence(curr_board, child_key, -beta, -alpha, next_side, -forward)
+            unmake_move(curr_board, undo)
+            evaluation.unapply(undo)
 
-        new_board = curr_board.copy()
+            if score > best_score:
+                best_score = score
 
-        piece = new_board[fx][fy]
-        if piece[0] == "p" and tx == curr_board.shape[0] - 1:
-            new_board[tx][ty] = "q" + piece[1]
-        else:
-            new_board[tx][ty] = piece
-        new_board[fx][fy] = ""
+            if best_score > alpha:
+                alpha = best_score
 
-        return new_board
+            if alpha >= beta:
+                break
 
-    def time_is_up():
-        return time.perf_counter() >= deadline
+        return best_score
 
-    class SearchTimeout(Exception):
-        pass
+    def negamax(curr_board, key, depth_remaining, alpha, beta, side_to_move, forward, ply, allow_null=True):
+        nonlocal total_node, quiescence_left
+        if depth_remaining == 0:
+            quiescence_left = QUIESCENCE_NODE_BUDGET
+            return quiescence(curr_board, key, alpha, beta, side_to_move, forward)
 
-    def negamax(curr_board, depth_remaining, alpha, beta, side_to_move):
-        nonlocal total_node
         total_node += 1
-        if time_is_up():
-            raise SearchTimeout()
+        clock.tick()
 
         sign = 1 if side_to_move == "w" else -1
 
-        if depth_remaining == 0:
-            return sign * evaluate(curr_board)
-
-        moves = get_all_moves(curr_board, side_to_move)
-
-        if len(moves) == 0:
-            return sign * evaluate(curr_board)
-
+        alpha_start = alpha
+        hash_move = None
+        entry = transposition_table.probe(key)
+        if entry is not None:
+            tt_score, tt_bound, tt_depth, hash_move = entry
+            if tt_depth >= depth_remaining and (
+                tt_bound == EXACT
+                or (tt_bound == LOWER and tt_score >= beta)
+                or (tt_bound == UPPER and tt_score <= alpha)
+            ):
+                return tt_score
+
+        next_side = "b" if side_to_move == "w" else "w"
+        turn, next_turn = COLOR_CODES[side_to_move], COLOR_CODES[next_side]
+
+        # If passing still fails high, a real move would too. Not with only pawns left,
+        # where every move can make things worse (zugzwang)
+        if (
+            use_null_move
+            and allow_null
+            and depth_remaining >= NULL_MOVE_MIN_DEPTH
+            and beta < INF
+            and sign * evaluation.evaluate(key) >= beta
+            and has_non_pawn_material(curr_board, side_to_move)
+        ):
+            null_key = key ^ keys.turn_keys[turn] ^ keys.turn_keys[next_turn]
+            null_depth = max(0, depth_remaining - 1 - NULL_MOVE_REDUCTION)
+            score = -negamax(curr_board, null_key, null_depth, -beta, -beta + 1, next_side, -forward, ply + 1, False)
+            if score >= beta:
+                return score
+
+        # Quiet moves are only generated if no promotion or capture cuts off
         best_score = -INF
-
-        for m in moves:
-            child_board = apply_move(curr_board, m)
-
-            next_side = "b" if side_to_move == "w" else "w"
-
-            score = -negamax(child_board, depth_remaining - 1, -beta, -alpha, next_side)
+        best_move = None
+        searched = 0
+
+        order_quiet = lambda quiet_moves: ordering.order_quiet(quiet_moves, ply, side_to_move)
+        for m in generate_moves_staged(curr_board, side_to_move, forward, hash_move, order_quiet):
+            child_key, undo = keys.make_move(curr_board, key, m, forward, turn, next_turn)
+            evaluation.apply(undo)
+            quiet = len(undo.captured) == 0 and not undo.promoted
+            reduction = int(
+                use_lmr and quiet and searched >= LMR_FULL_DEPTH_MOVES and depth_remaining >= LMR_MIN_DEPTH
+            )
+
+            if searched == 0 or (not use_pvs and reduction == 0):
+                score = -negamax(curr_board, child_key, depth_remaining - 1, -beta, -alpha, next_side, -forward, ply + 1)
+            else:
+                # Prove the move is not better than the best one, search it fully only if it is
+                child_depth = depth_remaining - 1 - reduction
+                score = -negamax(curr_board, child_key, child_depth, -alpha - 1, -alpha, next_side, -forward, ply + 1)
+                if reduction and score > alpha and use_pvs:
+                    child_depth = depth_remaining - 1
+                    score = -negamax(curr_board, child_key, child_depth, -alpha - 1, -alpha, next_side, -forward, ply + 1)
+                if score > alpha and (score < beta or child_depth < depth_remaining - 1):
+                    score = -negamax(curr_board, child_key, depth_remaining - 1, -beta, -alpha, next_side, -forward, ply + 1)
+            unmake_move(curr_board, undo)
+            evaluation.unapply(undo)
+            searched += 1
 
             if score > best_score:
                 best_score = score
+                best_move = m
 
             if best_score > alpha:
                 alpha = best_score
 
             if alpha >= beta:
+                ordering.add_cutoff(m, ply, side_to_move, depth_remaining, quiet, searched - 1)
                 break
 
+        if searched == 0:
+            return sign * evaluation.evaluate(key)
+
+        if best_score <= alpha_start:
+            bound = UPPER
+        elif best_score >= beta:
+            bound = LOWER
+        else:
+            bound = EXACT
+        transposition_table.store(key, depth_remaining, best_score, bound, best_move)
+
         return best_score
 
-    def find_best_move(curr_board, side_to_move, depth):
-        nonlocal total_node
+    def find_best_move(curr_board, root_key, root_moves, depth, alpha, beta):
+        """Search the root moves in order, recording the score of every one of them in root_scores"""
+        nonlocal total_node, partial_move, root_bound
         total_node += 1
-        moves = get_all_moves(curr_board, side_to_move)
 
-        if len(moves) == 0:
-            for x in range(curr_board.shape[0]):
-                for y in range(curr_board.shape[1]):
-                    piece = curr_board[x][y]
-                    if len(piece) > 0 and piece[1] == side_to_move:
-                        return (x, y), (x, y)
-            return (0, 0), (0, 0)
+        side_to_move = color
+        next_side = "b" if side_to_move == "w" else "w"
+        turn, next_turn = COLOR_CODES[side_to_move], COLOR_CODES[next_side]
 
-        best_move = moves[0]
+        best_move = root_moves[0]
         best_score = -INF
+        if root_alpha is not None:
+            alpha = max(alpha, root_alpha())
+        alpha_start = alpha
 
-        alpha = -INF
-        beta = INF
-
-        for m in moves:
-            if time_is_up():
+        for i, m in enumerate(root_moves):
+            if clock.time_is_up():
                 raise SearchTimeout()
 
-            child = apply_move(curr_board, m)
-            next_side = "b" if side_to_move == "w" else "w"
-
-            score = -negamax(child, depth - 1, -beta, -alpha, next_side)
+            child_key, undo = keys.make_move(curr_board, root_key, m, 1, turn, next_turn)
+            evaluation.apply(undo)
+            if i == 0 or not use_pvs:
+                score = -negamax(curr_board, child_key, depth - 1, -beta, -alpha, next_side, -1, 1)
+            else:
+                score = -negamax(curr_board, child_key, depth - 1, -alpha - 1, -alpha, next_side, -1, 1)
+                if alpha < score < beta:
+                    score = -negamax(curr_board, child_key, depth - 1, -beta, -alpha, next_side, -1, 1)
+            unmake_move(curr_board, undo)
+            evaluation.unapply(undo)
+            root_scores[m] = score
 
             if score > best_score:
                 best_score = score
@@ -121,33 +281,128 @@ def chess_bot(player_sequence, board, time_budget, **kwargs):
 
             if score > alpha:
                 alpha = score
+                # Beats the previous best move of this depth, safe to play if time runs out
+                partial_move = m
 
-        return best_move
+            if alpha >= beta:
+                break
 
-    best_move = (0, 0), (0, 0)
-    depth = 1
-    try:
+        if best_score <= alpha_start:
+            bound = UPPER
+        elif best_score >= beta:
+            bound = LOWER
+        else:
+            bound = EXACT
+        if not restricted:
+            transposition_table.store(root_key, depth, best_score, bound, best_move)
+        elif bound != UPPER:
+            # Only some root moves, or only scores above an outside alpha, were searched: the score
+            # of a move is a lower bound of the position, a fail low bounds nothing
+            transposition_table.store(root_key, depth, best_score, LOWER, best_move)
+        root_bound = bound
+        return best_move, best_score
+
+    def search_depth(curr_board, root_key, root_moves, depth, previous_score):
+        """Search a depth in a window around the previous score, widened until the score falls inside"""
+        window = ASPIRATION_WINDOW
+        alpha, beta = -INF, INF
+        if use_aspiration and previous_score is not None:
+            alpha, beta = previous_score - window, previous_score + window
+
+        # A bound is widened until the score falls inside, never clamped: the window cannot invert
         while True:
-            if time_is_up():
-                raise SearchTimeout()
-            moves = get_all_moves(board, color)
-
-            if len(moves) == 0:
-                for x in range(board.shape[0]):
-                    for y in range(board.shape[1]):
-                        piece = board[x][y]
-                        if len(piece) > 0 and piece[1] == color:
-                            return (x, y), (x, y)
-                return (0, 0), (0, 0)
-
-            best_move = find_best_move(board, color, depth)
+            move, score = find_best_move(curr_board, root_key, root_moves, depth, alpha, beta)
+            if score <= alpha and alpha != -INF:
+                alpha = score - window
+            elif score >= beta and beta != INF:
+                beta = score + window
+            else:
+                return move, score
+            window *= 2
+
+    root_moves = list(kwargs["root_moves"]) if kwargs.get("root_moves") else get_all_moves(board, color)
+    if len(root_moves) == 0:
+        for x in range(board.shape[0]):
+            for y in range(board.shape[1]):
+                piece = board[x][y]
+                if len(piece) > 0 and piece[1] == color:
+                    return (x, y), (x, y)
+        return (0, 0), (0, 0)
+
+    # The search moves pieces in place, the given board is only read
+    search_board = board.copy()
+    root_key = keys.compute(search_board, COLOR_CODES[color])
+    evaluation = Evaluation(search_board, color, get_piece_value, eval_cache, pawn_cache)
+    root_scores = {}
+
+    best_move = root_moves[0]
+    best_score = None
+    depth = kwargs.get("start_depth", 1)
+    try:
+        while max_depth is None or depth <= max_depth:
+            # Rather than starting a depth that cannot finish, leave the time to later turns
+            if not clock.can_finish_next_iteration():
+                break
+            clock.start_iteration()
+
+            # Set once a move of this depth beats the best score so far inside the window
+            partial_move = None
+            nodes_before = total_node
+            best_move, best_score = search_depth(search_board, root_key, root_moves, depth, best_score)
+            clock.end_iteration()
+
+            # Next depth starts with the best moves of this one
+            root_moves.sort(key=lambda m: root_scores.get(m, -INF), reverse=True)
+            root_moves.remove(best_move)
+            root_moves.insert(0, best_move)
+
+            if stats is not None:
+                stats["depth"] = depth
+                stats["nodes"].append(total_node - nodes_before)
+                stats["first_move_cutoff_rate"] = ordering.first_move_cutoff_rate()
+                stats["polls"] = clock.polls
+                stats["score"] = best_score
+                stats["bound"] = root_bound
+                stats["eval_cache_hit_rate"] = evaluation.eval_cache.hit_rate()
+                stats["pawn_cache_hit_rate"] = evaluation.pawn_cache.hit_rate()
             depth += 1
     except SearchTimeout:
+        if partial_move is not None:
+            best_move = partial_move
         # print("Max depth:", depth)
         # print("Node visited:", total_node)
         pass
 
+    if state is not None:
+        state.poll_interval = clock.poll_interval
     return best_move[0], best_move[1]
 
 
-register_chess_bot("NegaMax_ThinkR", chess_bot)
+class NegaMaxThinkRBot(SearchBot):
+    """``chess_bot`` keeping its transposition table and move ordering tables for the whole game"""
+
+    search = staticmethod(chess_bot)
+    tt_size_mb = TT_SIZE_MB
+
+
+register_chess_bot("NegaMax_ThinkR", NegaMaxThinkRBot)
+
+
+class NegaMaxThinkRSMPBot(LazySMPBot):
+    """``chess_bot`` searching with helper processes sharing its transposition table"""
+
+    search = staticmethod(chess_bot)
+    tt_size_mb = TT_SIZE_MB
+
+
+register_chess_bot("NegaMax_ThinkR_SMP", NegaMaxThinkRSMPBot)
+
+
+class NegaMaxThinkRRootSplitBot(RootSplitBot):
+    """``chess_bot`` searching the root moves in parallel over a process pool"""
+
+    search = staticmethod(chess_bot)
+    tt_size_mb = TT_SIZE_MB
+
+
+register_chess_bot("NegaMax_ThinkR_RootSplit", NegaMaxThinkRRootSplitBot)
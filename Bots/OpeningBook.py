@@ -0,0 +1,103 @@
+import bisect
+import os
+import random
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from Bots.TranspositionTable import pack_move, unpack_move
+
+#   Opening book file
+#       A flat array of (key, move, weight) records sorted by key, nothing else.
+#       Keys are the Zobrist keys of positions as seen by the player to move, with
+#       its color as turn index, like the root key of the search bots. Moves are
+#       packed with ``pack_move``, in the same orientation.
+
+BOOK_DTYPE = np.dtype([("key", "<u8"), ("move", "<i4"), ("weight", "<u4")])
+
+BOOK_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Data", "books")
+BOOK_PATH = os.path.join(BOOK_DIRECTORY, "openings.book")
+
+
+def write_book(path: str, entries: Iterable[Tuple[int, tuple, int]]):
+    """
+    Write a book file
+    :param path: The file to write
+    :param entries: The (key, move, weight) entries, weights of repeated (key, move) pairs add up
+    """
+    weights: Dict[Tuple[int, int], int] = {}
+    for key, move, weight in entries:
+        packed = (key, pack_move(move))
+        weights[packed] = weights.get(packed, 0) + weight
+
+    records = np.array([(key, move, weight) for (key, move), weight in weights.items()], dtype=BOOK_DTYPE)
+    records.sort(order=["key", "weight"])
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    records.tofile(path)
+
+
+class OpeningBook:
+    """
+    Read-only opening book, memory mapped
+
+    Opening a book reads nothing: records are paged in by the binary searches of
+    the lookups.
+    """
+
+    def __init__(self, path: str = BOOK_PATH):
+        if os.path.getsize(path) == 0:
+            self.records = np.zeros(0, dtype=BOOK_DTYPE)
+        else:
+            self.records = np.memmap(path, dtype=BOOK_DTYPE, mode="r")
+        #   A view of the mapped file, not a copy
+        self.keys = self.records["key"]
+
+        self.probes = 0
+        self.hits = 0
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def moves(self, key: int) -> List[Tuple[tuple, int]]:
+        """
+        Look a position up
+        :param key: The Zobrist key of the position
+        :return: The (move, weight) pairs of the position, empty if it is not in the book
+        """
+        self.probes += 1
+        start = bisect.bisect_left(self.keys, key)
+        end = bisect.bisect_right(self.keys, key, lo=start)
+        if start == end:
+            return []
+        self.hits += 1
+        return [(unpack_move(int(r["move"])), int(r["weight"])) for r in self.records[start:end]]
+
+    def choose(self, key: int, rng: Optional[random.Random] = None) -> Optional[tuple]:
+        """
+        Choose the move of a position
+        :param key: The Zobrist key of the position
+        :param rng: Draws a move with a probability proportional to its weight, the heaviest one is taken if ``None``
+        :return: The move, ``None`` if the position is not in the book
+        """
+        moves = self.moves(key)
+        if not moves:
+            return None
+        if rng is None:
+            return max(moves, key=lambda m: m[1])[0]
+        return rng.choices([m for m, _ in moves], weights=[w for _, w in moves])[0]
+
+    def hit_rate(self) -> float:
+        return self.hits / self.probes if self.probes else 0.0
+
+    def __repr__(self):
+        return f"OpeningBook({len(self)} records, {self.probes} probes, {self.hits} hits)"
+
+
+_BOOKS: Dict[str, Optional[OpeningBook]] = {}
+
+
+def get_opening_book(path: str = BOOK_PATH) -> Optional[OpeningBook]:
+    """Get the (cached) book of a file, ``None`` if the file does not exist"""
+    if path not in _BOOKS:
+        _BOOKS[path] = OpeningBook(path) if os.path.isfile(path) else None
+    return _BOOKS[path]
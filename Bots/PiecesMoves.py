@@ -1,71 +1,12 @@
-from typing import Sequence, Tuple
-
-pawn_moves = [
-    (1, 0),
-]
-
-pawn_eat_moves = [
-    (1, -1),
-    (1, 1),
-]
-
-rook_moves = [
-    (0, -1),
-    (0, 1),
-    (-1, 0),
-    (1, 0),
-]
-
-knight_moves = [
-    (2, -1),
-    (2, 1),
-    (-2, -1),
-    (-2, 1),
-    (-1, -2),
-    (-1, 2),
-    (1, -2),
-    (1, 2),
-]
-
-bishop_moves = [
-    (1, 1),
-    (1, -1),
-    (-1, 1),
-    (-1, -1),
-]
-
-queen_moves = [
-    (1, 1),
-    (1, -1),
-    (-1, 1),
-    (-1, -1),
-    (0, -1),
-    (0, 1),
-    (-1, 0),
-    (1, 0),
-]
-
-king_moves = [
-    (0, -1),
-    (0, 1),
-    (-1, 0),
-    (1, 0),
-    (1, 1),
-    (1, -1),
-    (-1, 1),
-    (-1, -1),
-]
-
-pieces_moves = {
-    "p": pawn_moves,
-    "q": queen_moves,
-    "k": king_moves,
-    "b": bishop_moves,
-    "n": knight_moves,
-    "r": rook_moves,
-}
-
-can_move_k_cases = ["q", "b", "r"]
+from typing import NamedTuple, Sequence, Tuple
+
+from Bots.MoveTables import (
+    can_move_k_cases,
+    get_move_tables,
+    pawn_eat_moves,
+    pawn_moves,
+    pieces_moves,
+)
 
 
 def get_piece_value(piece: str) -> int:
@@ -86,102 +27,409 @@ def get_piece_value(piece: str) -> int:
             return 0
 
 
-def get_all_moves(board, side_color) -> Sequence[Sequence[int]]:
+def get_all_moves(board, side_color, forward=1) -> Sequence[Sequence[int]]:
+    """
+    Generate every pseudo-legal move of a side
+
+    Captures come first, sorted by victim value, then promotions, then quiet moves.
+    :param board: The board, as seen by the bot
+    :param side_color: The color to generate moves for
+    :param forward: 1 if the side's pawns move towards the last row (the bot itself),
+                    -1 if they move towards the first row (its opponent). This lets a
+                    search generate the opponent's moves without rotating the board
+    :return: The list of moves ((xs, ys), (xd, yd))
+    """
     eat_moves = []
     upgrade_moves = []
     normal_moves = []
 
-    def get_pieces_moves(position: Tuple[int, int], board):
-        nonlocal eat_moves
-        nonlocal upgrade_moves
-        nonlocal normal_moves
+    tables = get_move_tables(board.shape)
+    piece_rays = tables.rays
+    pawn_pushes, pawn_captures, last_row = tables.pawn_tables(forward)
 
-        # Retrieve the piece to find moves
-        piece = board[position[0]][position[1]]
-        piece_type = piece[0]
-        color = piece[1]
+    for sq, position in enumerate(tables.coords):
+        piece = board[position]
+        if len(piece) == 0 or piece[1] != side_color:
+            continue
 
-        # Get directions for the piece
-        dirs = pieces_moves[piece_type]
-        # Maximum distance the piece can travel
-        max_dist = 1 if piece_type not in can_move_k_cases else board.shape[0] - 1
+        piece_type = piece[0]
 
-        for direction in dirs:
-            for i in range(1, max_dist + 1):
-                # Compute new positions
-                nx = i * direction[0] + position[0]
-                ny = i * direction[1] + position[1]
+        # Pawns only move forward onto empty cases and eat diagonally
+        if piece_type == "p":
+            for target in pawn_pushes[sq]:
+                if len(board[target]) != 0:
+                    continue
+                if target[0] == last_row:
+                    upgrade_moves.append((position, target))
+                else:
+                    normal_moves.append((position, target))
 
-                # If out of board, skip move
-                if nx < 0 or nx >= board.shape[0] or ny < 0 or ny >= board.shape[1]:
-                    break
+            for target in pawn_captures[sq]:
+                case_content = board[target]
+                if len(case_content) == 0 or case_content[1] == side_color:
+                    continue
+                if target[0] != last_row:
+                    eat_moves.append(((position, target), get_piece_value(case_content[0])))
+                else:
+                    upgrade_moves.append((position, target))
+            continue
 
-                # Retrieve content on the case at new position
-                case_content = board[nx][ny]
+        # Walk every ray until it is blocked
+        for ray in piece_rays[piece_type][sq]:
+            for target in ray:
+                case_content = board[target]
 
                 # if case is empty, can move onto the case
                 if len(case_content) == 0:
-                    if piece_type != "p":
-                        normal_moves.append(((position[0], position[1]), (nx, ny)))
-                    elif nx == board.shape[0] - 1:
-                        upgrade_moves.append(((position[0], position[1]), (nx, ny)))
-                    else:
-                        normal_moves.append(((position[0], position[1]), (nx, ny)))
-
+                    normal_moves.append((position, target))
                     continue
 
-                if case_content[1] == color:
-                    break
+                # If case contains a piece of another color, can eat it
+                if case_content[1] != side_color:
+                    eat_moves.append(((position, target), get_piece_value(case_content[0])))
+                break
 
-                # If case contains a piece of same color, can't move onto the case
-                if case_content[1] != color and piece_type != "p":
-                    eat_moves.append(
-                        (
-                            ((position[0], position[1]), (nx, ny)),
-                            get_piece_value(case_content[0]),
-                        )
-                    )
-                    break
+    eat_moves.sort(key=lambda m: m[1], reverse=True)
+    moves = [m[0] for m in eat_moves] + upgrade_moves + normal_moves
+    return moves
 
-        # If the piece to move is a pawn, can eat in specific conditions
-        if piece_type == "p":
-            for direction in pawn_eat_moves:
-                # Compute new positions
-                nx = direction[0] + position[0]
-                ny = direction[1] + position[1]
 
-                # If out of board, skip move
-                if nx < 0 or nx >= board.shape[0] or ny < 0 or ny >= board.shape[1]:
-                    continue
+def get_own_pieces(board, side_color):
+    """Get the (square number, position, piece type) of every piece of a side, in board-scan order"""
+    res = []
+    for sq, position in enumerate(get_move_tables(board.shape).coords):
+        piece = board[position]
+        if len(piece) != 0 and piece[1] == side_color:
+            res.append((sq, position, piece[0]))
+    return res
 
-                # Retrieve content on the case at new position
-                case_content = board[nx][ny]
 
-                # if case is empty, can't move onto the case
-                if len(case_content) == 0:
-                    continue
+def get_promotion_moves(board, side_color, forward=1):
+    """Get the pawn moves, pushes then captures, reaching the promotion row"""
+    tables = get_move_tables(board.shape)
+    pawn_pushes, pawn_captures, last_row = tables.pawn_tables(forward)
+    row = last_row - forward
+    if row < 0 or row >= board.shape[0]:
+        return []
+
+    pawn = "p" + side_color
+    moves = []
+    for y in range(board.shape[1]):
+        position = (row, y)
+        if board[position] != pawn:
+            continue
+        sq = tables.square(row, y)
+        for target in pawn_pushes[sq]:
+            if len(board[target]) == 0:
+                moves.append((position, target))
+        for target in pawn_captures[sq]:
+            case_content = board[target]
+            if len(case_content) != 0 and case_content[1] != side_color:
+                moves.append((position, target))
+    return moves
+
+
+def get_capture_moves(board, side_color, forward=1, pieces=None):
+    """
+    Get the non-promoting captures, most valuable victim first
+    :param pieces: The result of ``get_own_pieces``, if already known
+    """
+    tables = get_move_tables(board.shape)
+    piece_rays = tables.rays
+    _, pawn_captures, last_row = tables.pawn_tables(forward)
 
-                # If case contains a piece of same color, can't move onto the case
-                if case_content[1] != color:
-                    if nx < board.shape[0] - 1:
-                        eat_moves.append(
-                            (
-                                ((position[0], position[1]), (nx, ny)),
-                                get_piece_value(case_content[0]),
-                            )
-                        )
-                    else:
-                        upgrade_moves.append(((position[0], position[1]), (nx, ny)))
-
-    for x in range(board.shape[0]):
-        for y in range(board.shape[1]):
-            try:
-                if len(board[x][y]) <= 0 or board[x][y][1] != side_color:
+    eat_moves = []
+    for sq, position, piece_type in pieces if pieces is not None else get_own_pieces(board, side_color):
+        if piece_type == "p":
+            for target in pawn_captures[sq]:
+                case_content = board[target]
+                if len(case_content) != 0 and case_content[1] != side_color and target[0] != last_row:
+                    eat_moves.append(((position, target), get_piece_value(case_content[0])))
+            continue
+
+        for ray in piece_rays[piece_type][sq]:
+            for target in ray:
+                case_content = board[target]
+                if len(case_content) == 0:
                     continue
-            except Exception:
-                print(board, x, y, board[x][y])
-            get_pieces_moves((x, y), board)
+                if case_content[1] != side_color:
+                    eat_moves.append(((position, target), get_piece_value(case_content[0])))
+                break
 
     eat_moves.sort(key=lambda m: m[1], reverse=True)
-    moves = [m[0] for m in eat_moves] + upgrade_moves + normal_moves
-    return moves
+    return [m[0] for m in eat_moves]
+
+
+def get_quiet_moves(board, side_color, forward=1, pieces=None):
+    """
+    Get the non-promoting moves onto empty squares
+    :param pieces: The result of ``get_own_pieces``, if already known
+    """
+    tables = get_move_tables(board.shape)
+    piece_rays = tables.rays
+    pawn_pushes, _, last_row = tables.pawn_tables(forward)
+
+    normal_moves = []
+    for sq, position, piece_type in pieces if pieces is not None else get_own_pieces(board, side_color):
+        if piece_type == "p":
+            for target in pawn_pushes[sq]:
+                if len(board[target]) == 0 and target[0] != last_row:
+                    normal_moves.append((position, target))
+            continue
+
+        for ray in piece_rays[piece_type][sq]:
+            for target in ray:
+                if len(board[target]) != 0:
+                    break
+                normal_moves.append((position, target))
+    return normal_moves
+
+
+def generate_moves_staged(board, side_color, forward=1, first_move=None, order_quiet=None):
+    """
+    Lazily generate the same moves as ``get_all_moves``, stage by stage
+
+    Promotions come first, then captures by decreasing victim value, then quiet
+    moves. A stage is only generated once the previous one is exhausted, so a
+    search stopping at the first moves skips most of the work. The board may be
+    modified between two moves as long as it is restored before asking for the next one.
+    :param first_move: A move to try before all others, e.g. from a transposition table.
+        It is only checked to start on a piece of the side, and is not repeated later
+    :param order_quiet: A function sorting the list of quiet moves, e.g. by history score
+    """
+    if first_move is not None:
+        piece = board[first_move[0]]
+        if len(piece) != 0 and piece[1] == side_color:
+            yield first_move
+        else:
+            first_move = None
+
+    for move in get_promotion_moves(board, side_color, forward):
+        if move != first_move:
+            yield move
+
+    pieces = get_own_pieces(board, side_color)
+    for move in get_capture_moves(board, side_color, forward, pieces):
+        if move != first_move:
+            yield move
+    quiet_moves = get_quiet_moves(board, side_color, forward, pieces)
+    if order_quiet is not None:
+        quiet_moves = order_quiet(quiet_moves)
+    for move in quiet_moves:
+        if move != first_move:
+            yield move
+
+
+def is_quiet_move(board, move, forward=1) -> bool:
+    """Check that a move neither captures nor promotes"""
+    start, end = move
+    if len(board[end]) != 0:
+        return False
+    return board[start][0] != "p" or end[0] != (board.shape[0] - 1 if forward == 1 else 0)
+
+
+def has_non_pawn_material(board, color) -> bool:
+    """Check that a side has a piece other than pawns and kings, passing is rarely good without one"""
+    for piece in board.flat:
+        if len(piece) != 0 and piece[1] == color and piece[0] not in ("p", "k"):
+            return True
+    return False
+
+
+class UndoRecord(NamedTuple):
+    """Everything needed to take back a move applied by ``make_move``"""
+
+    move: Tuple[Tuple[int, int], Tuple[int, int]]
+    piece: object
+    captured: object
+    promoted: bool
+
+
+def make_move(board, move, forward=1) -> UndoRecord:
+    """
+    Apply a move in place
+
+    Pawns reaching their promotion row become queens.
+    :param board: The board to modify
+    :param move: The move ((xs, ys), (xd, yd))
+    :param forward: Moving direction of the side's pawns, see ``get_all_moves``
+    :return: The record to give to ``unmake_move`` to restore the board
+    """
+    start, end = move
+    piece = board[start]
+    captured = board[end]
+
+    promoted = piece[0] == "p" and end[0] == (board.shape[0] - 1 if forward == 1 else 0)
+    board[end] = "q" + piece[1] if promoted else piece
+    board[start] = ""
+
+    return UndoRecord(move, piece, captured, promoted)
+
+
+def unmake_move(board, undo: UndoRecord):
+    """
+    Take back a move applied by ``make_move``
+    :param board: The board the move was applied on
+    :param undo: The record returned by ``make_move``
+    """
+    start, end = undo.move
+    board[start] = undo.piece
+    board[end] = undo.captured
+
+
+def get_opponent_color(color: str) -> str:
+    return "b" if color == "w" else "w"
+
+
+def is_square_attacked(board, square, by_color, by_forward=-1, ignore=None) -> bool:
+    """
+    Check if a piece of a color could capture on a square
+
+    Casts rays outward from the square instead of generating every move of the attacker.
+    :param board: The board
+    :param square: The attacked square (x, y)
+    :param by_color: The attacking color
+    :param by_forward: Moving direction of the attacker's pawns, see ``get_all_moves``
+    :param ignore: A square considered empty, e.g. the one a king is leaving
+    :return: ``True`` if the square is attacked
+    """
+    tables = get_move_tables(board.shape)
+    sq = tables.square(square[0], square[1])
+
+    # An attacking pawn stands where our own pawn would capture from the square
+    for pos in tables.pawn_tables(-by_forward)[1][sq]:
+        if board[pos] == "p" + by_color:
+            return True
+
+    for piece_type in ("n", "k"):
+        attacker = piece_type + by_color
+        for pos in tables.jumps[piece_type][sq]:
+            if board[pos] == attacker:
+                return True
+
+    for ray, _, diagonal in tables.slider_lines[sq]:
+        slider = "b" if diagonal else "r"
+        for pos in ray:
+            if pos == ignore:
+                continue
+            case_content = board[pos]
+            if len(case_content) == 0:
+                continue
+            if case_content[1] == by_color and case_content[0] in ("q", slider):
+                return True
+            break
+
+    return False
+
+
+def find_king(board, color):
+    king = "k" + color
+    for position in get_move_tables(board.shape).coords:
+        if board[position] == king:
+            return position
+    return None
+
+
+def is_king_safe(board, color, forward=1, enemy_color=None) -> bool:
+    """Check that the king of a color exists and cannot be captured by the opponent"""
+    king_pos = find_king(board, color)
+    if king_pos is None:
+        return False
+
+    if enemy_color is None:
+        enemy_color = get_opponent_color(color)
+    return not is_square_attacked(board, king_pos, enemy_color, -forward)
+
+
+def filter_legal_moves(board, color, moves, forward=1, enemy_color=None):
+    """
+    Keep the moves which do not leave the king capturable
+
+    Check and pin masks are computed once from the king position, so every
+    move is then tested with a few bit operations. Only king moves need to
+    query whether their destination is attacked.
+    :param board: The board
+    :param color: The color of the moving side
+    :param moves: Its pseudo-legal moves
+    :param forward: Moving direction of the side's pawns, see ``get_all_moves``
+    :param enemy_color: The opponent color, by default the other one of white and black
+    :return: The legal moves, in the same order
+    """
+    king_pos = find_king(board, color)
+    if king_pos is None:
+        return []
+
+    if enemy_color is None:
+        enemy_color = get_opponent_color(color)
+
+    tables = get_move_tables(board.shape)
+    square = tables.square
+    king_sq = square(king_pos[0], king_pos[1])
+
+    # Squares a non-king move must reach when in check: the checker and the squares in between
+    checkers = 0
+    check_mask = 0
+    # For every pinned piece, the squares of the line it must stay on
+    pin_masks = {}
+
+    for pos in tables.pawn_tables(forward)[1][king_sq]:
+        if board[pos] == "p" + enemy_color:
+            checkers += 1
+            check_mask |= 1 << square(pos[0], pos[1])
+
+    for piece_type in ("n", "k"):
+        attacker = piece_type + enemy_color
+        for pos in tables.jumps[piece_type][king_sq]:
+            if board[pos] == attacker:
+                checkers += 1
+                check_mask |= 1 << square(pos[0], pos[1])
+
+    for ray, ray_squares, diagonal in tables.slider_lines[king_sq]:
+        slider = "b" if diagonal else "r"
+        line = 0
+        pinned = None
+        for pos, sq in zip(ray, ray_squares):
+            line |= 1 << sq
+            case_content = board[pos]
+            if len(case_content) == 0:
+                continue
+
+            if case_content[1] == enemy_color and case_content[0] in ("q", slider):
+                if pinned is None:
+                    checkers += 1
+                    check_mask |= line
+                else:
+                    pin_masks[pinned] = line
+                break
+
+            if case_content[1] == color and pinned is None:
+                pinned = sq
+                continue
+            break
+
+    legal = []
+    for move in moves:
+        start, end = move
+        if start == king_pos:
+            if not is_square_attacked(board, end, enemy_color, -forward, ignore=king_pos):
+                legal.append(move)
+            continue
+
+        # Two checkers cannot be dealt with by a single non-king move
+        if checkers > 1:
+            continue
+
+        end_sq = square(end[0], end[1])
+        if checkers and not check_mask >> end_sq & 1:
+            continue
+
+        pin = pin_masks.get(square(start[0], start[1]))
+        if pin is not None and not pin >> end_sq & 1:
+            continue
+
+        legal.append(move)
+    return legal
+
+
+def get_legal_moves(board, color, forward=1, enemy_color=None):
+    return filter_legal_moves(board, color, get_all_moves(board, color, forward), forward, enemy_color)
@@ -0,0 +1,215 @@
+import concurrent.futures
+import multiprocessing
+import os
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from Bots.EngineState import EngineState, SearchBot
+from Bots.PiecesMoves import get_all_moves
+from Bots.SearchClock import SearchClock
+from Bots.TranspositionTable import UPPER
+
+#   Root splitting
+#       Every iteration of the deepening, each root move is searched by a task of a
+#       process pool. The best score found so far is shared through shared memory
+#       and used as alpha by the tasks starting later, so they still prune.
+
+ROOT_CONTEXT = multiprocessing.get_context("spawn")
+ROOT_WORKERS = os.cpu_count() or 2
+
+#   Seconds waited for running tasks to stop at the deadline
+STOP_TIMEOUT = 0.05
+
+#   Slots of the shared int64 array, and the alpha of an iteration without any result yet
+ALPHA, STOP, ITERATION = 0, 1, 2
+NO_ALPHA = -(2**62)
+
+_shared = None
+_shared_lock = None
+_worker_states = {}
+
+
+def init_root_worker(memory_name, lock):
+    """Initializer of the pool processes: attach to the shared alpha"""
+    global _shared, _shared_lock
+    memory = shared_memory.SharedMemory(name=memory_name)
+    _shared = (memory, np.ndarray(3, dtype=np.int64, buffer=memory.buf))
+    _shared_lock = lock
+
+
+def warm_up():
+    """Empty task, submitted to start the pool processes ahead of the first turn"""
+
+
+def read_alpha() -> int:
+    return int(_shared[1][ALPHA])
+
+
+def is_stopped() -> bool:
+    return bool(_shared[1][STOP])
+
+
+def raise_alpha(score: int, iteration: int):
+    values = _shared[1]
+    with _shared_lock:
+        if values[ITERATION] == iteration and score > values[ALPHA]:
+            values[ALPHA] = score
+
+
+def search_root_move(search, player_sequence, board, move, depth, iteration, time_budget, options):
+    """
+    Search one root move to a fixed depth in a pool process
+    :return: The move, its score (``None`` if stopped), whether the score is exact
+             rather than an upper bound, and the nodes searched
+    """
+    tt_size_mb = options.pop("tt_size_mb")
+    state = _worker_states.get(board.shape)
+    if state is None:
+        state = _worker_states[board.shape] = EngineState(board.shape, tt_size_mb)
+
+    stats = {}
+    search(
+        player_sequence,
+        board,
+        time_budget,
+        state=state,
+        stats=stats,
+        stop=is_stopped,
+        root_moves=[move],
+        root_alpha=read_alpha,
+        start_depth=depth,
+        max_depth=depth,
+        aspiration=False,
+        **options,
+    )
+    nodes = sum(stats.get("nodes", []))
+    if stats.get("depth") != depth:
+        return move, None, False, nodes
+
+    #   Exactness comes from the alpha the search read at its root, others may have raised it since
+    score = stats["score"]
+    raise_alpha(score, iteration)
+    return move, score, stats["bound"] != UPPER, nodes
+
+
+class RootSplitBot(SearchBot):
+    """
+    Search bot splitting the root moves of every iteration over a process pool
+
+    The pool is created once per game, so process start-up does not count in the
+    turns' time budget. The first move of an iteration is the best one of the
+    previous iteration, the others follow by decreasing subtree size of the previous
+    iteration, so idle processes pick the large subtrees first.
+    """
+
+    workers = ROOT_WORKERS
+    ponders = False
+    generate_root_moves = staticmethod(get_all_moves)
+
+    def __init__(self):
+        super().__init__()
+        self.pool = None
+        self.memory = None
+        self.shared = None
+        self.iteration = 0
+
+    def new_game(self, player_sequence, board):
+        self.end_game()
+        super().new_game(player_sequence, board)
+        self.memory = shared_memory.SharedMemory(create=True, size=3 * 8)
+        self.shared = np.ndarray(3, dtype=np.int64, buffer=self.memory.buf)
+        self.shared[:] = (NO_ALPHA, 0, 0)
+        self.pool = concurrent.futures.ProcessPoolExecutor(
+            self.workers,
+            mp_context=ROOT_CONTEXT,
+            initializer=init_root_worker,
+            initargs=(self.memory.name, ROOT_CONTEXT.Lock()),
+        )
+        for _ in range(self.workers):
+            self.pool.submit(warm_up)
+
+    def think(self, player_sequence, board, time_budget, **kwargs):
+        if self.state is None or self.state.shape != board.shape:
+            self.new_game(player_sequence, board)
+
+        root_moves = self.generate_root_moves(board, player_sequence[1])
+        if len(root_moves) < 2:
+            return type(self).search(player_sequence, board, time_budget, state=self.state, **kwargs)
+
+        max_depth = kwargs.pop("max_depth", None)
+        stats = kwargs.pop("stats", None)
+        if stats is not None:
+            stats["depth"] = 0
+            stats["nodes"] = []
+        options = dict(kwargs, tt_size_mb=self.tt_size_mb)
+
+        clock = SearchClock(time_budget)
+        best_move = root_moves[0]
+        subtree_nodes = {}
+        depth = 1
+        while max_depth is None or depth <= max_depth:
+            if not clock.can_finish_next_iteration():
+                break
+            clock.start_iteration()
+
+            self.iteration += 1
+            self.shared[:] = (NO_ALPHA, 0, self.iteration)
+            order = [best_move] + sorted(
+                (m for m in root_moves if m != best_move), key=lambda m: subtree_nodes.get(m, 0), reverse=True
+            )
+            futures = [
+                self.pool.submit(
+                    search_root_move,
+                    type(self).search,
+                    player_sequence,
+                    board,
+                    move,
+                    depth,
+                    self.iteration,
+                    clock.remaining(),
+                    dict(options),
+                )
+                for move in order
+            ]
+            done, running = concurrent.futures.wait(futures, timeout=clock.remaining())
+            if running:
+                #   Out of time: cancel the waiting tasks and stop the running ones
+                self.shared[STOP] = 1
+                for future in running:
+                    future.cancel()
+                concurrent.futures.wait(running, timeout=STOP_TIMEOUT)
+
+            results = [f.result() for f in futures if f in done and f.result()[1] is not None]
+            for move, _, _, nodes in results:
+                subtree_nodes[move] = nodes
+            if not results:
+                break
+            move, score, _, _ = max(results, key=lambda r: (r[1], r[2]))
+            if running:
+                #   A stopped iteration is only trusted if the previous best move was searched
+                if any(r[0] == best_move for r in results):
+                    best_move = move
+                break
+            best_move = move
+
+            clock.end_iteration()
+            if stats is not None:
+                stats["depth"] = depth
+                stats["nodes"].append(sum(r[3] for r in results))
+                stats["score"] = score
+            depth += 1
+
+        return best_move[0], best_move[1]
+
+    def end_game(self):
+        if self.pool is not None:
+            self.shared[STOP] = 1
+            self.pool.shutdown(wait=True, cancel_futures=True)
+            self.pool = None
+        if self.memory is not None:
+            self.shared = None
+            self.memory.close()
+            self.memory.unlink()
+            self.memory = None
+        self.state = None
@@ -0,0 +1,109 @@
+import time
+from typing import Callable, List, Optional
+
+#   Once the node rate is known, the deadline is polled about every POLL_PERIOD seconds
+POLL_PERIOD = 0.002
+FIRST_POLL_NODES = 32
+MAX_POLL_NODES = 4096
+
+#   Bounds of the effective branching factor used to predict the next iteration
+MIN_BRANCHING_FACTOR = 1.5
+MAX_BRANCHING_FACTOR = 20.0
+BRANCHING_FACTOR_ITERATIONS = 3
+
+
+class SearchTimeout(Exception):
+    """Raised by the search clock once the deadline is reached"""
+
+
+class SearchClock:
+    """
+    Deadline of one bot turn
+
+    Reading the time at every node is expensive, ``tick`` only reads it every
+    ``poll_interval`` nodes. The interval follows the measured node rate so the
+    deadline is overshot by about POLL_PERIOD at most.
+    """
+
+    def __init__(
+        self,
+        time_budget: float,
+        safety_time: float = 0.01,
+        poll_interval: int = FIRST_POLL_NODES,
+        stop: Optional[Callable[[], bool]] = None,
+    ):
+        """
+        :param time_budget: Time allowed for the turn in seconds
+        :param safety_time: Time kept to return the move
+        :param poll_interval: Nodes before the first poll, e.g. the interval calibrated on the last turn
+        :param stop: Checked at every poll, the search is cancelled once it returns ``True``
+        """
+        self.start = time.perf_counter()
+        self.deadline = self.start + max(0.0, time_budget - safety_time)
+        self.stop = stop
+
+        self.poll_interval = poll_interval
+        self.countdown = poll_interval
+        self.polls = 0
+        self._last_poll = self.start
+
+        self.iteration_times: List[float] = []
+        self._iteration_start = self.start
+
+    def tick(self):
+        """Count a node, checking the deadline every ``poll_interval`` nodes"""
+        self.countdown -= 1
+        if self.countdown <= 0:
+            self.poll()
+
+    def poll(self):
+        """
+        Check the deadline and adjust the polling interval to the node rate
+        :raises SearchTimeout: If the deadline is reached or the search is stopped
+        """
+        now = time.perf_counter()
+        if now >= self.deadline or (self.stop is not None and self.stop()):
+            raise SearchTimeout()
+
+        rate = self.poll_interval / max(now - self._last_poll, 1e-6)
+        period = min(POLL_PERIOD, (self.deadline - now) / 2)
+        self.poll_interval = max(1, min(MAX_POLL_NODES, int(rate * period)))
+        self.countdown = self.poll_interval
+        self._last_poll = now
+        self.polls += 1
+
+    def time_is_up(self) -> bool:
+        return time.perf_counter() >= self.deadline
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def remaining(self) -> float:
+        return max(0.0, self.deadline - time.perf_counter())
+
+    def start_iteration(self):
+        self._iteration_start = time.perf_counter()
+
+    def end_iteration(self):
+        self.iteration_times.append(time.perf_counter() - self._iteration_start)
+
+    def branching_factor(self) -> Optional[float]:
+        """
+        Get the effective branching factor, the mean duration ratio of consecutive iterations
+
+        Transposition hits make single ratios swing a lot, so the ratio is averaged
+        (geometrically) over the last BRANCHING_FACTOR_ITERATIONS iterations.
+        """
+        times = self.iteration_times
+        if len(times) < 2:
+            return None
+        span = min(BRANCHING_FACTOR_ITERATIONS, len(times) - 1)
+        ratio = (times[-1] / max(times[-1 - span], 1e-6)) ** (1 / span)
+        return min(MAX_BRANCHING_FACTOR, max(MIN_BRANCHING_FACTOR, ratio))
+
+    def can_finish_next_iteration(self) -> bool:
+        """Check that the next iteration, predicted from the branching factor, ends before the deadline"""
+        factor = self.branching_factor()
+        if factor is None:
+            return not self.time_is_up()
+        return self.iteration_times[-1] * factor <= self.remaining()
@@ -0,0 +1,139 @@
+from multiprocessing import shared_memory
+from typing import Optional, Tuple
+
+import numpy as np
+
+from Bots.TranspositionTable import ALWAYS_REPLACE, DEPTH_PREFERRED, NO_MOVE, pack_move, unpack_move
+
+#   Bytes used by one entry: check, data and meta words
+SHARED_ENTRY_SIZE = 3 * 8
+
+#   Lockless entries
+#       data = score (32 bits) | packed move (32 bits), meta = bound << 8 | depth
+#       The first word stores key ^ data ^ meta instead of the key. An entry torn by
+#       processes writing the same slot at once no longer XORs back to its key, so
+#       it reads as a miss rather than as the data of another position.
+
+MASK_32 = 0xFFFFFFFF
+
+
+def pack_entry(key: int, depth: int, score: int, bound: int, move) -> Tuple[int, int, int]:
+    packed_move = NO_MOVE if move is None else pack_move(move)
+    data = ((score & MASK_32) << 32) | (packed_move & MASK_32)
+    meta = (bound << 8) | (min(max(depth, 0), 127))
+    return key ^ data ^ meta, data, meta
+
+
+def unpack_entry(data: int, meta: int) -> Tuple[int, int, int, Optional[tuple]]:
+    score = data >> 32
+    if score >= 1 << 31:
+        score -= 1 << 32
+    packed_move = data & MASK_32
+    move = unpack_move(NO_MOVE if packed_move == MASK_32 else packed_move)
+    return score, meta >> 8, meta & 0xFF, move
+
+
+class SharedTranspositionTable:
+    """
+    Transposition table in shared memory, usable by several processes at once
+
+    Same interface and bucket replacement as ``TranspositionTable``. The process
+    creating the table owns the memory, others ``attach`` to it by name.
+    Counters are kept per process.
+    """
+
+    def __init__(self, size_mb: float = 4, name: Optional[str] = None):
+        """
+        :param size_mb: Memory budget in megabytes, rounded down to a power of two buckets
+        :param name: Name of an existing table to attach to, a new one is created if ``None``
+        """
+        if name is None:
+            buckets = max(1, int(size_mb * 2**20) // (2 * SHARED_ENTRY_SIZE))
+            bucket_count = 1 << (buckets.bit_length() - 1)
+            #   New shared memory is zero-filled, all slots start empty
+            self.memory = shared_memory.SharedMemory(create=True, size=bucket_count * 2 * SHARED_ENTRY_SIZE)
+            self.owner = True
+        else:
+            self.memory = shared_memory.SharedMemory(name=name)
+            bucket_count = self.memory.size // (2 * SHARED_ENTRY_SIZE)
+            self.owner = False
+
+        self.bucket_count = bucket_count
+        self.mask = bucket_count - 1
+        self.entries = np.ndarray((bucket_count, 2, 3), dtype=np.uint64, buffer=self.memory.buf)
+
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+        self.collisions = 0
+
+    @property
+    def name(self) -> str:
+        return self.memory.name
+
+    @staticmethod
+    def attach(name: str) -> "SharedTranspositionTable":
+        return SharedTranspositionTable(name=name)
+
+    def probe(self, key: int) -> Optional[Tuple[int, int, int, Optional[tuple]]]:
+        """
+        Look a position up
+        :param key: The Zobrist key of the position
+        :return: The (score, bound, depth, best move) stored for it, ``None`` if missing
+        """
+        self.probes += 1
+        bucket = self.entries[key & self.mask].tolist()
+        for slot in (DEPTH_PREFERRED, ALWAYS_REPLACE):
+            check, data, meta = bucket[slot]
+            if meta >> 8 != 0 and check ^ data ^ meta == key:
+                self.hits += 1
+                return unpack_entry(data, meta)
+        return None
+
+    def store(self, key: int, depth: int, score: int, bound: int, move=None):
+        """
+        Save a search result
+        :param key: The Zobrist key of the position
+        :param depth: The remaining depth the position was searched at
+        :param score: The score, from the point of view of the side to move
+        :param bound: ``EXACT``, ``LOWER`` (fail high) or ``UPPER`` (fail low)
+        :param move: The best move found, if any
+        """
+        self.stores += 1
+        index = key & self.mask
+        bucket = self.entries[index].tolist()
+
+        check, data, meta = bucket[DEPTH_PREFERRED]
+        slot = ALWAYS_REPLACE
+        if meta >> 8 == 0 or check ^ data ^ meta == key or depth >= meta & 0xFF:
+            slot = DEPTH_PREFERRED
+
+        check, data, meta = bucket[slot]
+        if meta >> 8 != 0 and check ^ data ^ meta != key:
+            self.collisions += 1
+
+        self.entries[index, slot] = pack_entry(key, depth, score, bound, move)
+
+    def clear(self):
+        self.entries.fill(0)
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+        self.collisions = 0
+
+    def hit_rate(self) -> float:
+        return self.hits / self.probes if self.probes else 0.0
+
+    def close(self):
+        """Detach from the shared memory, and free it if this process created it"""
+        #   The array must be released before the buffer it views
+        self.entries = None
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+
+    def __repr__(self):
+        return (
+            f"SharedTranspositionTable({self.name}, {self.bucket_count} buckets, {self.probes} probes, "
+            f"{self.hits} hits, {self.stores} stores, {self.collisions} collisions)"
+        )
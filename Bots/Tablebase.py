@@ -0,0 +1,237 @@
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from Bots.PiecesMoves import get_all_moves, make_move, unmake_move
+
+#   Endgame tablebases
+#       Positions of a few pieces on a small board, solved exactly by retrograde
+#       analysis, see TablebaseBuilder.py. A table covers one material: the piece
+#       types of the bot ("us", pawns moving towards the last row) and of its only
+#       opponent ("them", on another team and facing the bot, its pawns moving towards
+#       the first row), on one board shape and wall layout. Values are indexed by
+#       [side to move, square of every piece...], pieces of us then them, each side
+#       sorted by type:
+#           v > 0: the side to move captures the enemy king in v plies
+#           v < 0: the enemy captures the king of the side to move in -v plies
+#           0: neither side can force a king capture, a draw
+
+TABLEBASE_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Data", "tablebases")
+
+US, THEM = 0, 1
+
+WALL = "XX"
+
+
+def get_wall_mask(board) -> int:
+    """Get the walls of a board as a bit mask of square numbers ``x * width + y``"""
+    mask = 0
+    for x, y in zip(*np.nonzero(board == WALL)):
+        mask |= 1 << int(x * board.shape[1] + y)
+    return mask
+
+
+def get_table_path(directory: str, shape: Tuple[int, int], walls: int, us: str, them: str) -> str:
+    return os.path.join(directory, f"{shape[0]}x{shape[1]}-{walls:x}-{us}_{them}.npy")
+
+
+class TableLayout:
+    """Squares every piece of a material can stand on, and the value array indices they map to"""
+
+    def __init__(self, shape: Tuple[int, int], walls: int, us: str, them: str):
+        """
+        :param walls: The wall mask, see ``get_wall_mask``
+        :param us: The piece types of the bot, sorted, e.g. ``"kp"``
+        :param them: The piece types of its opponent, sorted
+        """
+        self.shape = shape
+        self.walls = walls
+        self.us = us
+        self.them = them
+        height, width = shape
+
+        #   (side, type) of every piece in index order
+        self.pieces: List[Tuple[int, str]] = [(US, t) for t in us] + [(THEM, t) for t in them]
+        self.domains: List[Tuple[int, ...]] = []
+        for side, piece_type in self.pieces:
+            squares = []
+            for sq in range(height * width):
+                x = sq // width
+                if walls >> sq & 1:
+                    continue
+                #   Pawns never stand on their promotion row
+                if piece_type == "p" and x == (height - 1 if side == US else 0):
+                    continue
+                squares.append(sq)
+            self.domains.append(tuple(squares))
+        self.domain_index: List[Dict[int, int]] = [{sq: i for i, sq in enumerate(d)} for d in self.domains]
+        self.table_shape: Tuple[int, ...] = (2,) + tuple(len(d) for d in self.domains)
+
+    def index(self, to_move: int, squares: Sequence[int]) -> Optional[Tuple[int, ...]]:
+        """
+        Get the value index of a position
+        :param to_move: ``US`` or ``THEM``
+        :param squares: The square of every piece, in ``pieces`` order
+        :return: The index, ``None`` if a piece stands outside its domain
+        """
+        index = [to_move]
+        for domain_index, sq in zip(self.domain_index, squares):
+            i = domain_index.get(sq)
+            if i is None:
+                return None
+            index.append(i)
+        return tuple(index)
+
+
+def faces_bot(player_sequence: str, other: str) -> bool:
+    """
+    Check that a color is covered by the tables as the bot's opponent
+    :param player_sequence: The player sequence, as given to the bot
+    :param other: The color of the other pieces left on the board
+    :return: Whether ``other`` is on another team and plays from the opposite side of the board
+    """
+    players = {player_sequence[i + 1]: player_sequence[i : i + 3] for i in range(0, len(player_sequence), 3)}
+    if other not in players:
+        return False
+    team, _, rotation = player_sequence[:3]
+    other_team, _, other_rotation = players[other]
+    return other_team != team and (int(other_rotation) - int(rotation)) % 4 == 2
+
+
+def split_material(board, color: str) -> Optional[Tuple[str, str, List[int], Optional[str]]]:
+    """
+    Get the material of a position
+    :param board: The position, as seen by the bot of ``color``
+    :return: The piece types of us and them, the squares of the pieces in ``TableLayout.pieces``
+             order and the color of them (``None`` without pieces), ``None`` if more than one
+             other color is on the board
+    """
+    width = board.shape[1]
+    ours, theirs = [], []
+    them_color = None
+    for x, y in zip(*np.nonzero(board != "")):
+        piece = board[x, y]
+        if piece == WALL:
+            continue
+        if piece[1] == color:
+            ours.append((piece[0], int(x * width + y)))
+        elif them_color is None or piece[1] == them_color:
+            them_color = piece[1]
+            theirs.append((piece[0], int(x * width + y)))
+        else:
+            return None
+    ours.sort()
+    theirs.sort()
+    return (
+        "".join(t for t, _ in ours),
+        "".join(t for t, _ in theirs),
+        [sq for _, sq in ours] + [sq for _, sq in theirs],
+        them_color,
+    )
+
+
+class Tablebases:
+    """
+    Tables of a directory, memory mapped when first probed
+
+    Probing a covered position is one array read. Positions whose material,
+    board shape or wall layout has no table are not covered.
+    """
+
+    def __init__(self, directory: str = TABLEBASE_DIRECTORY):
+        self.directory = directory
+        self.tables: Dict[tuple, Optional[Tuple[TableLayout, np.ndarray]]] = {}
+
+        self.probes = 0
+        self.hits = 0
+
+    def table(self, shape: Tuple[int, int], walls: int, us: str, them: str) -> Optional[Tuple[TableLayout, np.ndarray]]:
+        """Get the layout and values of a material, ``None`` if it has no table"""
+        key = (shape, walls, us, them)
+        if key not in self.tables:
+            path = get_table_path(self.directory, shape, walls, us, them)
+            self.tables[key] = None
+            if os.path.isfile(path):
+                self.tables[key] = TableLayout(shape, walls, us, them), np.load(path, mmap_mode="r")
+        return self.tables[key]
+
+    def probe(
+        self, board, color: str, to_move: int = US, walls: Optional[int] = None, player_sequence: Optional[str] = None
+    ) -> Optional[int]:
+        """
+        Look a position up
+        :param board: The position, as seen by the bot of ``color``
+        :param to_move: ``US`` if the bot is to move, ``THEM`` otherwise
+        :param walls: The wall mask of the board, if already known
+        :param player_sequence: The player sequence of the bot, positions whose other color is not
+                                an opponent facing the bot (see ``faces_bot``) are not covered.
+                                ``None`` if the other color is known to be one, as on the tables' own boards
+        :return: The value of the position for the side to move, ``None`` if not covered
+        """
+        self.probes += 1
+        material = split_material(board, color)
+        if material is None or "k" not in material[0] or "k" not in material[1]:
+            return None
+        us, them, squares, them_color = material
+        if player_sequence is not None and not faces_bot(player_sequence, them_color):
+            return None
+        shape = (int(board.shape[0]), int(board.shape[1]))
+        table = self.table(shape, get_wall_mask(board) if walls is None else walls, us, them)
+        if table is None:
+            return None
+        layout, values = table
+        index = layout.index(to_move, squares)
+        if index is None:
+            return None
+        self.hits += 1
+        return int(values[index])
+
+    def best_move(self, player_sequence: str, board):
+        """
+        Get the best move of a covered position: the fastest king capture when
+        winning, a drawing move otherwise, and the slowest loss when nothing else is left
+        :param player_sequence: The player sequence, as given to the bot
+        :param board: The position, as seen by the bot, with the bot to move
+        :return: The move, ``None`` if the position or one of its children is not covered
+        """
+        color = player_sequence[1]
+        walls = get_wall_mask(board)
+        if self.probe(board, color, US, walls, player_sequence) is None:
+            return None
+
+        board = board.copy()
+        best, best_rank = None, None
+        for move in get_all_moves(board, color):
+            target = board[move[1]]
+            if target == WALL:
+                continue
+            if target[:1] == "k":
+                return move
+            undo = make_move(board, move)
+            value = self.probe(board, color, THEM, walls, player_sequence)
+            unmake_move(board, undo)
+            if value is None:
+                return None
+            #   Wins sort first by fewest plies, then draws, then losses by most plies
+            rank = (1, value) if value < 0 else (0, 0) if value == 0 else (-1, value)
+            if best_rank is None or rank > best_rank:
+                best, best_rank = move, rank
+        return best
+
+    def hit_rate(self) -> float:
+        return self.hits / self.probes if self.probes else 0.0
+
+    def __repr__(self):
+        return f"Tablebases({self.directory}, {self.probes} probes, {self.hits} hits)"
+
+
+_TABLEBASES: Dict[str, Tablebases] = {}
+
+
+def get_tablebases(directory: str = TABLEBASE_DIRECTORY) -> Tablebases:
+    """Get the (cached) tablebases of a directory"""
+    tablebases = _TABLEBASES.get(directory)
+    if tablebases is None:
+        tablebases = _TABLEBASES[directory] = Tablebases(directory)
+    return tablebases
@@ -1,76 +1,26 @@
 # player_sequence = 0w01b2
 import numpy as np
-import time
 from numpy.lib import _array_utils_impl
+from Bots.BatchEvaluation import BatchEvaluator
+from Bots.BoardEncoding import COLOR_CODES
 from Bots.ChessBotList import register_chess_bot
-from typing import Sequence, Tuple
-
-pawn_moves = [
-    (1, 0),
-]
-
-pawn_eat_moves = [
-    (1, -1),
-    (1, 1),
-]
-
-rook_moves = [
-    (0, -1),
-    (0, 1),
-    (-1, 0),
-    (1, 0),
-]
-
-knight_moves = [
-    (2, -1),
-    (2, 1),
-    (-2, -1),
-    (-2, 1),
-    (-1, -2),
-    (-1, 2),
-    (1, -2),
-    (1, 2),
-]
-
-bishop_moves = [
-    (1, 1),
-    (1, -1),
-    (-1, 1),
-    (-1, -1),
-]
-
-queen_moves = [
-    (1, 1),
-    (1, -1),
-    (-1, 1),
-    (-1, -1),
-    (0, -1),
-    (0, 1),
-    (-1, 0),
-    (1, 0),
-]
-
-king_moves = [
-    (0, -1),
-    (0, 1),
-    (-1, 0),
-    (1, 0),
-    (1, 1),
-    (1, -1),
-    (-1, 1),
-    (-1, -1),
-]
-
-pieces_moves = {
-    "p": pawn_moves,
-    "q": queen_moves,
-    "k": king_moves,
-    "b": bishop_moves,
-    "n": knight_moves,
-    "r": rook_moves,
-}
-
-can_move_k_cases = ["q", "b", "r"]
+from Bots.EngineState import SearchBot
+from Bots.Evaluation import Evaluation
+from Bots.LazySMP import LazySMPBot
+from Bots.RootSplit import RootSplitBot
+from Bots.MoveTables import get_move_tables
+from Bots.PiecesMoves import (
+    filter_legal_moves,
+    has_non_pawn_material,
+    is_king_safe,
+    is_quiet_move,
+    unmake_move,
+)
+from Bots.MoveOrdering import OrderingTables
+from Bots.SearchClock import FIRST_POLL_NODES, SearchClock, SearchTimeout
+from Bots.TranspositionTable import EXACT, LOWER, UPPER, TranspositionTable
+from Bots.Zobrist import get_zobrist_keys
+from typing import Sequence
 
 
 def get_piece_value(piece: str) -> int:
@@ -91,255 +41,305 @@ def get_piece_value(piece: str) -> int:
             return 0
 
 
-def get_all_moves(board, side_color) -> Sequence[Sequence[int]]:
+def get_all_moves(board, side_color, forward=1) -> Sequence[Sequence[int]]:
     eat_moves = []
     upgrade_moves = []
     normal_moves = []
 
-    def get_pieces_moves(position: Tuple[int, int], board):
-        nonlocal eat_moves
-        nonlocal upgrade_moves
-        nonlocal normal_moves
+    tables = get_move_tables(board.shape)
+    piece_rays = tables.rays
+    pawn_pushes, pawn_captures, last_row = tables.pawn_tables(forward)
 
-        # Retrieve the piece to find moves
-        piece = board[position[0]][position[1]]
-        piece_type = piece[0]
-        color = piece[1]
-
-        # Get directions for the piece
-        dirs = pieces_moves[piece_type]
-        # Maximum distance the piece can travel
-        max_dist = 1 if piece_type not in can_move_k_cases else board.shape[0] - 1
-
-        for direction in dirs:
-            for i in range(1, max_dist + 1):
-                # Compute new positions
-                nx = i * direction[0] + position[0]
-                ny = i * direction[1] + position[1]
-
-                # If out of board, skip move
-                if nx < 0 or nx >= board.shape[0] or ny < 0 or ny >= board.shape[1]:
-                    break
-
-                # Retrieve content on the case at new position
-                case_content = board[nx][ny]
-
-                # if case is empty, can move onto the case
-                if len(case_content) == 0:
-                    if piece_type != "p":
-                        normal_moves.append(((position[0], position[1]), (nx, ny)))
-                    elif nx == board.shape[0] - 1:
-                        upgrade_moves.append(((position[0], position[1]), (nx, ny)))
-                    else:
-                        normal_moves.append(((position[0], position[1]), (nx, ny)))
-
-                    continue
-
-                if case_content[1] == color:
-                    break
+    for sq, position in enumerate(tables.coords):
+        piece = board[position]
+        if len(piece) == 0 or piece[1] != side_color:
+            continue
 
-                # If case contains a piece of same color, can't move onto the case
-                if case_content[1] != color and piece_type != "p":
-                    eat_moves.append(
-                        (
-                            ((position[0], position[1]), (nx, ny)),
-                            get_piece_value(case_content[0]),
-                        )
-                    )
-                    break
+        piece_type = piece[0]
 
-        # If the piece to move is a pawn, can eat in specific conditions
+        # Pawns only move forward onto empty cases and eat diagonally
         if piece_type == "p":
-            directions = pawn_eat_moves
-            for dirs in directions:
-                # Compute new positions
-                nx = dirs[0] + position[0]
-                ny = dirs[1] + position[1]
-
-                # If out of board, skip move
-                if nx < 0 or nx >= board.shape[0] or ny < 0 or ny >= board.shape[1]:
+            for target in pawn_pushes[sq]:
+                if len(board[target]) != 0:
                     continue
+                if target[0] == last_row:
+                    upgrade_moves.append((position, target))
+                else:
+                    normal_moves.append((position, target))
+
+            for target in pawn_captures[sq]:
+                case_content = board[target]
+                if len(case_content) == 0 or case_content[1] == side_color:
+                    continue
+                if target[0] != last_row:
+                    eat_moves.append(((position, target), get_piece_value(case_content[0])))
+                else:
+                    upgrade_moves.append((position, target))
+            continue
 
-                # Retrieve content on the case at new position
-                case_content = board[nx][ny]
+        # Walk every ray until it is blocked
+        for ray in piece_rays[piece_type][sq]:
+            for target in ray:
+                case_content = board[target]
 
-                # if case is empty, can't move onto the case
+                # if case is empty, can move onto the case
                 if len(case_content) == 0:
+                    normal_moves.append((position, target))
                     continue
 
-                # If case contains a piece of same color, can't move onto the case
-                if case_content[1] != color:
-                    if nx < board.shape[0] - 1:
-                        eat_moves.append(
-                            (
-                                ((position[0], position[1]), (nx, ny)),
-                                get_piece_value(case_content[0]),
-                            )
-                        )
-                    else:
-                        upgrade_moves.append(((position[0], position[1]), (nx, ny)))
-
-    for x in range(board.shape[0]):
-        for y in range(board.shape[1]):
-            try:
-                if len(board[x][y]) <= 0 or board[x][y][1] != side_color:
-                    continue
-            except Exception:
-                print(board, x, y, board[x][y])
-            get_pieces_moves((x, y), board)
+                # If case contains a piece of another color, can eat it
+                if case_content[1] != side_color:
+                    eat_moves.append(((position, target), get_piece_value(case_content[0])))
+                break
 
     eat_moves.sort(key=lambda m: m[1], reverse=True)
     moves = upgrade_moves + [m[0] for m in eat_moves] + normal_moves
     return moves
 
 
-def is_king_safe(board, color):
-    # Find king position
-    king_pos = None
-    for x in range(board.shape[0]):
-        for y in range(board.shape[1]):
-            if board[x][y] == "k" + color:
-                king_pos = (x, y)
-                break
-        if king_pos:
-            break
+def get_legal_moves(board, color, forward=1):
+    return filter_legal_moves(board, color, get_all_moves(board, color, forward), forward)
 
-    if not king_pos:
-        return False
 
-    # Check if any enemy piece can attack the king
-    enemy_color = "b" if color == "w" else "w"
-    enemy_moves = get_all_moves(np.rot90(board, 2), enemy_color)
-
-    for move in enemy_moves:
-        if move[1] == king_pos:
-            return False
-
-    return True
-
-
-def apply_move(curr_board, move):
-    (fx, fy), (tx, ty) = move
-
-    new_board = curr_board.copy()
-    piece = new_board[fx][fy]
-    if piece[0] == "p" and tx == curr_board.shape[0] - 1:
-        new_board[tx][ty] = "q" + piece[1]
-    else:
-        new_board[tx][ty] = piece
-    new_board[fx][fy] = ""
+# Far above every score
+INF = 10**9
+TT_SIZE_MB = 4
 
-    return new_board
+# Principal variation search, and half width of the root window around the previous iteration's score
+USE_PVS = True
+ASPIRATION_WINDOW = 50
 
+# Null-move pruning: from this remaining depth, searching the pass NULL_MOVE_REDUCTION plies shallower
+USE_NULL_MOVE = True
+NULL_MOVE_MIN_DEPTH = 3
+NULL_MOVE_REDUCTION = 2
 
-def get_legal_moves(board, color):
-    moves = get_all_moves(board, color)
-    legal = []
-    for move in moves:
-        test_board = apply_move(board, move)
-        if is_king_safe(test_board, color):
-            legal.append(move)
-    return legal
+# Late move reductions: quiet moves after the first LMR_FULL_DEPTH_MOVES are searched one ply shallower
+USE_LMR = True
+LMR_MIN_DEPTH = 3
+LMR_FULL_DEPTH_MOVES = 3
 
-
-INF = 10**9
+# Frontier nodes (one ply left) evaluate all their children in one batched call, with the same scores
+USE_BATCH_EVAL = False
 
 
 def chess_bot(player_sequence, board, time_budget, **kwargs):
+    """
+    Optional keyword arguments:
+        - pvs / aspiration: Override USE_PVS, or disable aspiration windows
+        - null_move / lmr: Override USE_NULL_MOVE and USE_LMR
+        - batch_eval: Override USE_BATCH_EVAL
+        - max_depth: Stop deepening after this depth
+        - start_depth: First depth searched, 1 by default
+        - root_moves: Search only these root moves, in this order
+        - root_alpha: A callable returning a lower bound of the root score, e.g. the
+          best score found by other processes searching other root moves
+        - stats: A dict receiving the last completed depth ("depth"), the nodes
+          searched by every completed depth ("nodes") and the share of beta cutoffs
+          caused by the first move searched ("first_move_cutoff_rate"), and the
+          number of deadline checks ("polls"), the score of the last completed
+          depth ("score") and its bound ("bound", ``UPPER`` when no root move beat
+          alpha, ``LOWER`` on a beta cutoff, ``EXACT`` otherwise), and the hit rates
+          of the evaluation and pawn structure caches ("eval_cache_hit_rate",
+          "pawn_cache_hit_rate")
+        - state: An ``EngineState`` whose tables are reused, and updated, instead of
+          fresh ones, so the search of a turn benefits from the previous ones
+        - age: Whether ``state`` starts a new turn, True by default. Pondering searches
+          the turn ahead of time, the search after a ponder hit must not age it again
+        - stop: A callable polled with the deadline, the search ends once it returns True
+    """
     color = player_sequence[1]
-
-    safety_time = 0.01
-    deadline = time.perf_counter() + max(0, time_budget - safety_time)
+    use_pvs = kwargs.get("pvs", USE_PVS)
+    use_aspiration = kwargs.get("aspiration", ASPIRATION_WINDOW > 0)
+    use_null_move = kwargs.get("null_move", USE_NULL_MOVE)
+    use_lmr = kwargs.get("lmr", USE_LMR)
+    use_batch_eval = kwargs.get("batch_eval", USE_BATCH_EVAL)
+    max_depth = kwargs.get("max_depth")
+    root_alpha = kwargs.get("root_alpha")
+    restricted = root_alpha is not None or bool(kwargs.get("root_moves"))
+    stats = kwargs.get("stats")
+    if stats is not None:
+        stats["depth"] = 0
+        stats["nodes"] = []
+
+    state = kwargs.get("state")
+    if state is not None and kwargs.get("age", True):
+        state.start_turn()
+    poll_interval = FIRST_POLL_NODES if state is None else state.poll_interval
+    clock = SearchClock(time_budget, poll_interval=poll_interval, stop=kwargs.get("stop"))
     total_node = 0
+    partial_move = None
+    root_bound = EXACT
+
+    # Positions are keyed with the color to move as turn index
+    if state is None:
+        keys = get_zobrist_keys(board.shape)
+        transposition_table = TranspositionTable(TT_SIZE_MB)
+        ordering = OrderingTables(board.shape)
+        eval_cache = pawn_cache = None
+    else:
+        keys = state.keys
+        transposition_table = state.transposition_table
+        ordering = state.ordering
+        eval_cache, pawn_cache = state.eval_cache, state.pawn_cache
 
-    def evaluate(curr_board):
-        score = 0
-        for x in range(curr_board.shape[0]):
-            for y in range(curr_board.shape[1]):
-                piece = curr_board[x][y]
-
-                if len(piece) == 0:
-                    continue
-
-                value = get_piece_value(piece[0])
-
-                score += value if piece[1] == "w" else -value
-
-        return score
-
-    def time_is_up():
-        return time.perf_counter() >= deadline
-
-    class SearchTimeout(Exception):
-        pass
-
-    def negamax(curr_board, depth_remaining, alpha, beta, side_to_move):
+    def negamax(curr_board, key, depth_remaining, alpha, beta, side_to_move, forward, ply, allow_null=True):
         nonlocal total_node
         total_node += 1
-        if time_is_up():
-            raise SearchTimeout()
+        clock.tick()
 
         sign = 1 if side_to_move == "w" else -1
 
         if depth_remaining == 0:
-            return sign * evaluate(curr_board)
-
-        moves = get_legal_moves(curr_board, side_to_move)
+            return sign * evaluation.evaluate(key)
+
+        alpha_start = alpha
+        hash_move = None
+        entry = transposition_table.probe(key)
+        if entry is not None:
+            tt_score, tt_bound, tt_depth, hash_move = entry
+            if tt_depth >= depth_remaining and (
+                tt_bound == EXACT
+                or (tt_bound == LOWER and tt_score >= beta)
+                or (tt_bound == UPPER and tt_score <= alpha)
+            ):
+                return tt_score
+
+        next_side = "b" if side_to_move == "w" else "w"
+        turn, next_turn = COLOR_CODES[side_to_move], COLOR_CODES[next_side]
+
+        # Pruning and reductions are unsafe when in check
+        in_check = None
+        if (use_null_move or use_lmr) and depth_remaining >= min(NULL_MOVE_MIN_DEPTH, LMR_MIN_DEPTH):
+            in_check = not is_king_safe(curr_board, side_to_move, forward)
+
+        # If passing still fails high, a real move would too. Not with only pawns left,
+        # where every move can make things worse (zugzwang)
+        if (
+            use_null_move
+            and allow_null
+            and depth_remaining >= NULL_MOVE_MIN_DEPTH
+            and not in_check
+            and beta < INF
+            and sign * evaluation.evaluate(key) >= beta
+            and has_non_pawn_material(curr_board, side_to_move)
+        ):
+            null_key = key ^ keys.turn_keys[turn] ^ keys.turn_keys[next_turn]
+            null_depth = max(0, depth_remaining - 1 - NULL_MOVE_REDUCTION)
+            score = -negamax(curr_board, null_key, null_depth, -beta, -beta + 1, next_side, -forward, ply + 1, False)
+            if score >= beta:
+                return score
+
+        moves = get_legal_moves(curr_board, side_to_move, forward)
 
         if not moves:
-            if not is_king_safe(curr_board, side_to_move):
+            if not is_king_safe(curr_board, side_to_move, forward):
                 return -INF
             return 0
 
-        best_score = -INF
+        # Captures and promotions come first, then quiet moves by killers and history
+        first_quiet = 0
+        while first_quiet < len(moves) and not is_quiet_move(curr_board, moves[first_quiet], forward):
+            first_quiet += 1
+        moves = moves[:first_quiet] + ordering.order_quiet(moves[first_quiet:], ply, side_to_move)
 
-        for m in moves:
-            child_board = np.rot90(apply_move(curr_board, m), 2)
-            next_side = "b" if side_to_move == "w" else "w"
+        if hash_move is not None and hash_move in moves:
+            moves.remove(hash_move)
+            moves.insert(0, hash_move)
 
-            score = -negamax(child_board, depth_remaining - 1, -beta, -alpha, next_side)
-
-            if score > best_score:
-                best_score = score
+        best_score = -INF
+        best_move = moves[0]
 
-            if best_score > alpha:
-                alpha = best_score
+        if depth_remaining == 1 and use_batch_eval:
+            # The children are leaves: score them all at once, then pick the same move and
+            # cutoff as searching them one by one would
+            total_node += len(moves)
+            scores = (sign * batch_evaluator.evaluate_moves(curr_board, moves, forward)).tolist()
+            for i, score in enumerate(scores):
+                if score > best_score:
+                    best_score = score
+                    best_move = moves[i]
+
+                if best_score > alpha:
+                    alpha = best_score
+
+                if alpha >= beta:
+                    ordering.add_cutoff(moves[i], ply, side_to_move, 1, is_quiet_move(curr_board, moves[i], forward), i)
+                    break
+        else:
+            for i, m in enumerate(moves):
+                child_key, undo = keys.make_move(curr_board, key, m, forward, turn, next_turn)
+                evaluation.apply(undo)
+                quiet = len(undo.captured) == 0 and not undo.promoted
+                reduction = int(
+                    use_lmr and quiet and not in_check and i >= LMR_FULL_DEPTH_MOVES and depth_remaining >= LMR_MIN_DEPTH
+                )
+
+                if i == 0 or (not use_pvs and reduction == 0):
+                    score = -negamax(curr_board, child_key, depth_remaining - 1, -beta, -alpha, next_side, -forward, ply + 1)
+                else:
+                    # Prove the move is not better than the best one, search it fully only if it is
+                    child_depth = depth_remaining - 1 - reduction
+                    score = -negamax(curr_board, child_key, child_depth, -alpha - 1, -alpha, next_side, -forward, ply + 1)
+                    if reduction and score > alpha and use_pvs:
+                        child_depth = depth_remaining - 1
+                        score = -negamax(curr_board, child_key, child_depth, -alpha - 1, -alpha, next_side, -forward, ply + 1)
+                    if score > alpha and (score < beta or child_depth < depth_remaining - 1):
+                        score = -negamax(curr_board, child_key, depth_remaining - 1, -beta, -alpha, next_side, -forward, ply + 1)
+                unmake_move(curr_board, undo)
+                evaluation.unapply(undo)
+
+                if score > best_score:
+                    best_score = score
+                    best_move = m
+
+                if best_score > alpha:
+                    alpha = best_score
+
+                if alpha >= beta:
+                    ordering.add_cutoff(m, ply, side_to_move, depth_remaining, quiet, i)
+                    break
 
-            if alpha >= beta:
-                break
+        if best_score <= alpha_start:
+            bound = UPPER
+        elif best_score >= beta:
+            bound = LOWER
+        else:
+            bound = EXACT
+        transposition_table.store(key, depth_remaining, best_score, bound, best_move)
 
         return best_score
 
-    def find_best_move(curr_board, side_to_move, depth):
-        nonlocal total_node
+    def find_best_move(curr_board, root_key, root_moves, depth, alpha, beta):
+        """Search the root moves in order, recording the score of every one of them in root_scores"""
+        nonlocal total_node, partial_move, root_bound
         total_node += 1
-        moves = get_legal_moves(curr_board, side_to_move)
 
-        if len(moves) == 0:
-            for x in range(curr_board.shape[0]):
-                for y in range(curr_board.shape[1]):
-                    piece = curr_board[x][y]
-                    if len(piece) > 0 and piece[1] == side_to_move:
-                        return (x, y), (x, y)
-            return (0, 0), (0, 0)
+        side_to_move = color
+        next_side = "b" if side_to_move == "w" else "w"
+        turn, next_turn = COLOR_CODES[side_to_move], COLOR_CODES[next_side]
 
-        best_move = moves[0]
+        best_move = root_moves[0]
         best_score = -INF
+        if root_alpha is not None:
+            alpha = max(alpha, root_alpha())
+        alpha_start = alpha
 
-        alpha = -INF
-        beta = INF
-
-        score = -10000
-
-        for m in moves:
-            if time_is_up():
+        for i, m in enumerate(root_moves):
+            if clock.time_is_up():
                 raise SearchTimeout()
 
-            child = np.rot90(apply_move(curr_board, m), 2)
-
-            next_side = "b" if side_to_move == "w" else "w"
-
-            score = -negamax(child, depth - 1, -beta, -alpha, next_side)
+            child_key, undo = keys.make_move(curr_board, root_key, m, 1, turn, next_turn)
+            evaluation.apply(undo)
+            if i == 0 or not use_pvs:
+                score = -negamax(curr_board, child_key, depth - 1, -beta, -alpha, next_side, -1, 1)
+            else:
+                score = -negamax(curr_board, child_key, depth - 1, -alpha - 1, -alpha, next_side, -1, 1)
+                if alpha < score < beta:
+                    score = -negamax(curr_board, child_key, depth - 1, -beta, -alpha, next_side, -1, 1)
+            unmake_move(curr_board, undo)
+            evaluation.unapply(undo)
+            root_scores[m] = score
 
             if score > best_score:
                 best_score = score
@@ -347,33 +347,130 @@ def chess_bot(player_sequence, board, time_budget, **kwargs):
 
             if score > alpha:
                 alpha = score
+                # Beats the previous best move of this depth, safe to play if time runs out
+                partial_move = m
 
-        return best_move
+            if alpha >= beta:
+                break
 
-    best_move = (0, 0), (0, 0)
-    depth = 1
-    try:
+        if best_score <= alpha_start:
+            bound = UPPER
+        elif best_score >= beta:
+            bound = LOWER
+        else:
+            bound = EXACT
+        if not restricted:
+            transposition_table.store(root_key, depth, best_score, bound, best_move)
+        elif bound != UPPER:
+            # Only some root moves, or only scores above an outside alpha, were searched: the score
+            # of a move is a lower bound of the position, a fail low bounds nothing
+            transposition_table.store(root_key, depth, best_score, LOWER, best_move)
+        root_bound = bound
+        return best_move, best_score
+
+    def search_depth(curr_board, root_key, root_moves, depth, previous_score):
+        """Search a depth in a window around the previous score, widened until the score falls inside"""
+        window = ASPIRATION_WINDOW
+        alpha, beta = -INF, INF
+        if use_aspiration and previous_score is not None:
+            alpha, beta = previous_score - window, previous_score + window
+
+        # A bound is widened until the score falls inside, never clamped: the window cannot invert
         while True:
-            if time_is_up():
-                raise SearchTimeout()
-            moves = get_all_moves(board, color)
-
-            if len(moves) == 0:
-                for x in range(board.shape[0]):
-                    for y in range(board.shape[1]):
-                        piece = board[x][y]
-                        if len(piece) > 0 and piece[1] == color:
-                            return (x, y), (x, y)
-                return (0, 0), (0, 0)
-
-            best_move = find_best_move(board, color, depth)
+            move, score = find_best_move(curr_board, root_key, root_moves, depth, alpha, beta)
+            if score <= alpha and alpha != -INF:
+                alpha = score - window
+            elif score >= beta and beta != INF:
+                beta = score + window
+            else:
+                return move, score
+            window *= 2
+
+    root_moves = list(kwargs["root_moves"]) if kwargs.get("root_moves") else get_legal_moves(board, color)
+    if len(root_moves) == 0:
+        for x in range(board.shape[0]):
+            for y in range(board.shape[1]):
+                piece = board[x][y]
+                if len(piece) > 0 and piece[1] == color:
+                    return (x, y), (x, y)
+        return (0, 0), (0, 0)
+
+    # The search moves pieces in place, the given board is only read
+    search_board = board.copy()
+    root_key = keys.compute(search_board, COLOR_CODES[color])
+    evaluation = Evaluation(search_board, color, get_piece_value, eval_cache, pawn_cache)
+    batch_evaluator = BatchEvaluator(board.shape, color, get_piece_value)
+    root_scores = {}
+
+    best_move = root_moves[0]
+    best_score = None
+    depth = kwargs.get("start_depth", 1)
+    try:
+        while max_depth is None or depth <= max_depth:
+            # Rather than starting a depth that cannot finish, leave the time to later turns
+            if not clock.can_finish_next_iteration():
+                break
+            clock.start_iteration()
+
+            # Set once a move of this depth beats the best score so far inside the window
+            partial_move = None
+            nodes_before = total_node
+            best_move, best_score = search_depth(search_board, root_key, root_moves, depth, best_score)
+            clock.end_iteration()
+
+            # Next depth starts with the best moves of this one
+            root_moves.sort(key=lambda m: root_scores.get(m, -INF), reverse=True)
+            root_moves.remove(best_move)
+            root_moves.insert(0, best_move)
+
+            if stats is not None:
+                stats["depth"] = depth
+                stats["nodes"].append(total_node - nodes_before)
+                stats["first_move_cutoff_rate"] = ordering.first_move_cutoff_rate()
+                stats["polls"] = clock.polls
+                stats["score"] = best_score
+                stats["bound"] = root_bound
+                stats["eval_cache_hit_rate"] = evaluation.eval_cache.hit_rate()
+                stats["pawn_cache_hit_rate"] = evaluation.pawn_cache.hit_rate()
             depth += 1
     except SearchTimeout:
+        if partial_move is not None:
+            best_move = partial_move
         print("Max depth:", depth)
         print("Node visited:", total_node)
         pass
 
+    if state is not None:
+        state.poll_interval = clock.poll_interval
     return best_move[0], best_move[1]
 
 
-register_chess_bot("ThinkR", chess_bot)
+class ThinkRBot(SearchBot):
+    """``chess_bot`` keeping its transposition table and move ordering tables for the whole game"""
+
+    search = staticmethod(chess_bot)
+    tt_size_mb = TT_SIZE_MB
+
+
+register_chess_bot("ThinkR", ThinkRBot)
+
+
+class ThinkRSMPBot(LazySMPBot):
+    """``chess_bot`` searching with helper processes sharing its transposition table"""
+
+    search = staticmethod(chess_bot)
+    tt_size_mb = TT_SIZE_MB
+
+
+register_chess_bot("ThinkR_SMP", ThinkRSMPBot)
+
+
+class ThinkRRootSplitBot(RootSplitBot):
+    """``chess_bot`` searching the root moves in parallel over a process pool"""
+
+    search = staticmethod(chess_bot)
+    generate_root_moves = staticmethod(get_legal_moves)
+    tt_size_mb = TT_SIZE_MB
+
+
+register_chess_bot("ThinkR_RootSplit", ThinkRRootSplitBot)
@@ -0,0 +1,126 @@
+from typing import Optional, Tuple
+
+import numpy as np
+
+#   Bound types of a stored score, 0 marks an empty slot
+EXACT = 1
+LOWER = 2
+UPPER = 3
+
+NO_MOVE = -1
+
+#   Bytes used by one entry: key, score, move, depth and bound
+ENTRY_SIZE = 8 + 4 + 4 + 1 + 1
+
+#   Slot 0 of a bucket keeps the deepest search, slot 1 always takes the newest one
+DEPTH_PREFERRED = 0
+ALWAYS_REPLACE = 1
+
+
+def pack_move(move) -> int:
+    """Pack a move ((xs, ys), (xd, yd)) into one int32, coordinates must be below 128"""
+    (xs, ys), (xd, yd) = move
+    return (xs << 24) | (ys << 16) | (xd << 8) | yd
+
+
+def unpack_move(packed: int):
+    """Get the move ((xs, ys), (xd, yd)) of a packed move, or ``None`` for ``NO_MOVE``"""
+    if packed == NO_MOVE:
+        return None
+    return ((packed >> 24) & 0xFF, (packed >> 16) & 0xFF), ((packed >> 8) & 0xFF, packed & 0xFF)
+
+
+class TranspositionTable:
+    """
+    Fixed-size table of search results indexed by Zobrist key
+
+    Every bucket holds two entries: one replaced only by searches at least as deep,
+    one replaced by every store that does not go to the first. The full key is kept
+    to tell positions sharing a bucket apart.
+    """
+
+    def __init__(self, size_mb: float = 4):
+        """
+        :param size_mb: Memory budget in megabytes, rounded down to a power of two buckets
+        """
+        buckets = max(1, int(size_mb * 2**20) // (2 * ENTRY_SIZE))
+        self.bucket_count = 1 << (buckets.bit_length() - 1)
+        self.mask = self.bucket_count - 1
+
+        shape = (self.bucket_count, 2)
+        #   Zero-filled, so untouched pages are never actually allocated
+        self.keys = np.zeros(shape, dtype=np.uint64)
+        self.scores = np.zeros(shape, dtype=np.int32)
+        self.moves = np.zeros(shape, dtype=np.int32)
+        self.depths = np.zeros(shape, dtype=np.int8)
+        self.bounds = np.zeros(shape, dtype=np.int8)
+
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+        self.collisions = 0
+
+    def probe(self, key: int) -> Optional[Tuple[int, int, int, Optional[tuple]]]:
+        """
+        Look a position up
+        :param key: The Zobrist key of the position
+        :return: The (score, bound, depth, best move) stored for it, ``None`` if missing
+        """
+        self.probes += 1
+        index = key & self.mask
+        keys = self.keys[index]
+        for slot in (DEPTH_PREFERRED, ALWAYS_REPLACE):
+            if keys[slot] == key and self.bounds[index, slot] != 0:
+                self.hits += 1
+                return (
+                    int(self.scores[index, slot]),
+                    int(self.bounds[index, slot]),
+                    int(self.depths[index, slot]),
+                    unpack_move(int(self.moves[index, slot])),
+                )
+        return None
+
+    def store(self, key: int, depth: int, score: int, bound: int, move=None):
+        """
+        Save a search result
+        :param key: The Zobrist key of the position
+        :param depth: The remaining depth the position was searched at
+        :param score: The score, from the point of view of the side to move
+        :param bound: ``EXACT``, ``LOWER`` (fail high) or ``UPPER`` (fail low)
+        :param move: The best move found, if any
+        """
+        self.stores += 1
+        index = key & self.mask
+
+        slot = ALWAYS_REPLACE
+        if (
+            self.bounds[index, DEPTH_PREFERRED] == 0
+            or self.keys[index, DEPTH_PREFERRED] == key
+            or depth >= self.depths[index, DEPTH_PREFERRED]
+        ):
+            slot = DEPTH_PREFERRED
+
+        if self.bounds[index, slot] != 0 and self.keys[index, slot] != key:
+            self.collisions += 1
+
+        self.keys[index, slot] = key
+        self.scores[index, slot] = score
+        self.moves[index, slot] = NO_MOVE if move is None else pack_move(move)
+        self.depths[index, slot] = min(depth, 127)
+        self.bounds[index, slot] = bound
+
+    def clear(self):
+        self.bounds.fill(0)
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+        self.collisions = 0
+
+    def hit_rate(self) -> float:
+        return self.hits / self.probes if self.probes else 0.0
+
+    def __repr__(self):
+        return (
+            f"TranspositionTable({self.bucket_count} buckets, {self.probes} probes, "
+            f"{self.hits} hits, {self.stores} stores, {self.collisions} collisions)"
+        )
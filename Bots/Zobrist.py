@@ -0,0 +1,96 @@
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from Bots.BoardEncoding import CODE_COUNT, COLOR_CODES, EMPTY, TYPE_CODES, piece_code
+from Bots.PiecesMoves import UndoRecord, make_move, unmake_move
+
+#   Zobrist hashing
+#       A position key is the XOR of one random 64-bit key per (square, piece code)
+#       and one key for the index of the player to move in the player order.
+#       Keys only depend on the board shape and ZOBRIST_SEED, so every process and
+#       every run gets the same keys for the same position.
+
+ZOBRIST_SEED = 0x15C4E55
+
+
+class ZobristKeys:
+    """Random keys of every (square, piece type, color) and turn index of a board shape"""
+
+    def __init__(self, shape: Tuple[int, int]):
+        self.height, self.width = shape
+        rng = np.random.default_rng((ZOBRIST_SEED, self.height, self.width))
+        keys = rng.integers(0, 2**64, size=(self.height * self.width, CODE_COUNT), dtype=np.uint64)
+        keys[:, EMPTY] = 0
+
+        #   Python ints are much faster than numpy scalars for XOR-ing one key at a time
+        self.piece_keys: List[List[int]] = keys.tolist()
+        self.turn_keys: List[int] = rng.integers(0, 2**64, size=len(COLOR_CODES), dtype=np.uint64).tolist()
+        self.turn_keys[0] = 0
+
+        #   Cache of piece codes, pieces may be strings or Piece objects
+        self._codes: Dict[str, int] = {"": EMPTY, "XX": piece_code("XX")}
+        for color in COLOR_CODES:
+            for piece_type in TYPE_CODES:
+                self._codes[piece_type + color] = piece_code(piece_type + color)
+
+    def piece_key(self, position: Tuple[int, int], piece) -> int:
+        """Get the key of a piece (or ``""``) standing on a square"""
+        code = self._codes[piece] if isinstance(piece, str) else piece_code(piece)
+        return self.piece_keys[position[0] * self.width + position[1]][code]
+
+    def compute(self, board, turn: int = 0) -> int:
+        """
+        Compute the key of a position from scratch
+        :param board: The board
+        :param turn: Index of the player to move in the player order
+        :return: The 64-bit key
+        """
+        key = self.turn_keys[turn]
+        for x in range(self.height):
+            for y in range(self.width):
+                piece = board[x, y]
+                if len(piece) != 0:
+                    key ^= self.piece_key((x, y), piece)
+        return key
+
+    def move_delta(self, undo: UndoRecord, turn: int = 0, next_turn: int = 0) -> int:
+        """
+        Get the value to XOR into a key to apply, or take back, a move
+        :param undo: The record returned by ``make_move``
+        :param turn: Index of the player making the move
+        :param next_turn: Index of the player to move afterwards
+        :return: The key difference between the positions before and after the move
+        """
+        start, end = undo.move
+        piece = undo.piece
+        delta = self.piece_key(start, piece) ^ self.piece_key(end, undo.captured)
+        delta ^= self.piece_key(end, "q" + piece[1] if undo.promoted else piece)
+        return delta ^ self.turn_keys[turn] ^ self.turn_keys[next_turn]
+
+    def make_move(self, board, key: int, move, forward: int = 1, turn: int = 0, next_turn: int = 0) -> Tuple[int, UndoRecord]:
+        """
+        Apply a move in place and update the position key
+        :return: The key of the new position and the record to give to ``unmake_move``
+        """
+        undo = make_move(board, move, forward)
+        return key ^ self.move_delta(undo, turn, next_turn), undo
+
+    def unmake_move(self, board, key: int, undo: UndoRecord, turn: int = 0, next_turn: int = 0) -> int:
+        """
+        Take back a move applied by ``make_move`` and restore the position key
+        :return: The key of the position before the move
+        """
+        unmake_move(board, undo)
+        return key ^ self.move_delta(undo, turn, next_turn)
+
+
+_KEYS: Dict[Tuple[int, int], ZobristKeys] = {}
+
+
+def get_zobrist_keys(shape: Tuple[int, int]) -> ZobristKeys:
+    """Get the (cached) Zobrist keys of a board shape"""
+    keys = _KEYS.get(shape)
+    if keys is None:
+        keys = _KEYS[shape] = ZobristKeys(shape)
+    return keys
@@ -1,3 +1,7 @@
+import numpy as np
+
+from Bots.BoardEncoding import COLOR_CODES, COLOR_SHIFT, EMPTY, TYPE_CODES, TYPE_MASK, WALL, encode_board
+from Bots.MoveTables import get_move_tables
 
 
 def check_player_defeated(player_color, board):
@@ -31,41 +35,25 @@ def move_is_valid(player_order, move, board, debug=False):
         return is_free(pos) or team_at(pos) != player_team
 
     def can_move_diagonally():
-        dx = end[0] - start[0]
-        dy = end[1] - start[1]
-
-        def stepto(end):
-            delta = 1 if end > 0 else -1
-            i = delta
-            while abs(i) < abs(end):
-                yield i
-                i += delta
-
-        if abs(dx) == abs(dy):  #   diagonal move
-            for x,y in zip(stepto(dx), stepto(dy)):
-                if not is_free((start[0]+x,start[1]+y)):
-                    return False
-            return can_move_or_capture(end)
-        else:   # Invalid bishop move (only diagonals)
+        between = tables.diagonal_lines.get((start_sq, end_sq))
+        if between is None:   # Invalid bishop move (only diagonals)
             return False
 
-    def can_move_along_axis():
-        dx = end[0] - start[0]
-        dy = end[1] - start[1]
-
-        if (dx == 0) != (dy == 0):  #   along the axis movement one must be equals to 0
-            dst = dx+dy
-            delta = 1 if dst > 0 else -1
-            Xaxis,Yaxis = (delta,0) if dx != 0 else (0,delta)
-
-            for i in range(1, abs(dst)):
-                if not is_free((start[0] + Xaxis * i, start[1] + Yaxis * i)):
-                    return False
+        for pos in between:
+            if not is_free(pos):
+                return False
+        return can_move_or_capture(end)
 
-            return can_move_or_capture(end)
-        else:   # Invalid bishop move (only diagonals)
+    def can_move_along_axis():
+        between = tables.axis_lines.get((start_sq, end_sq))
+        if between is None:   # Invalid rook move (only along the axis)
             return False
 
+        for pos in between:
+            if not is_free(pos):
+                return False
+        return can_move_or_capture(end)
+
 
     start, end = move
     #   Check boundary condition
@@ -89,7 +77,10 @@ def move_is_valid(player_order, move, board, debug=False):
         return False
 
     piece = board[start[0], start[1]]
-    
+    tables = get_move_tables(board.shape)
+    start_sq = tables.square(start[0], start[1])
+    end_sq = tables.square(end[0], end[1])
+
     #   Moving right color
     if piece.color != player_color:
         if debug:
@@ -117,10 +108,7 @@ def move_is_valid(player_order, move, board, debug=False):
             print(team_at(end), "!=", player_team, "==", team_at(end) != player_team)
         return abs(end[1] - start[1]) == 1 and (not is_free(end)) and team_at(end) != player_team
     elif piece.type == 'n':
-        dx = abs(end[0] - start[0])
-        dy = abs(end[1] - start[1])
-
-        if (dx == 1 and dy == 2) or (dx == 2 and dy == 1):
+        if end_sq in tables.jump_targets['n'][start_sq]:
             return can_move_or_capture(end)
         else: # invalid knight move
             return False
@@ -135,9 +123,86 @@ def move_is_valid(player_order, move, board, debug=False):
         return can_move_diagonally() != can_move_along_axis()
 
     elif piece.type == "k":
-        dx = abs(end[0] - start[0])
-        dy = abs(end[1] - start[1])
-
-        return (-1 <= dx <= 1 and -1 <= dy <= 1) and can_move_or_capture(end)
+        return end_sq in tables.jump_targets['k'][start_sq] and can_move_or_capture(end)
 
     return False
+
+
+def moves_are_valid(player_order, moves, board):
+    """
+    Batched counterpart of ``move_is_valid``
+
+    All moves are checked at once with array operations on the compact board encoding.
+    Inputs for which ``move_is_valid`` raises (moving a wall, capturing a wall or
+    a color missing from ``player_order``) are reported as invalid.
+    :param player_order: The player sequence, starting with the player to move
+    :param moves: Array-like of shape (N, 2, 2) holding ((xs, ys), (xd, yd)) moves
+    :param board: The board as seen by the player, either a board of pieces or strings,
+                  or a board already encoded with ``BoardEncoding.encode_board``
+    :return: A boolean array of shape (N,)
+    """
+    codes = board if board.dtype == np.int8 else encode_board(board)
+    moves = np.asarray(moves, dtype=np.int64).reshape(-1, 2, 2)
+    height, width = codes.shape
+
+    player_team = int(player_order[0])
+    player_color = COLOR_CODES[player_order[1]]
+
+    #   Team of every color code, -1 if the color is not playing
+    teams = np.full(len(COLOR_CODES), -1, dtype=np.int64)
+    for i in range(0, len(player_order), 3):
+        teams[COLOR_CODES[player_order[i + 1]]] = int(player_order[i])
+
+    sx, sy = moves[:, 0, 0], moves[:, 0, 1]
+    ex, ey = moves[:, 1, 0], moves[:, 1, 1]
+
+    #   Check boundary conditions, then index with clipped coordinates
+    in_bounds = (sx >= 0) & (sx < height) & (sy >= 0) & (sy < width) & \
+                (ex >= 0) & (ex < height) & (ey >= 0) & (ey < width)
+    sx, sy = np.clip(sx, 0, height - 1), np.clip(sy, 0, width - 1)
+    ex, ey = np.clip(ex, 0, height - 1), np.clip(ey, 0, width - 1)
+
+    start = codes[sx, sy]
+    end = codes[ex, ey]
+    start_type = start & TYPE_MASK
+    end_type = end & TYPE_MASK
+
+    #   Moving a piece of the right color
+    valid = in_bounds & (start_type != EMPTY) & (start_type != WALL) & ((start >> COLOR_SHIFT) == player_color)
+
+    end_free = end_type == EMPTY
+    end_team = np.where(end_type == WALL, -1, teams[end >> COLOR_SHIFT])
+    can_capture = ~end_free & (end_team >= 0) & (end_team != player_team)
+    can_move_or_capture = end_free | can_capture
+
+    dx = ex - sx
+    dy = ey - sy
+    adx = np.abs(dx)
+    ady = np.abs(dy)
+
+    #   Sliders need every square in between to be free
+    diagonal = (adx == ady) & (adx != 0)
+    axis = (dx == 0) != (dy == 0)
+    dist = np.maximum(adx, ady)
+    step_x, step_y = np.sign(dx), np.sign(dy)
+    occupied = codes != EMPTY
+    blocked = np.zeros(len(moves), dtype=bool)
+    for k in range(1, max(height, width) - 1):
+        between = k < dist
+        bx = np.clip(sx + k * step_x, 0, height - 1)
+        by = np.clip(sy + k * step_y, 0, width - 1)
+        blocked |= between & occupied[bx, by]
+    clear = ~blocked & can_move_or_capture
+
+    rules = np.zeros(len(moves), dtype=bool)
+    is_type = lambda t: start_type == TYPE_CODES[t]
+
+    #   Pawns move forward onto a free square or capture diagonally
+    rules |= is_type("p") & (dx == 1) & (((dy == 0) & end_free) | ((ady == 1) & can_capture))
+    rules |= is_type("n") & (((adx == 1) & (ady == 2)) | ((adx == 2) & (ady == 1))) & can_move_or_capture
+    rules |= is_type("b") & diagonal & clear
+    rules |= is_type("r") & axis & clear
+    rules |= is_type("q") & (diagonal | axis) & clear
+    rules |= is_type("k") & (dist == 1) & can_move_or_capture
+
+    return valid & rules
@@ -0,0 +1,623 @@
+import importlib
+import os
+import random
+import time
+
+import numpy as np
+import pytest
+
+from Benchmark import legacy_get_all_moves, sample_positions
+from BoardFile import MAPS_DIRECTORY, read_board_file
+from Bots.BatchEvaluation import BatchEvaluator
+from Bots.Bitboard import Bitboard, get_all_moves as bitboard_moves
+from Bots.BoardEncoding import COLOR_CODES, WALL, decode_board, encode_board, encode_boards
+from Bots.ChessBotList import StatefulChessBot, create_bot
+from Bots.EngineState import EngineState, SearchBot
+from Bots.Evaluation import (
+    DOUBLED_PAWN_PENALTY,
+    ISOLATED_PAWN_PENALTY,
+    PASSED_PAWN_ADVANCE_WEIGHT,
+    PASSED_PAWN_BONUS,
+    Evaluation,
+    get_piece_square_tables,
+    pawn_structure_score,
+)
+from Bots.EvaluationCache import EvaluationCache
+from Bots.MoveOrdering import OrderingTables
+from Bots.OpeningBook import OpeningBook, write_book
+from Bots.PiecesMoves import (
+    filter_legal_moves,
+    generate_moves_staged,
+    get_all_moves,
+    get_piece_value,
+    make_move,
+    unmake_move,
+)
+from Bots.SearchClock import SearchClock, SearchTimeout
+from Bots.SharedTranspositionTable import SharedTranspositionTable
+from Bots.Tablebase import THEM, US, Tablebases
+from Bots.TranspositionTable import EXACT, LOWER, UPPER, TranspositionTable
+from Bots.Zobrist import get_zobrist_keys
+from ChessRules import move_is_valid, moves_are_valid
+from Perft import BACKENDS, KNOWN_NODE_COUNTS, perft
+from Pondering import Ponderer
+from TablebaseBuilder import build as build_tablebase, make_board
+from TimeBank import TimeBank
+from TournamentRunner import BoardPiece
+
+MAPS = ["default.brd", "cross.brd", "pawn_race.brd"]
+
+
+def load_map(name):
+    return read_board_file(os.path.join(MAPS_DIRECTORY, name))
+
+
+def random_positions(name, count, seed=0):
+    return sample_positions(os.path.join(MAPS_DIRECTORY, name), count, seed)
+
+
+@pytest.mark.parametrize("name", MAPS)
+def test_move_tables_match_direction_walk(name):
+    for color, board in random_positions(name, 200, seed=1):
+        assert get_all_moves(board, color) == legacy_get_all_moves(board, color)
+
+
+@pytest.mark.parametrize("name", MAPS)
+def test_bitboard_round_trip_and_rotation(name):
+    _, board = load_map(name)
+    position = Bitboard.from_board(board)
+    assert (position.to_board() == board).all()
+    for rot in range(4):
+        assert (position.rotated(rot).to_board() == np.rot90(board, rot)).all()
+
+
+@pytest.mark.parametrize("name", MAPS)
+def test_bitboard_moves_match_pieces_moves(name):
+    for color, board in random_positions(name, 200):
+        expected = get_all_moves(board, color)
+        assert bitboard_moves(Bitboard.from_board(board), color) == expected
+
+
+@pytest.mark.parametrize("name", MAPS)
+def test_board_encoding_round_trip(name):
+    _, board = load_map(name)
+    codes = encode_board(board)
+    assert codes.dtype == np.int8
+    assert (decode_board(codes) == board).all()
+    assert ((codes == WALL) == (board == "XX")).all()
+
+    pieces = decode_board(codes, BoardPiece)
+    assert (encode_board(pieces) == codes).all()
+    assert encode_boards([board, pieces]).shape == (2,) + board.shape
+
+
+@pytest.mark.parametrize("name", MAPS)
+def test_backward_moves_match_rotated_board(name):
+    for color, board in random_positions(name, 100, seed=2):
+        h, w = board.shape
+        flip = lambda p: (h - 1 - p[0], w - 1 - p[1])
+        rotated = [(flip(s), flip(e)) for s, e in get_all_moves(np.rot90(board, 2), color)]
+        assert sorted(get_all_moves(board, color, -1)) == sorted(rotated)
+
+
+@pytest.mark.parametrize("name", MAPS)
+@pytest.mark.parametrize("forward", [1, -1])
+def test_staged_moves_match_all_moves(name, forward):
+    last_row = {1: -1, -1: 0}[forward]
+    for color, board in random_positions(name, 100, seed=3):
+        staged = list(generate_moves_staged(board, color, forward))
+        assert sorted(staged) == sorted(get_all_moves(board, color, forward))
+
+        #   promotions, then captures by decreasing victim value, then quiet moves
+        stages = []
+        for start, end in staged:
+            if board[start][0] == "p" and end[0] == last_row % board.shape[0]:
+                stages.append((0, 0))
+            elif len(board[end]) != 0:
+                stages.append((1, -get_piece_value(board[end][0])))
+            else:
+                stages.append((2, 0))
+        assert stages == sorted(stages)
+
+
+@pytest.mark.parametrize("forward", [1, -1])
+def test_make_unmake_restores_board(forward):
+    for color, board in random_positions("default.brd", 100, seed=3):
+        original = board.copy()
+        for move in get_all_moves(board, color, forward):
+            undo = make_move(board, move, forward)
+            assert board[move[0]] == ""
+            assert undo.promoted == (board[move[1]][0] == "q" and undo.piece[0] == "p")
+            unmake_move(board, undo)
+            assert (board == original).all()
+
+
+@pytest.mark.parametrize("name", MAPS)
+def test_zobrist_incremental_matches_recompute(name):
+    rng = random.Random(4)
+    for color, board in random_positions(name, 30, seed=4):
+        keys = get_zobrist_keys(board.shape)
+        board = board.copy()
+        key = keys.compute(board, 0)
+        sides = [(color, 1), ("b" if color == "w" else "w", -1)]
+        history = []
+        for ply in range(6):
+            side, forward = sides[ply % 2]
+            moves = get_all_moves(board, side, forward)
+            if not moves:
+                break
+            turn, next_turn = ply % 2, (ply + 1) % 2
+            new_key, undo = keys.make_move(board, key, rng.choice(moves), forward, turn, next_turn)
+            assert new_key == keys.compute(board, next_turn)
+            history.append((key, undo, turn, next_turn))
+            key = new_key
+
+        while history:
+            old_key, undo, turn, next_turn = history.pop()
+            key = keys.unmake_move(board, key, undo, turn, next_turn)
+            assert key == old_key == keys.compute(board, turn)
+
+
+@pytest.mark.parametrize("name", MAPS)
+def test_evaluation_incremental_matches_recompute(name):
+    rng = random.Random(8)
+    for color, board in random_positions(name, 30, seed=8):
+        board = board.copy()
+        evaluation = Evaluation(board, color)
+        sides = [(color, 1), ("b" if color == "w" else "w", -1)]
+        history = []
+        for ply in range(6):
+            side, forward = sides[ply % 2]
+            moves = get_all_moves(board, side, forward)
+            if not moves:
+                break
+            undo = make_move(board, rng.choice(moves), forward)
+            evaluation.apply(undo)
+            assert evaluation.score == evaluation.compute(board)
+            assert evaluation.pawn_key == evaluation.compute_pawn_key(board)
+            history.append((evaluation.score, undo))
+
+        while history:
+            score, undo = history.pop()
+            assert evaluation.score == score
+            unmake_move(board, undo)
+            evaluation.unapply(undo)
+        assert evaluation.score == evaluation.compute(board)
+        assert evaluation.pawn_key == evaluation.compute_pawn_key(board)
+
+
+@pytest.mark.parametrize("name", MAPS)
+@pytest.mark.parametrize("forward", [1, -1])
+def test_batch_evaluation_matches_evaluation(name, forward):
+    for color, board in random_positions(name, 20, seed=9):
+        side = color if forward == 1 else ("b" if color == "w" else "w")
+        moves = get_all_moves(board, side, forward)
+        if not moves:
+            continue
+        evaluation = Evaluation(board, color)
+        scores = BatchEvaluator(board.shape, color).evaluate_moves(board, moves, forward)
+        for move, score in zip(moves, scores):
+            child = board.copy()
+            make_move(child, move, forward)
+            assert score == evaluation.compute(child) + pawn_structure_score(child, color)
+
+
+
+@pytest.mark.parametrize("name", MAPS)
+def test_batch_evaluation_keeps_search_result(name):
+    from Bots.ThinkR import chess_bot
+
+    for color, board in random_positions(name, 5, seed=10):
+        results = []
+        for batch_eval in (False, True):
+            stats = {}
+            move = chess_bot(f"0{color}0", board, 60, max_depth=4, stats=stats, batch_eval=batch_eval)
+            results.append((move, stats["score"]))
+        assert results[0] == results[1]
+
+
+def test_pawn_structure_and_evaluation_caches():
+    board = np.full((5, 4), "", dtype=object)
+    #   Passed white pawns doubled on column 0, white and black pawns blocking each other on column 3
+    board[1, 0] = board[2, 0] = "pw"
+    board[1, 3] = "pw"
+    board[3, 3] = "pb"
+    passed = 2 * PASSED_PAWN_BONUS + round(PASSED_PAWN_ADVANCE_WEIGHT / 4) + round(PASSED_PAWN_ADVANCE_WEIGHT / 2)
+    #   Every pawn is isolated, the black one is scored negatively
+    score = passed - DOUBLED_PAWN_PENALTY - 3 * ISOLATED_PAWN_PENALTY + ISOLATED_PAWN_PENALTY
+    assert pawn_structure_score(board, "w") == score
+    assert pawn_structure_score(board[::-1], "b") == score
+
+    eval_cache, pawn_cache = EvaluationCache(0.01), EvaluationCache(0.01)
+    evaluation = Evaluation(board, "w", eval_cache=eval_cache, pawn_cache=pawn_cache)
+    keys = get_zobrist_keys(board.shape)
+    key = keys.compute(board)
+    assert evaluation.evaluate(key) == evaluation.score + score
+    assert evaluation.evaluate(key) == evaluation.score + score
+    assert (eval_cache.hits, pawn_cache.probes) == (1, 1)
+
+    #   Moving a piece other than a pawn keeps the pawn structure score
+    board[0, 1] = "nw"
+    evaluation = Evaluation(board, "w", eval_cache=eval_cache, pawn_cache=pawn_cache)
+    child_key, undo = keys.make_move(board, keys.compute(board), ((0, 1), (2, 2)))
+    evaluation.apply(undo)
+    assert evaluation.evaluate(child_key) == evaluation.compute(board) + score
+    assert pawn_cache.hits == 1
+    assert eval_cache.probe(child_key ^ 1) is None
+
+
+def test_piece_square_tables_follow_board_shape():
+    for shape in [(8, 8), (5, 7), (5, 4)]:
+        tables = get_piece_square_tables(shape)
+        knight = np.array(tables.tables["n"]).reshape(shape)
+        assert knight[shape[0] // 2, shape[1] // 2] > knight[0, 0]
+        pawn = np.array(tables.tables["p"]).reshape(shape)
+        assert (np.diff(pawn[:, 0]) > 0).all()
+        assert tables.mirrored("p") == np.flipud(pawn).flatten().tolist()
+
+
+@pytest.mark.parametrize("table_class", [TranspositionTable, SharedTranspositionTable])
+def test_transposition_table_replacement(table_class):
+    table = table_class(size_mb=0.001)
+    move = ((1, 2), (3, 4))
+    key = (5 << 60) | 7
+    same_bucket = [key + i * table.bucket_count for i in range(1, 3)]
+
+    assert table.probe(key) is None
+    table.store(key, 4, -12, LOWER, move)
+    assert table.probe(key) == (-12, LOWER, 4, move)
+
+    #   A shallower entry goes to the always-replace slot, the deep one stays
+    table.store(same_bucket[0], 1, 3, UPPER)
+    table.store(same_bucket[1], 2, 5, EXACT, move)
+    assert table.probe(key) == (-12, LOWER, 4, move)
+    assert table.probe(same_bucket[0]) is None
+    assert table.probe(same_bucket[1]) == (5, EXACT, 2, move)
+
+    #   A deeper entry takes the depth-preferred slot
+    table.store(same_bucket[0], 6, 1, EXACT)
+    assert table.probe(key) is None
+    assert table.probe(same_bucket[0]) == (1, EXACT, 6, None)
+
+    assert (table.stores, table.collisions) == (4, 2)
+    assert (table.probes, table.hits) == (7, 4)
+    if table_class is SharedTranspositionTable:
+        table.close()
+
+
+def test_shared_transposition_table_verifies_entries():
+    table = SharedTranspositionTable(size_mb=0.001)
+    attached = SharedTranspositionTable.attach(table.name)
+    key = (3 << 61) | 9
+    table.store(key, 3, -(10**9), EXACT, ((0, 1), (2, 3)))
+    assert attached.probe(key) == (-(10**9), EXACT, 3, ((0, 1), (2, 3)))
+
+    #   Half an entry written by another process reads as a miss
+    attached.entries[key & attached.mask, 0, 1] ^= np.uint64(1)
+    assert table.probe(key) is None
+
+    attached.close()
+    table.close()
+
+
+def test_ordering_tables_sort_quiet_moves():
+    ordering = OrderingTables((4, 5))
+    moves = [((0, 0), (1, 0)), ((0, 1), (1, 1)), ((0, 2), (1, 2)), ((0, 3), (1, 3))]
+
+    ordering.add_cutoff(moves[3], 2, "w", 3, True, 1)
+    ordering.add_cutoff(moves[2], 5, "w", 1, True, 0)
+    ordering.add_cutoff(moves[1], 2, "w", 1, True, 0)
+    ordering.add_cutoff(moves[0], 2, "w", 4, False, 0)
+
+    #   Killers of the ply, most recent first, then history, then generation order
+    assert ordering.order_quiet(moves, 2, "w") == [moves[1], moves[3], moves[2], moves[0]]
+    assert ordering.order_quiet(moves, 5, "w") == [moves[2], moves[3], moves[1], moves[0]]
+    assert ordering.order_quiet(moves, 1, "b") == moves
+    assert ordering.first_move_cutoff_rate() == 0.75
+
+
+def test_search_clock_polls_and_predicts():
+    clock = SearchClock(0.05, safety_time=0)
+    with pytest.raises(SearchTimeout):
+        while True:
+            clock.tick()
+    assert clock.polls > 0 and clock.poll_interval >= 1
+
+    clock = SearchClock(10)
+    clock.iteration_times = [0.01, 0.04, 0.16]
+    assert clock.branching_factor() == pytest.approx(4)
+    assert clock.can_finish_next_iteration()
+    clock.iteration_times.append(3)
+    assert not clock.can_finish_next_iteration()
+
+
+def test_time_bank_carries_unused_time():
+    bank = TimeBank(max_spend_ratio=0.5)
+    assert bank.budget(0, 1) == 1
+    bank.record(0, 1, 0.2)
+    bank.record(0, 1, 0.4)
+    assert bank.saved[0] == pytest.approx(1.4)
+    assert bank.budget(0, 1) == 1.5
+    assert bank.budget(1, 1) == 1
+    bank.record(0, 1, 3)
+    assert bank.saved[0] == 0
+
+
+class CountingBot(StatefulChessBot):
+    def __init__(self):
+        super().__init__()
+        self.games = 0
+        self.turns = 0
+
+    def new_game(self, player_sequence, board):
+        self.games += 1
+
+    def think(self, player_sequence, board, time_budget, **kwargs):
+        self.turns += 1
+        return (0, 0), (0, 0)
+
+
+def test_stateful_bot_keeps_state_between_turns():
+    def plain_bot(player_sequence, board, time_budget, **kwargs):
+        return (0, 0), (0, 0)
+
+    assert create_bot(plain_bot) is plain_bot
+    bot = create_bot(CountingBot)
+    assert create_bot(CountingBot) is not bot
+    board = np.full((2, 2), "", dtype=object)
+    for _ in range(3):
+        assert bot("0w0", board, 1) == ((0, 0), (0, 0))
+    assert (bot.games, bot.turns) == (1, 3)
+
+    def search(player_sequence, board, time_budget, state=None, **kwargs):
+        state.transposition_table.store(state.turns, 1, 0, EXACT)
+        state.start_turn()
+        return (0, 0), (0, 0)
+
+    class TableBot(SearchBot):
+        pass
+
+    TableBot.search = staticmethod(search)
+    bot = create_bot(TableBot)
+    bot("0w0", board, 1)
+    bot("0w0", board, 1)
+    assert bot.state.turns == 2
+    assert bot.state.transposition_table.probe(0) is not None
+    assert bot.state.transposition_table.probe(1) is not None
+
+
+def test_opening_book_lookup(tmp_path):
+    color, board = next(random_positions("default.brd", 1))
+    key = get_zobrist_keys(board.shape).compute(board, 0)
+    moves = get_all_moves(board, color)
+    path = str(tmp_path / "test.book")
+    write_book(path, [(key, moves[0], 1), (key, moves[1], 2), (key, moves[0], 2), (key + 1, moves[2], 5), (1, moves[3], 1)])
+
+    book = OpeningBook(path)
+    assert len(book) == 4
+    assert sorted(book.moves(key)) == sorted([(moves[0], 3), (moves[1], 2)])
+    assert book.choose(key) == moves[0]
+    assert book.choose(key, random.Random(0)) in moves[:2]
+    assert book.choose(key - 1) is None
+    assert book.hits == 3 and book.probes == 4
+
+    def search(player_sequence, board, time_budget, **kwargs):
+        return moves[4]
+
+    class BookBot(SearchBot):
+        book_path = path
+
+    BookBot.search = staticmethod(search)
+    assert create_bot(BookBot)("0w0", board, 1) == moves[0]
+    assert create_bot(BookBot)("0w0", board, 1, book=False) == moves[4]
+    #   Book moves are only played if they are moves of the position
+    assert create_bot(BookBot)("0w0", np.rot90(board, 2).copy(), 1) == moves[4]
+
+
+class PonderingBot(CountingBot):
+    ponders = True
+
+    def predict_move(self, player_sequence, board):
+        return (1, 0), (0, 0)
+
+    def ponder(self, player_sequence, board, move, should_stop):
+        self.pondered = move
+        while not should_stop():
+            time.sleep(0.01)
+
+
+def test_ponderer_keeps_bot_on_hit_only():
+    board = np.full((2, 2), "", dtype=object)
+    ponderer = Ponderer()
+
+    assert ponderer.start(PonderingBot(), "0w0", board)
+    bot = ponderer.finish(((1, 0), (0, 0)))
+    assert bot is not None and bot.pondered == ((1, 0), (0, 0))
+
+    assert ponderer.start(PonderingBot(), "0w0", board)
+    assert ponderer.finish(((1, 1), (0, 1))) is None
+    assert not ponderer.is_pondering()
+    assert (ponderer.hits, ponderer.misses, ponderer.hit_rate()) == (1, 1, 0.5)
+
+    assert not ponderer.start(CountingBot(), "0w0", board)
+
+
+def test_ponder_search_does_not_start_a_turn():
+    from Bots.NegaMax_ThinkR import NegaMaxThinkRBot
+
+    _, board = load_map("pawn_race.brd")
+    bot = NegaMaxThinkRBot()
+    move = bot("0w0", board.copy(), 60, max_depth=2, book=False)
+    make_move(board, move)
+    bot.ponder("0w0", board, get_all_moves(board, "b", -1)[0], lambda: True)
+    assert bot.state.turns == 1
+
+
+def test_quiescence_sees_promoting_captures():
+    from Bots.NegaMax_ThinkR import chess_bot
+
+    board = np.full((5, 5), "", dtype=object)
+    board[0, 0], board[1, 4], board[4, 4] = "rw", "bw", "kw"
+    board[1, 1], board[3, 2], board[4, 2] = "pb", "nb", "kb"
+    #   Taking the knight leaves the rook to a pawn capturing onto the last row
+    stats = {}
+    move = chess_bot("0w0", board, 60, max_depth=1, stats=stats)
+    assert move != ((1, 4), (3, 2))
+    assert stats["score"] < 0
+
+
+def test_root_split_matches_search_score():
+    from Bots.NegaMax_ThinkR import NegaMaxThinkRRootSplitBot, chess_bot
+
+    class TwoWorkerBot(NegaMaxThinkRRootSplitBot):
+        workers = 2
+
+    bot = TwoWorkerBot()
+    try:
+        for color, board in random_positions("default.brd", 3, seed=4):
+            split_stats, stats = {}, {}
+            bot(f"0{color}0", board, 60, max_depth=3, stats=split_stats, book=False)
+            chess_bot(f"0{color}0", board, 60, max_depth=3, stats=stats)
+            assert split_stats["score"] == stats["score"]
+    finally:
+        bot.end_game()
+
+
+@pytest.mark.parametrize("bot", ["ThinkR", "NegaMax_ThinkR"])
+def test_restricted_root_search_stores_lower_bound(bot):
+    chess_bot = importlib.import_module(f"Bots.{bot}").chess_bot
+
+    for color, board in random_positions("default.brd", 3, seed=6):
+        state = EngineState(board.shape, 1)
+        root_key = state.keys.compute(board, COLOR_CODES[color])
+        move = get_all_moves(board, color)[-1]
+        #   One root move only: its score bounds the position from below
+        chess_bot(f"0{color}0", board, 60, max_depth=2, state=state, root_moves=[move])
+        assert state.transposition_table.probe(root_key)[1] == LOWER
+
+        #   Failing low under an outside alpha bounds nothing
+        state = EngineState(board.shape, 1)
+        stats = {}
+        chess_bot(f"0{color}0", board, 60, max_depth=2, stats=stats, state=state, root_alpha=lambda: 10**8)
+        assert stats["bound"] == UPPER
+        assert state.transposition_table.probe(root_key) is None
+
+
+def king_capturable(board, color, forward):
+    king = [tuple(p) for p in np.argwhere(board == "k" + color)]
+    enemy = "b" if color == "w" else "w"
+    return not king or any(m[1] == king[0] for m in get_all_moves(board, enemy, -forward))
+
+
+def test_legal_moves_match_king_capture_check():
+    rng = random.Random(4)
+    pieces = ["XX", "pr"] + [p + c for p in "pnbrq" for c in "wb"]
+    for _ in range(2000):
+        shape = rng.choice([(4, 5), (5, 7), (8, 8), (7, 5)])
+        board = np.full(shape, "", dtype=object)
+        cells = [(x, y) for x in range(shape[0]) for y in range(shape[1])]
+        rng.shuffle(cells)
+        board[cells[0]], board[cells[1]] = "kw", "kb"
+        for cell in cells[2 : rng.randint(2, 12)]:
+            board[cell] = rng.choice(pieces)
+
+        for forward in (1, -1):
+            expected = []
+            for move in get_all_moves(board, "w", forward):
+                undo = make_move(board, move, forward)
+                if not king_capturable(board, "w", forward):
+                    expected.append(move)
+                unmake_move(board, undo)
+            assert filter_legal_moves(board, "w", get_all_moves(board, "w", forward), forward) == expected
+
+
+def forced_king_capture(board, to_move, plies):
+    """1 if the side to move captures the enemy king within plies whatever the defence, -1 if its own is, else 0"""
+    color, forward = ("w", 1) if to_move == US else ("b", -1)
+    moves = get_all_moves(board, color, forward)
+    if any(board[m[1]] == "k" + ("b" if color == "w" else "w") for m in moves):
+        return 1
+    if plies <= 1:
+        return 0
+    if not moves:
+        return -forced_king_capture(board, 1 - to_move, plies - 1)
+    best = -1
+    for move in moves:
+        undo = make_move(board, move, forward)
+        best = max(best, -forced_king_capture(board, 1 - to_move, plies - 1))
+        unmake_move(board, undo)
+        if best == 1:
+            break
+    return best
+
+
+def test_tablebase_matches_brute_force(tmp_path):
+    shape = (4, 3)
+    directory = str(tmp_path)
+    build_tablebase(shape, 0, "kp", "k", directory, Tablebases(directory), set())
+    tablebases = Tablebases(directory)
+    layout, values = tablebases.table(shape, 0, "kp", "k")
+
+    rng = random.Random(5)
+    checked = 0
+    while checked < 100:
+        index = tuple(rng.randrange(n) for n in values.shape)
+        squares = [domain[i] for domain, i in zip(layout.domains, index[1:])]
+        if len(set(squares)) != len(squares):
+            continue
+        value = int(values[index])
+        if abs(value) > 9:
+            continue
+        checked += 1
+        board = make_board(layout, squares)
+        assert tablebases.probe(board, "w", index[0]) == value
+
+        #   Exact distance: forced within |value| plies, not within two plies less
+        plies = abs(value) if value != 0 else 6
+        assert forced_king_capture(board, index[0], plies) == np.sign(value)
+        if abs(value) > 2:
+            assert forced_king_capture(board, index[0], plies - 2) == 0
+
+        if index[0] == US and value > 1:
+            move = tablebases.best_move("0w01b2", board)
+            make_move(board, move)
+            assert tablebases.probe(board, "w", THEM) == -(value - 1)
+
+    #   Only an opponent playing from the opposite side matches the tables, not a teammate or a side player
+    board = make_board(layout, squares)
+    assert tablebases.probe(board, "w", US, player_sequence="0w01b2") is not None
+    assert tablebases.probe(board, "w", US, player_sequence="0w00b2") is None
+    assert tablebases.probe(board, "w", US, player_sequence="0w01b1") is None
+    assert tablebases.best_move("0w00b2", board) is None
+
+
+@pytest.mark.parametrize("backend", list(BACKENDS))
+@pytest.mark.parametrize("name", MAPS)
+def test_perft_known_counts(name, backend):
+    player_order, board = load_map(name)
+    position = BACKENDS[backend](player_order, board)
+    for depth, expected in enumerate(KNOWN_NODE_COUNTS[name][:3], 1):
+        assert perft(position, depth) == expected
+
+
+@pytest.mark.parametrize("name", MAPS)
+def test_batched_validation_matches_move_is_valid(name):
+    rng = random.Random(5)
+    player_order, _ = load_map(name)
+    players = len(player_order) // 3
+    for ply, (color, board) in enumerate(random_positions(name, 40, seed=6)):
+        sequence = player_order[3 * (ply % players) :] + player_order[: 3 * (ply % players)]
+        pieces = decode_board(encode_board(board), BoardPiece)
+        h, w = board.shape
+        moves = [
+            ((rng.randint(-1, h), rng.randint(-1, w)), (rng.randint(-1, h), rng.randint(-1, w)))
+            for _ in range(200)
+        ] + list(get_all_moves(board, color))
+
+        expected = []
+        for move in moves:
+            try:
+                expected.append(bool(move_is_valid(sequence, move, pieces)))
+            except (AttributeError, ValueError):
+                expected.append(False)
+        assert moves_are_valid(sequence, np.array(moves), pieces).tolist() == expected
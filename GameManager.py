@@ -9,11 +9,14 @@ from PyQt6.QtGui import QIcon
 
 from BoardManager import BoardManager
 from BotWidget import BotWidget
+from Bots.Bitboard import rotate_coords
+from Bots.ChessBotList import StatefulChessBot
 from ChessRules import move_is_valid
 from ParallelPlayer import ParallelTurn
 from Piece import Piece
 from PieceManager import PieceManager
 from Player import Player
+from TimeBank import TimeBank
 
 if TYPE_CHECKING:
     from ChessArena import ChessArena
@@ -46,6 +49,8 @@ def rotate_coordinates(
 class GameManager:
     MIN_WAIT = 500
     GRACE_RATIO = 0.05
+    #   Let stateful bots search the predicted position during the other players' turns
+    PONDERING = False
 
     def __init__(self, arena: ChessArena):
         self.arena: ChessArena = arena
@@ -58,6 +63,8 @@ class GameManager:
         self.current_player_color = None
         self.current_player_board = None
         self.player_finished: bool = False
+        self.time_bank: TimeBank = TimeBank()
+        self.current_player_base_budget: float = 0
         self.auto_playing: bool = False
         self.timeout = QTimer()
         self.timeout.timeout.connect(lambda: self.end_turn(forced=True))
@@ -66,8 +73,13 @@ class GameManager:
 
     def reset(self):
         """Reset the game"""
+        for player in self.players:
+            player.ponderer.cancel()
+            if isinstance(player.bot, StatefulChessBot):
+                player.bot.end_game()
         self.players = []
         self.turn = 0
+        self.time_bank.reset()
 
     def add_player(self, color: str, widget: BotWidget):
         """
@@ -108,9 +120,11 @@ class GameManager:
 
         board = self.board_manager.board
         player: Player = self.players[self.turn]
-        budget: float = player.get_budget()
+        # Time left over by the player's previous turns is added to its budget
+        self.current_player_base_budget = player.get_budget()
+        budget: float = self.time_bank.budget(self.turn, self.current_player_base_budget)
         sequence: str = self.get_sequence()
-        func_name, func = player.get_func()
+        func_name, func = player.get_bot()
         print(f"Player {self.turn}'s turn: {func_name} (budget: {budget:.2f}s)")
 
         tile_width = self.arena.white_square.size().width()
@@ -222,7 +236,8 @@ class GameManager:
             self.min_wait.stop()
             self.timeout.stop()
 
-            self.apply_move()
+            if self.apply_move():
+                self.notify_opponents(move_made=manual_move)
 
             if self.check_game_end():
                 return True
@@ -252,11 +267,16 @@ class GameManager:
         self.current_player.terminate()
         self.current_player.quit()
 
-        self.apply_move()
+        elapsed = self.current_player.time_budget if forced else self.current_player.elapsed
+        self.time_bank.record(self.turn, self.current_player_base_budget, elapsed)
+
+        if self.apply_move():
+            self.notify_opponents(move_made=self.current_player_next_move)
 
         if self.check_game_end():
             return True
 
+        self.start_pondering()
         self.current_player = None
         self.turn += 1
         self.turn %= len(self.players)
@@ -414,6 +434,39 @@ class GameManager:
 
         return True
 
+    def start_pondering(self):
+        """Let the bot of the current player search during the next turn, if pondering is enabled"""
+        player: Player = self.players[self.turn]
+        if not self.PONDERING or not getattr(player.bot, "ponders", False):
+            return
+        sequence: str = self.get_sequence()
+        board = np.rot90(self.board_manager.board, int(sequence[2]))
+        player.ponderer.start(player.bot, sequence, np.array(BoardManager.get_string_board(board)))
+
+    def notify_opponents(self, move_made):
+        """
+        Tell the stateful bots of the other players about the move of the current player
+        :param move_made: The move, in the current player's orientation
+        """
+        board = self.board_manager.board
+        rotation = int(self.get_sequence()[2])
+        for index, player in enumerate(self.players):
+            if index == self.turn or not isinstance(player.bot, StatefulChessBot):
+                continue
+            player_rotation = int(self.board_manager.player_order[index * 3 + 2])
+            move = tuple(
+                rotate_coords(self.current_player_board.shape, p, player_rotation - rotation)
+                for p in move_made
+            )
+            if player.ponderer.is_pondering():
+                pondered_bot = player.ponderer.finish(move)
+                if pondered_bot is not None:
+                    player.bot = pondered_bot
+                print(f"Player {index}'s ponder {'hit' if pondered_bot is not None else 'miss'}: {player.ponderer}")
+            player.bot.opponent_moved(
+                move, np.array(BoardManager.get_string_board(np.rot90(board, player_rotation)))
+            )
+
     def check_game_end(self):
         board = self.current_player_board
         current_color = self.current_player_color
@@ -1,3 +1,5 @@
+import time
+
 import numpy as np
 from PyQt6 import QtCore
 
@@ -21,12 +23,15 @@ class ParallelTurn(QtCore.QThread):
         self.tile_height = tile_height
 
         self.next_move = ((0,0), (0,0))
+        self.elapsed = 0.0
 
     def run(self):
+        start = time.perf_counter()
         self.next_move = self.ai_func(self.player_sequence,
                             np.copy(self.board),
                             self.time_budget,
                             tile_width=self.tile_width,
                             tile_height=self.tile_height)
+        self.elapsed = time.perf_counter() - start
         
 
@@ -0,0 +1,185 @@
+import argparse
+import os
+import sys
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from BoardFile import MAPS_DIRECTORY, read_board_file
+from Bots import Bitboard as bitboard
+from Bots.PiecesMoves import get_all_moves, make_move, unmake_move
+
+#   Leaf counts of the stock maps for depths 1, 2, ...
+#   Moves are the pseudo-legal moves handed to bots by get_all_moves, each player
+#   moving on the board rotated to its own orientation, in player order
+KNOWN_NODE_COUNTS: Dict[str, List[int]] = {
+    "default.brd": [12, 144, 2124, 31329, 560756, 10029189],
+    "cross.brd": [5, 25, 135, 675, 5058, 33042, 239764],
+    "pawn_race.brd": [6, 35, 225, 1470, 9643, 62469, 408215],
+}
+
+
+def split_players(player_order: str) -> List[str]:
+    return [player_order[i : i + 3] for i in range(0, len(player_order), 3)]
+
+
+class PiecesMovesBackend:
+    """Array board moved in place; every player gets a rotated view sharing the same memory"""
+
+    name = "PiecesMoves"
+
+    def __init__(self, player_order: str, board: np.ndarray):
+        self.players = split_players(player_order)
+        self.board = board.copy()
+        self.views = [np.rot90(self.board, int(seq[2])) for seq in self.players]
+
+    def moves(self, turn: int):
+        return get_all_moves(self.views[turn], self.players[turn][1])
+
+    def make(self, turn: int, move):
+        return make_move(self.views[turn], move)
+
+    def unmake(self, turn: int, undo):
+        unmake_move(self.views[turn], undo)
+
+
+class BitboardBackend:
+    """One bitboard per player orientation, every move is replayed in all of them"""
+
+    name = "Bitboard"
+
+    def __init__(self, player_order: str, board: np.ndarray):
+        self.players = split_players(player_order)
+        rotations = [int(seq[2]) for seq in self.players]
+        self.frames = [bitboard.Bitboard.from_board(np.rot90(board, rot)) for rot in rotations]
+
+        #   maps[i][j] converts a square of player i's view into player j's view
+        self.maps: List[List[Dict[Tuple[int, int], Tuple[int, int]]]] = []
+        for i, frame in enumerate(self.frames):
+            coords = [(x, y) for x in range(frame.height) for y in range(frame.width)]
+            self.maps.append([
+                {c: bitboard.rotate_coords(frame.shape, c, rotations[j] - rotations[i]) for c in coords}
+                for j in range(len(self.frames))
+            ])
+
+    def moves(self, turn: int):
+        return bitboard.get_all_moves(self.frames[turn], self.players[turn][1])
+
+    def make(self, turn: int, move):
+        undo = bitboard.make_move(self.frames[turn], move)
+        others = []
+        for j, frame in enumerate(self.frames):
+            if j == turn:
+                continue
+            to_frame = self.maps[turn][j]
+            other = undo._replace(move=(to_frame[move[0]], to_frame[move[1]]))
+            bitboard.replay_move(frame, other)
+            others.append((frame, other))
+        return undo, others
+
+    def unmake(self, turn: int, undo):
+        undo, others = undo
+        bitboard.unmake_move(self.frames[turn], undo)
+        for frame, other in others:
+            bitboard.unmake_move(frame, other)
+
+
+BACKENDS = {
+    "pieces": PiecesMovesBackend,
+    "bitboard": BitboardBackend,
+}
+
+
+def perft(backend, depth: int, turn: int = 0) -> int:
+    """
+    Count the leaf nodes of the move tree
+    :param backend: The position and move generator
+    :param depth: Number of plies
+    :param turn: Index of the player to move
+    :return: The number of positions reached after ``depth`` plies
+    """
+    if depth == 0:
+        return 1
+
+    moves = backend.moves(turn)
+    if depth == 1:
+        return len(moves)
+
+    next_turn = (turn + 1) % len(backend.players)
+    nodes = 0
+    for move in moves:
+        undo = backend.make(turn, move)
+        nodes += perft(backend, depth - 1, next_turn)
+        backend.unmake(turn, undo)
+    return nodes
+
+
+def divide(backend, depth: int) -> List[Tuple[Tuple[Tuple[int, int], Tuple[int, int]], int]]:
+    """Get the leaf count below every root move"""
+    res = []
+    for move in backend.moves(0):
+        undo = backend.make(0, move)
+        res.append((move, perft(backend, depth - 1, 1 % len(backend.players))))
+        backend.unmake(0, undo)
+    return res
+
+
+def run(path: str, depth: int, backends: List[str], show_divide: bool = False) -> bool:
+    """
+    Run perft on a board file with every requested backend and print node counts and rates
+    :return: ``False`` if a count differs from the known one or between backends
+    """
+    loaded = read_board_file(path)
+    if loaded is None:
+        return False
+    player_order, board = loaded
+
+    name = os.path.basename(path)
+    known = KNOWN_NODE_COUNTS.get(name, [])
+    expected = known[depth - 1] if depth <= len(known) else None
+
+    ok = True
+    counts = set()
+    print(f"--- {name} depth {depth} ---")
+    for key in backends:
+        backend = BACKENDS[key](player_order, board)
+        start = time.perf_counter()
+        if show_divide:
+            results = divide(backend, depth)
+            for move, count in results:
+                print(f"  {move[0]} -> {move[1]}: {count}")
+            nodes = sum(count for _, count in results)
+        else:
+            nodes = perft(backend, depth)
+        duration = time.perf_counter() - start
+
+        status = ""
+        if expected is not None:
+            status = "ok" if nodes == expected else f"MISMATCH (expected {expected})"
+            ok &= nodes == expected
+        counts.add(nodes)
+        print(f"{backend.name:<12} {nodes:>10} nodes {duration:>8.3f}s {nodes / max(duration, 1e-9):>12.0f} nodes/s {status}")
+
+    if len(counts) > 1:
+        print("Backends disagree")
+        ok = False
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Count move tree leaves (perft) from a board file")
+    parser.add_argument("boards", nargs="*", help=".brd or .fen files, defaults to the stock maps")
+    parser.add_argument("-d", "--depth", type=int, default=3)
+    parser.add_argument("--divide", action="store_true", help="Print the count below every root move")
+    parser.add_argument("-b", "--backend", choices=["all"] + list(BACKENDS), default="all")
+    args = parser.parse_args()
+
+    boards = args.boards or [os.path.join(MAPS_DIRECTORY, name) for name in KNOWN_NODE_COUNTS]
+    backends = list(BACKENDS) if args.backend == "all" else [args.backend]
+
+    success = True
+    for board_path in boards:
+        success &= run(board_path, args.depth, backends, args.divide)
+
+    sys.exit(0 if success else 1)
@@ -1,6 +1,8 @@
 from __future__ import annotations
 
 from BotWidget import BotWidget
+from Bots.ChessBotList import StatefulChessBot, create_bot
+from Pondering import Ponderer
 
 
 class Player:
@@ -10,9 +12,29 @@ class Player:
         self.color: str = color
         #self.rotation: int = rotation
         self.widget: BotWidget = widget
+        self.bot_name: str | None = None
+        self.bot = None
+        self.ponderer: Ponderer = Ponderer()
 
     def get_budget(self) -> float:
         return self.widget.budgetValue.value()
 
     def get_func(self):
         return self.widget.playerBot.currentText(), self.widget.playerBot.currentData()
+
+
+    def get_bot(self):
+        """
+        Get the bot function to call this turn
+
+        Stateful bots are instantiated once, and kept for the rest of the game
+        unless another bot is selected.
+        :return: The name of the bot and the function to call
+        """
+        name, bot = self.get_func()
+        if self.bot is None or self.bot_name != name:
+            if isinstance(self.bot, StatefulChessBot):
+                self.bot.end_game()
+            self.bot_name = name
+            self.bot = create_bot(bot)
+        return name, self.bot
@@ -0,0 +1,116 @@
+import multiprocessing
+import queue
+import time
+from typing import Optional
+
+#   Pondering runs in another process: a thread would share the GIL with the thinking player
+PONDER_CONTEXT = multiprocessing.get_context("spawn")
+
+#   Seconds waited for a stopped ponder search to send the bot back
+STOP_TIMEOUT = 2.0
+
+
+def run_ponder(bot, player_sequence, board, move, stop, results):
+    """Entry point of the ponder process: search, then send the updated bot back"""
+    bot.ponder(player_sequence, board, move, stop.is_set)
+    results.put(bot)
+
+
+def normalize_move(move):
+    return tuple(tuple(int(c) for c in p) for p in move)
+
+
+class Ponderer:
+    """
+    Background search of a stateful bot while the other players think
+
+    The bot predicts the next move, and a copy of it searches the position after
+    that move in another process. If the prediction is right (ponder hit) the copy,
+    with its warmed up search tables, replaces the bot. Otherwise it is discarded.
+    """
+
+    def __init__(self):
+        self.process = None
+        self.stop_event = None
+        self.results = None
+        self.predicted_move = None
+        self.started_at = 0.0
+
+        self.hits = 0
+        self.misses = 0
+        self.ponder_time = 0.0
+
+    def start(self, bot, player_sequence, board) -> bool:
+        """
+        Start pondering, after the bot's move
+        :param bot: The ``StatefulChessBot`` instance
+        :param player_sequence: The player sequence given to the bot
+        :param board: The board after the bot's move, in its orientation
+        :return: ``True`` if pondering started, ``False`` if the bot made no prediction
+        """
+        self.cancel()
+        move = bot.predict_move(player_sequence, board)
+        if move is None:
+            return False
+
+        self.predicted_move = normalize_move(move)
+        self.stop_event = PONDER_CONTEXT.Event()
+        self.results = PONDER_CONTEXT.Queue()
+        self.process = PONDER_CONTEXT.Process(
+            target=run_ponder,
+            args=(bot, player_sequence, board, move, self.stop_event, self.results),
+            daemon=True,
+        )
+        self.process.start()
+        self.started_at = time.perf_counter()
+        return True
+
+    def is_pondering(self) -> bool:
+        return self.process is not None
+
+    def finish(self, move) -> Optional[object]:
+        """
+        End the pondering once the next move is known
+        :param move: The move played, in the pondering bot's orientation
+        :return: The bot updated by the pondering on a ponder hit, ``None`` on a miss
+        """
+        if self.process is None:
+            return None
+
+        self.ponder_time += time.perf_counter() - self.started_at
+        bot = None
+        if normalize_move(move) == self.predicted_move:
+            self.hits += 1
+            self.stop_event.set()
+            try:
+                bot = self.results.get(timeout=STOP_TIMEOUT)
+            except queue.Empty:
+                pass
+        else:
+            self.misses += 1
+
+        self.cancel()
+        return bot
+
+    def cancel(self):
+        """Stop the pondering without using its result"""
+        if self.process is None:
+            return
+        self.stop_event.set()
+        self.process.terminate()
+        self.process.join()
+        self.results.close()
+        self.process = None
+        self.stop_event = None
+        self.results = None
+        self.predicted_move = None
+
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __repr__(self):
+        return (
+            f"Ponderer({self.hits} hits, {self.misses} misses, "
+            f"{self.hit_rate():.0%} hit rate, {self.ponder_time:.2f}s pondered)"
+        )
@@ -0,0 +1,231 @@
+import argparse
+import itertools
+import os
+import sys
+import time
+from array import array
+from typing import Set, Tuple
+
+import numpy as np
+
+from BoardFile import MAPS_DIRECTORY, read_board_file
+from Bots.PiecesMoves import get_all_moves, make_move, unmake_move
+from Bots.Tablebase import (
+    TABLEBASE_DIRECTORY,
+    THEM,
+    US,
+    WALL,
+    TableLayout,
+    Tablebases,
+    get_table_path,
+    get_wall_mask,
+)
+
+#   Retrograde analysis
+#       Every position of a material gets its moves generated once. Moves capturing
+#       the enemy king win at once, moves changing the material (captures and
+#       promotions) lead to smaller tables solved before, the others to positions
+#       of the same table. A side without moves passes, like a bot playing an
+#       invalid move. The table is then solved ply by ply with array operations:
+#       a position wins in n plies if a move leads to a loss in n - 1 plies, and
+#       loses in n plies if all its moves lead to wins, the slowest in n - 1 plies.
+
+#   Colors of the generated boards, us moving towards the last row
+COLORS = ("w", "b")
+
+#   Default tables of the small stock maps: the bot's material, then its opponent's.
+#   Tables cover one opponent facing the bot, which leaves out cross.brd: its
+#   opposite player is a teammate and its opponents play from the sides
+STOCK_TABLES = {
+    "pawn_race.brd": [("kp", "kp")],
+}
+
+
+def sub_materials(us: str, them: str) -> Set[Tuple[str, str]]:
+    """Get the materials one capture or promotion away, kings are never captured"""
+    result = set()
+    for side in (US, THEM):
+        own, other = (us, them) if side == US else (them, us)
+        children = []
+        if "p" in own:
+            children.append(("".join(sorted(own.replace("p", "q", 1))), other))
+        for piece_type in set(other) - {"k"}:
+            children.append((own, other.replace(piece_type, "", 1)))
+        for child_own, child_other in children:
+            result.add((child_own, child_other) if side == US else (child_other, child_own))
+    return result
+
+
+def make_board(layout: TableLayout, squares) -> np.ndarray:
+    height, width = layout.shape
+    board = np.full(layout.shape, "", dtype=object)
+    for sq in range(height * width):
+        if layout.walls >> sq & 1:
+            board[sq // width, sq % width] = WALL
+    for (side, piece_type), sq in zip(layout.pieces, squares):
+        board[sq // width, sq % width] = piece_type + COLORS[side]
+    return board
+
+
+def solve(layout: TableLayout, tablebases: Tablebases) -> np.ndarray:
+    """
+    Solve every position of a material
+    :param tablebases: Tables of the materials one capture or promotion away
+    :return: The values, shaped ``layout.table_shape``, see ``Bots.Tablebase``
+    """
+    table_shape = layout.table_shape
+    size = int(np.prod(table_shape))
+    width = layout.shape[1]
+    strides = np.cumprod((table_shape + (1,))[::-1])[::-1][1:].tolist()
+
+    def flat_index(to_move, squares):
+        index = layout.index(to_move, squares)
+        return sum(i * s for i, s in zip(index, strides))
+
+    values = np.zeros(size, dtype=np.int16)
+    valid = np.zeros(size, dtype=bool)
+    #   Moves within the table, as (position, child) flat indices
+    owners, children = array("q"), array("q")
+    #   Among the moves changing the material: the fastest win, the slowest loss, and whether one does not lose
+    ext_win = np.zeros(size, dtype=np.int16)
+    ext_max = np.zeros(size, dtype=np.int16)
+    ext_safe = np.zeros(size, dtype=bool)
+
+    for indices in itertools.product(*(range(n) for n in table_shape[1:])):
+        squares = [domain[i] for domain, i in zip(layout.domains, indices)]
+        if len(set(squares)) != len(squares):
+            continue
+        board = make_board(layout, squares)
+        for to_move in (US, THEM):
+            flat = flat_index(to_move, squares)
+            valid[flat] = True
+            color, forward = (COLORS[US], 1) if to_move == US else (COLORS[THEM], -1)
+            moves = [m for m in get_all_moves(board, color, forward) if board[m[1]] != WALL]
+
+            if any(board[m[1]] == "k" + COLORS[1 - to_move] for m in moves):
+                values[flat] = 1
+                continue
+            if not moves:
+                owners.append(flat)
+                children.append(flat_index(1 - to_move, squares))
+
+            for move in moves:
+                undo = make_move(board, move, forward)
+                if len(undo.captured) == 0 and not undo.promoted:
+                    start, end = (x * width + y for x, y in move)
+                    owners.append(flat)
+                    children.append(flat_index(1 - to_move, [end if sq == start else sq for sq in squares]))
+                else:
+                    value = tablebases.probe(board, COLORS[US], 1 - to_move, layout.walls)
+                    if value < 0:
+                        if ext_win[flat] == 0 or 1 - value < ext_win[flat]:
+                            ext_win[flat] = 1 - value
+                    elif value > 0:
+                        ext_max[flat] = max(ext_max[flat], value)
+                    else:
+                        ext_safe[flat] = True
+                unmake_move(board, undo)
+
+    owners = np.frombuffer(owners, dtype=np.int64)
+    children = np.frombuffer(children, dtype=np.int64)
+    retrograde(values, valid, owners, children, ext_win, ext_max, ext_safe)
+    return values.reshape(table_shape)
+
+
+def retrograde(values, valid, owners, children, ext_win, ext_max, ext_safe):
+    """
+    Solve a table in place, ply by ply
+    :param values: The values, only immediate king captures (1) are set
+    :param valid: Whether every flat index is a position
+    :param owners: Position of every move within the table
+    :param children: Position reached by every move within the table
+    :param ext_win, ext_max, ext_safe: See ``solve``
+    """
+    size = len(values)
+    move_count = np.bincount(owners, minlength=size)
+    #   A position with a winning or drawing move out of the table cannot lose
+    can_lose = valid & ~ext_safe & (ext_win == 0)
+
+    n = 1
+    last_change = 1
+    while n - last_change <= 2:
+        n += 1
+        child_values = values[children]
+        unsolved = valid & (values == 0)
+
+        #   Wins: a move leads to a loss in n - 1 plies
+        win = np.zeros(size, dtype=bool)
+        win[owners[child_values == -(n - 1)]] = True
+        win |= ext_win == n
+        win &= unsolved
+
+        #   Losses: every move leads to a win, the slowest one in n - 1 plies
+        winning_moves = np.bincount(owners, weights=child_values > 0, minlength=size)
+        slowest = ext_max.astype(np.int64)
+        np.maximum.at(slowest, owners, child_values)
+        loss = unsolved & can_lose & (winning_moves == move_count) & (slowest == n - 1)
+
+        if win.any() or loss.any():
+            last_change = n
+        values[win] = n
+        values[loss] = -n
+
+    if np.abs(values).max() > np.iinfo(np.int8).max:
+        raise ValueError("Distances do not fit in the table's int8 values")
+
+
+def build(
+    shape: Tuple[int, int], walls: int, us: str, them: str, directory: str, tablebases: Tablebases, done: Set[tuple]
+):
+    """Build the table of a material and of every smaller material it leads to, unless already built"""
+    if (us, them) in done:
+        return
+    done.add((us, them))
+    for child_us, child_them in sorted(sub_materials(us, them)):
+        build(shape, walls, child_us, child_them, directory, tablebases, done)
+
+    start = time.perf_counter()
+    layout = TableLayout(shape, walls, us, them)
+    values = solve(layout, tablebases).astype(np.int8)
+    path = get_table_path(directory, shape, walls, us, them)
+    os.makedirs(directory, exist_ok=True)
+    np.save(path, values)
+
+    wins, losses = int((values > 0).sum()), int((values < 0).sum())
+    print(
+        f"{os.path.basename(path)}: {values.size} entries, {wins} wins, {losses} losses, "
+        f"longest {int(np.abs(values).max())} plies, {time.perf_counter() - start:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the endgame tablebases of board files")
+    parser.add_argument("boards", nargs="*", help=".brd or .fen files, defaults to the small stock maps")
+    parser.add_argument(
+        "-m", "--material", action="append", help="Pieces of the bot and of its opponent, e.g. kp_k. Repeatable"
+    )
+    parser.add_argument("-o", "--output", default=TABLEBASE_DIRECTORY)
+    args = parser.parse_args()
+
+    boards = args.boards or [os.path.join(MAPS_DIRECTORY, name) for name in STOCK_TABLES]
+    for board_path in boards:
+        if args.material:
+            materials = [tuple("".join(sorted(side)) for side in m.split("_")) for m in args.material]
+        else:
+            materials = STOCK_TABLES[os.path.basename(board_path)]
+
+        player_order, board = read_board_file(board_path)
+        print(f"--- {os.path.basename(board_path)} ---")
+        #   Bots see the board rotated to their own orientation, every distinct view gets its tables
+        views = {}
+        for rotation in {int(player_order[i + 2]) for i in range(0, len(player_order), 3)}:
+            view = np.rot90(board, rotation)
+            views[(int(view.shape[0]), int(view.shape[1])), get_wall_mask(view)] = view
+        for shape, walls in views:
+            #   Tables must exist while the larger ones are solved
+            tablebases = Tablebases(args.output)
+            done: Set[tuple] = set()
+            for us, them in materials:
+                build(shape, walls, us, them, args.output, tablebases, done)
+
+    sys.exit(0)
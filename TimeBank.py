@@ -0,0 +1,38 @@
+from typing import Dict, Hashable
+
+#   A turn may spend at most this ratio of the base budget from the bank
+MAX_SPEND_RATIO = 1.0
+
+
+class TimeBank:
+    """
+    Time left over by players ending their turns early, spendable on later turns
+
+    Each player's bank grows by the unused part of its base budget, and shrinks
+    by the time used on top of it.
+    """
+
+    def __init__(self, max_spend_ratio: float = MAX_SPEND_RATIO):
+        self.max_spend_ratio = max_spend_ratio
+        self.saved: Dict[Hashable, float] = {}
+
+    def budget(self, player: Hashable, base_budget: float) -> float:
+        """
+        Get the time budget of a player's turn
+        :param player: The player, any hashable identifier
+        :param base_budget: The budget of a turn without bank
+        :return: The base budget plus what may be spent from the bank
+        """
+        return base_budget + min(self.saved.get(player, 0.0), base_budget * self.max_spend_ratio)
+
+    def record(self, player: Hashable, base_budget: float, elapsed: float):
+        """
+        Account for a finished turn
+        :param player: The player
+        :param base_budget: The budget of a turn without bank
+        :param elapsed: The time the turn actually took
+        """
+        self.saved[player] = max(0.0, self.saved.get(player, 0.0) + base_budget - elapsed)
+
+    def reset(self):
+        self.saved.clear()
@@ -1,13 +1,18 @@
-from typing import Dict, Sequence, Tuple, List
+from typing import Dict, Optional, Sequence, Tuple, List
 import sys
+import functools
 import importlib
 import os
+import time
 import numpy as np
 from dataclasses import dataclass
 
 from Bots import __all__ as BOT_MODULES
-from Bots.ChessBotList import CHESS_BOT_LIST
+from Bots.Bitboard import rotate_coords
+from Bots.ChessBotList import CHESS_BOT_LIST, StatefulChessBot, create_bot
 from ChessRules import move_is_valid, check_player_defeated
+from Pondering import Ponderer
+from TimeBank import TimeBank
 
 
 def load_all_bots() -> None:
@@ -117,6 +122,20 @@ def apply_move(
     board[:, :] = np.rot90(rot_board, -rotation)
 
 
+def get_stateful_bot(bot_function: callable) -> Optional[StatefulChessBot]:
+    """Get the stateful bot instance behind a bot function given to ``play_match``, if any"""
+    if isinstance(bot_function, functools.partial):
+        bot_function = bot_function.func
+    return bot_function if isinstance(bot_function, StatefulChessBot) else None
+
+
+def with_stateful_bot(bot_function: callable, bot: StatefulChessBot) -> callable:
+    """Get ``bot_function`` calling another stateful bot instance, keeping its options"""
+    if isinstance(bot_function, functools.partial):
+        return functools.partial(bot, *bot_function.args, **bot_function.keywords)
+    return bot
+
+
 def play_match(
     bots: Sequence[Tuple[str, callable]],
     max_turns: int,
@@ -124,7 +143,19 @@ def play_match(
     seq: str,
     board: np.ndarray,
     game_index: int,
+    time_bank: bool = True,
+    ponder: bool = False,
 ) -> int:
+    """
+    Play one game
+    :param time_bank: If ``True``, time left over by a bot is added to its later turns, see ``TimeBank``
+    :param ponder: If ``True``, stateful bots search during their opponent's turn, see ``Ponderer``
+    :return: 1 if white wins, -1 if black wins, 0 for a draw
+    """
+    bots = list(bots)
+    bank = TimeBank() if time_bank else None
+    ponderers = [Ponderer() for _ in bots] if ponder else None
+
     def endMatch(turn, player: int):
         print(
             f"{game_index:>3}.",
@@ -135,43 +166,79 @@ def play_match(
         )
         return player
 
-    for turn in range(max_turns):
-        player = turn % 2
-        player_seq = invert_seq(seq) if player == 1 else seq
-
-        color = player_seq[1]
-        rotation = int(player_seq[2])
-        player_board = np.rot90(board, rotation)
-
-        bot_name, bot_function = bots[player]
-
-        try:
-            proposed_move = bot_function(player_seq, np.copy(player_board), time_budget)
-        except Exception as exc:
-            # Any exception counts as a forfeit
-            print(f"Bot '{bot_name}' crashed: {exc}")
-            return endMatch(turn + 1, (-1) ** (player + 1))
-
-        if not (
-            isinstance(proposed_move, tuple)
-            and len(proposed_move) == 2
-            and all(isinstance(p, tuple) and len(p) == 2 for p in proposed_move)
-        ):
-            # Any invalid move format counts as a forfeit
-            print(f"Bot '{bot_name}' produced an invalid move format: {proposed_move}")
-            continue
-
-        if not move_is_valid(player_seq, proposed_move, player_board):
-            print(f"Bot '{bot_name}' played an illegal move: {proposed_move}")
-            continue
-
-        apply_move(board, proposed_move, rotation)
+    try:
+        for turn in range(max_turns):
+            player = turn % 2
+            player_seq = invert_seq(seq) if player == 1 else seq
+
+            color = player_seq[1]
+            rotation = int(player_seq[2])
+            player_board = np.rot90(board, rotation)
+
+            bot_name, bot_function = bots[player]
+
+            budget = bank.budget(player, time_budget) if bank is not None else time_budget
+            start = time.perf_counter()
+            try:
+                proposed_move = bot_function(player_seq, np.copy(player_board), budget)
+            except Exception as exc:
+                # Any exception counts as a forfeit
+                print(f"Bot '{bot_name}' crashed: {exc}")
+                return endMatch(turn + 1, (-1) ** (player + 1))
+
+            if bank is not None:
+                bank.record(player, time_budget, time.perf_counter() - start)
+
+            if not (
+                isinstance(proposed_move, tuple)
+                and len(proposed_move) == 2
+                and all(isinstance(p, tuple) and len(p) == 2 for p in proposed_move)
+            ):
+                # Any invalid move format counts as a forfeit
+                print(f"Bot '{bot_name}' produced an invalid move format: {proposed_move}")
+                continue
 
-        # Opponent got defeated
-        if check_player_defeated("w" if color == "b" else "b", player_board):
-            return endMatch(turn + 1, (-1) ** player)
+            if not move_is_valid(player_seq, proposed_move, player_board):
+                print(f"Bot '{bot_name}' played an illegal move: {proposed_move}")
+                continue
 
-    return 0
+            apply_move(board, proposed_move, rotation)
+
+            # Stateful bots of the other players may update their data with the move
+            for other, (other_name, other_function) in enumerate(bots):
+                other_bot = get_stateful_bot(other_function)
+                if other == player or other_bot is None:
+                    continue
+                other_rotation = int((invert_seq(seq) if other == 1 else seq)[2])
+                other_move = tuple(
+                    rotate_coords(player_board.shape, p, other_rotation - rotation) for p in proposed_move
+                )
+                if ponderers is not None and ponderers[other].is_pondering():
+                    # On a ponder hit, the bot continues with the tables filled while pondering
+                    pondered_bot = ponderers[other].finish(other_move)
+                    if pondered_bot is not None:
+                        other_bot = pondered_bot
+                        bots[other] = (other_name, with_stateful_bot(other_function, pondered_bot))
+                other_bot.opponent_moved(other_move, np.copy(np.rot90(board, other_rotation)))
+
+            # Opponent got defeated
+            if check_player_defeated("w" if color == "b" else "b", player_board):
+                return endMatch(turn + 1, (-1) ** player)
+
+            bot = get_stateful_bot(bot_function)
+            if ponderers is not None and bot is not None and bot.ponders:
+                ponderers[player].start(bot, player_seq, np.copy(player_board))
+
+        return 0
+    finally:
+        for _, bot_function in bots:
+            bot = get_stateful_bot(bot_function)
+            if bot is not None:
+                bot.end_game()
+        if ponderers is not None:
+            for (bot_name, _), ponderer in zip(bots, ponderers):
+                ponderer.cancel()
+                print(f"{bot_name}: {ponderer}")
 
 
 def initBoard() -> Tuple[str, np.ndarray]:
@@ -190,10 +257,51 @@ def initBoard() -> Tuple[str, np.ndarray]:
     return (player_seq, np.array(rows, dtype=object))
 
 
+def parse_option_value(value: str):
+    if value.lower() in ("true", "false"):
+        return value.lower() == "true"
+    for cast in (int, float):
+        try:
+            return cast(value)
+        except ValueError:
+            pass
+    return value
+
+
+def get_bot(spec: str) -> callable:
+    """
+    Get the function of a bot for one game, optionally with search options for A/B testing
+    :param spec: The bot name, followed by ``:option=value,...``, e.g. ``NegaMax_ThinkR:null_move=false,lmr=false``
+    :return: The bot function (a new instance for stateful bots), called with the options as keyword arguments
+    """
+    name, _, options = spec.partition(":")
+    bot_function = create_bot(CHESS_BOT_LIST[name])
+    if not options:
+        return bot_function
+
+    kwargs = {}
+    for option in options.split(","):
+        key, _, value = option.partition("=")
+        kwargs[key.strip()] = parse_option_value(value.strip())
+    return functools.partial(bot_function, **kwargs)
+
+
 def run_tournament(
-    budget: int, max_turns: int, time_budget: int, nb_matches: int
+    budget: int,
+    max_turns: int,
+    time_budget: int,
+    nb_matches: int,
+    bots: Optional[Sequence[str]] = None,
+    ponder: bool = False,
 ) -> Dict[str, Dict[str, Dict[str, int]]]:
+    """
+    Play every bot against every other one, with both colors
+    :param bots: Bots taking part, see ``get_bot``. Every registered bot by default
+    :param ponder: Let stateful bots think during their opponent's turn, see ``play_match``
+    """
     result = {}
+    if bots is None:
+        bots = [name for name in CHESS_BOT_LIST if name != "ManualMover"]
 
     player_seq, board = initBoard()
 
@@ -212,14 +320,15 @@ def run_tournament(
             game_board = np.copy(board)
             winner = play_match(
                 [
-                    (name_first, CHESS_BOT_LIST[first]),
-                    (name_second, CHESS_BOT_LIST[second]),
+                    (name_first, get_bot(first)),
+                    (name_second, get_bot(second)),
                 ],
                 max_turns,
                 time_budget,
                 player_seq,
                 game_board,
                 i + 1,
+                ponder=ponder,
             )
 
             if winner == 1:
@@ -229,13 +338,8 @@ def run_tournament(
             else:
                 result[name_first][name_second]["e"] += 1
 
-    for bot1 in CHESS_BOT_LIST:
-        if bot1 == "ManualMover":
-            continue
-        for bot2 in CHESS_BOT_LIST:
-            if bot2 == "ManualMover":
-                continue
-
+    for bot1 in bots:
+        for bot2 in bots:
             if bot1 != bot2:
                 n = nb_matches // 2
                 play_game(bot1, bot2, n)
@@ -261,6 +365,7 @@ if __name__ == "__main__":
 
     load_all_bots()
 
-    print_results(run_tournament(time_budget, max_turns, time_budget, nb_matches))
+    # e.g. python TournamentRunner.py NegaMax_ThinkR NegaMax_ThinkR:null_move=false,lmr=false
+    print_results(run_tournament(time_budget, max_turns, time_budget, nb_matches, sys.argv[1:] or None))
 
     sys.exit(0)